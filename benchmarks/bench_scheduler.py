@@ -0,0 +1,127 @@
+"""
+Microbenchmarks for the Scheduler's per-review cost.
+
+Each method is timed next to a baseline that reviews the card the way the scheduler did before it ran on
+epoch milliseconds: a deep copy of the card and a round trip through datetime for every time computation,
+around the same scheduling rules. The speedup of the millisecond core is thus reproducible from the tree.
+
+Run from the project root:
+    python -m benchmarks.bench_scheduler
+"""
+
+import timeit
+from copy import deepcopy
+from datetime import datetime, timezone, timedelta
+
+from models import Card, State, Rating, ReviewLog
+from services.scheduler import Scheduler
+from utils import MILLIS_PER_DAY
+
+NUMBER = 20000
+REPEAT = 5
+
+
+def _best_of(func) -> float:
+    """Returns the best per-call time in microseconds."""
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e6
+
+
+def _review_card_datetime_baseline(scheduler: Scheduler, og_card: Card, rating: Rating, review_datetime: datetime):
+    """review_card as it was before the millisecond core: deep copy and datetime arithmetic."""
+    days_since_last_review = None
+    card = deepcopy(og_card)
+
+    if card.last_review:
+        days_since_last_review = (review_datetime - Scheduler.epoch_millis_to_date(card.last_review)).days
+
+    (
+        card.state,
+        card.step,
+        card.stability,
+        card.difficulty,
+        next_interval_millis,
+    ) = scheduler._next_card_state(
+        state=card.state,
+        step=card.step,
+        stability=card.stability,
+        difficulty=card.difficulty,
+        days_since_last_review=days_since_last_review,
+        retrievability=scheduler._get_retrievability_from_days(
+            stability=card.stability,
+            days_since_last_review=days_since_last_review,
+        ),
+        rating=rating,
+    )
+    next_interval = timedelta(milliseconds=next_interval_millis)
+
+    if scheduler.enable_fuzzing and card.state == State.Review:
+        review_millis = Scheduler.date_to_epoch_millis(review_datetime)
+        next_interval = timedelta(
+            days=scheduler._get_fuzzed_interval(next_interval_millis // MILLIS_PER_DAY, review_millis=review_millis)
+        )
+
+    card.due = Scheduler.date_to_epoch_millis(review_datetime + next_interval)
+    card.last_review = Scheduler.date_to_epoch_millis(review_datetime)
+
+    review_log = ReviewLog(
+        card_id=card.id,
+        rating=rating,
+        review_datetime=Scheduler.date_to_epoch_millis(review_datetime),
+        review_duration=None,
+    )
+    if type(card.state) is State:
+        card.state = card.state.value
+
+    return card, review_log, next_interval
+
+
+def _get_card_retrievability_datetime_baseline(scheduler: Scheduler, card: Card, current_datetime: datetime):
+    """get_card_retrievability as it was before the millisecond core: elapsed days through datetime."""
+    if card.last_review is None:
+        return 0
+
+    elapsed_days = max(0, (current_datetime - Scheduler.epoch_millis_to_date(card.last_review)).days)
+
+    return (1 + scheduler._FACTOR * elapsed_days / card.stability) ** scheduler._DECAY
+
+
+def bench_review_card():
+    scheduler = Scheduler()
+    card = Card(
+        1,
+        state=State.Review,
+        stability=12.0,
+        difficulty=5.0,
+        due=1755000000000,
+        last_review=1754000000000,
+    )
+    review_datetime = datetime(2025, 9, 1, tzinfo=timezone.utc)
+    review_millis = Scheduler.date_to_epoch_millis(review_datetime)
+
+    results = {
+        "baseline review_card (datetime, deepcopy)": _best_of(
+            lambda: _review_card_datetime_baseline(scheduler, card, Rating.Good, review_datetime)
+        ),
+        "review_card (datetime edge)": _best_of(
+            lambda: scheduler.review_card(card, Rating.Good, review_datetime)
+        ),
+        "review_card_millis": _best_of(
+            lambda: scheduler.review_card_millis(card, Rating.Good, review_millis)
+        ),
+        "baseline get_card_retrievability (datetime)": _best_of(
+            lambda: _get_card_retrievability_datetime_baseline(scheduler, card, review_datetime)
+        ),
+        "get_card_retrievability (datetime edge)": _best_of(
+            lambda: scheduler.get_card_retrievability(card, review_datetime)
+        ),
+        "get_card_retrievability_millis": _best_of(
+            lambda: scheduler.get_card_retrievability_millis(card, review_millis)
+        ),
+    }
+
+    for name, micros in results.items():
+        print(f"{name:<44} {micros:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    bench_review_card()
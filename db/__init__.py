@@ -8,3 +8,4 @@ from .revlog_crud import RevlogCRUD
 from .metadata_crud import MetadataCRUD
 
 
+from .parameters_crud import ParametersCRUD
@@ -1,12 +1,18 @@
 import sqlite3
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict
 from db import DatabaseBaseClass
+from models import State, DueHistogram
+from utils import MILLIS_PER_DAY
 
 
 class CardCRUD(DatabaseBaseClass):
     # Common column selection for cards
     # CARD_COLUMNS = "id, deck_id, content_id, state, step, stability, difficulty, due, last_review"
     _instance = None
+    _due_histogram: Optional[DueHistogram] = None
+
+    # stay well below SQLite's limit on the number of "?" in one query
+    MAX_QUERY_VARIABLES = 500
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -41,6 +47,12 @@ class CardCRUD(DatabaseBaseClass):
         count = self.execute_many(query, cards)
         print(f"cards: {count} rows inserted successfully")
 
+        if self._due_histogram is not None:
+            for card in cards:
+                # (id, deck_id, content_id, state, step, stability, difficulty, due, last_review)
+                if card[3] != State.New:
+                    self._due_histogram.add(card[7])
+
     def get_cards_by_deck_id(self, deck_id: int) -> Optional[List[sqlite3.Row]]:
         """Retrieve all cards from a specific deck."""
         query = "SELECT * FROM cards WHERE deck_id = ?"
@@ -98,6 +110,18 @@ class CardCRUD(DatabaseBaseClass):
             query, (deck_id, new_state_int, session_cutoff_epoch_millis)
         )
 
+    def get_due_cards_between(self, deck_id: int, new_state_int: int, from_epoch_millis: int,
+                              until_epoch_millis: int) -> Optional[List[sqlite3.Row]]:
+        """Retrieve the non-new cards due in [from_epoch_millis, until_epoch_millis)."""
+        query = """
+            SELECT * FROM cards 
+            WHERE deck_id = ? AND state != ? AND due >= ? AND due < ?
+            ORDER BY due ASC
+        """
+        return self.execute_select_many(
+            query, (deck_id, new_state_int, from_epoch_millis, until_epoch_millis)
+        )
+
     def get_all_cards(self) -> Optional[List[sqlite3.Row]]:
         """Retrieve all cards."""
         query = "SELECT * FROM cards"
@@ -111,6 +135,58 @@ class CardCRUD(DatabaseBaseClass):
         except RuntimeError as e:
             raise RuntimeError(f"Failed to clear cards table: {e}")
 
+        if self._due_histogram is not None:
+            self._due_histogram.clear()
+
+    def get_due_histogram(self) -> DueHistogram:
+        """
+        Return the number of non-new cards due on each day, across all decks.
+
+        The histogram is built from the cards.due column on first use and then kept up to date
+        in place by update_many_cards, so every holder of it (e.g. a load-balancing Scheduler) sees the changes.
+        """
+        if self._due_histogram is None:
+            query = f"""
+                SELECT due / {MILLIS_PER_DAY} AS day, COUNT(*) FROM cards
+                WHERE state != ?
+                GROUP BY day
+            """
+            rows = self.execute_select_many(query, (State.New,))
+            self._due_histogram = DueHistogram.from_day_counts(rows)
+        return self._due_histogram
+
+    def get_states_and_dues_by_ids(self, ids: List[int]) -> Dict[int, Tuple[int, int]]:
+        """Retrieve {id: (state, due)} for the given card ids, in chunks that respect SQLite's variable limit."""
+        states_and_dues = {}
+        for i in range(0, len(ids), CardCRUD.MAX_QUERY_VARIABLES):
+            chunk = ids[i:i + CardCRUD.MAX_QUERY_VARIABLES]
+            placeholders = ",".join("?" for _ in chunk)
+            query = "SELECT id, state, due FROM cards WHERE id IN (" + placeholders + ")"
+            for card_id, state, due in self.execute_select_many(query, chunk):
+                states_and_dues[card_id] = (state, due)
+        return states_and_dues
+
+    def get_last_reviews_by_ids(self, ids: List[int]) -> Dict[int, Optional[int]]:
+        """Retrieve {id: last_review} for the given card ids, in chunks that respect SQLite's variable limit."""
+        last_reviews = {}
+        for i in range(0, len(ids), CardCRUD.MAX_QUERY_VARIABLES):
+            chunk = ids[i:i + CardCRUD.MAX_QUERY_VARIABLES]
+            placeholders = ",".join("?" for _ in chunk)
+            query = "SELECT id, last_review FROM cards WHERE id IN (" + placeholders + ")"
+            for card_id, last_review in self.execute_select_many(query, chunk):
+                last_reviews[card_id] = last_review
+        return last_reviews
+
+    def _update_due_histogram(self, old_states_and_dues: Dict[int, Tuple[int, int]],
+                              params: List[Tuple]) -> None:
+        histogram = self._due_histogram
+        for (state, _, _, _, due, _, card_id) in params:
+            old = old_states_and_dues.get(card_id)
+            if old is not None and old[0] != State.New:
+                histogram.remove(old[1])
+            if state != State.New:
+                histogram.add(due)
+
     # CARD_UPDATE_COLUMNS = "state, step, stability, difficulty, due, last_review"
     def update_many_cards(self, updated_cards_dict: List[dict]) -> None:
         if not updated_cards_dict:
@@ -121,8 +197,29 @@ class CardCRUD(DatabaseBaseClass):
         params: List[Tuple] = [(card["state"], card["step"], card["stability"],
                                 card["difficulty"], card["due"], card["last_review"],
                                 card["id"]) for card in updated_cards_dict]
+        self.update_many_card_rows(params)
+
+    def update_many_card_rows(self, params: List[Tuple]) -> None:
+        """
+        Update scheduling columns from (state, step, stability, difficulty, due, last_review, id) rows,
+        all in a single transaction.
+        """
+        if not params:
+            return
+        query = ("UPDATE cards"
+                 " SET state = ?, step = ?, stability = ?, difficulty = ?, due = ?, last_review = ?"
+                 " WHERE id = ?")
+
+        old_states_and_dues = None
+        if self._due_histogram is not None:
+            old_states_and_dues = self.get_states_and_dues_by_ids([param[-1] for param in params])
+
         try:
             count = self.execute_many(query, params)
             print(f"cards: {count} rows updated successfully")
         except RuntimeError as e:
             print(f"Error occurred while updating cards: {e}")
+            return
+
+        if old_states_and_dues is not None:
+            self._update_due_histogram(old_states_and_dues, params)
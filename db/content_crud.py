@@ -7,6 +7,9 @@ from db import DatabaseBaseClass
 class ContentCRUD(DatabaseBaseClass):
     _instance = None
 
+    # stay well below SQLite's limit on the number of "?" in one query
+    MAX_QUERY_VARIABLES = 500
+
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -40,10 +43,15 @@ class ContentCRUD(DatabaseBaseClass):
         return self.execute_select_all(query)
 
     def get_many_contents_by_ids(self, ids: List[Any]) -> Optional[List[sqlite3.Row]]:
-        placeholders = ",".join("?" for _ in ids)
-        query = "SELECT id, de, en FROM contents WHERE id IN (" + placeholders + ")"
-        
-        return self.execute_select_many(query, ids)
+        """Retrieve the contents with the given ids, in chunks that respect SQLite's variable limit."""
+        ids = list(dict.fromkeys(ids))
+        contents = []
+        for i in range(0, len(ids), ContentCRUD.MAX_QUERY_VARIABLES):
+            chunk = ids[i:i + ContentCRUD.MAX_QUERY_VARIABLES]
+            placeholders = ",".join("?" for _ in chunk)
+            query = "SELECT id, de, en FROM contents WHERE id IN (" + placeholders + ")"
+            contents.extend(self.execute_select_many(query, chunk))
+        return contents
 
     def get_content_by_id(self, content_id) -> Optional[sqlite3.Row]:
         """Retrieve content with content_id (id = epoch milliseconds)."""
@@ -34,6 +34,9 @@ class DatabaseInitializer:
         if not os.path.exists(self.db_path):
             self._create_database()
             self._populate_tables_in_order()
+        else:
+            # the schema only uses IF NOT EXISTS, so this adds tables and indexes introduced since the db was created
+            self._create_database()
         # else:
         #     answer = Messagebox.yesno(
         #         parent=self.window,
@@ -0,0 +1,79 @@
+import json
+import sqlite3
+from typing import List, Optional
+
+from db import DatabaseBaseClass
+
+
+class ParametersCRUD(DatabaseBaseClass):
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def insert_or_replace_parameters(self, parameters: List[float], revlog_high_water_mark: int,
+                                     loss: Optional[float], updated_at: int, deck_id: Optional[int] = None) -> None:
+        """
+        Store the optimized FSRS parameters.
+        :param parameters: The optimized parameters.
+        :param revlog_high_water_mark: The revlogs rowid of the last review the parameters were trained on.
+        :param loss: The log loss of the parameters on the reviews they were trained on.
+        :param updated_at: The time of the optimization in epoch milliseconds.
+        :param deck_id: If given, store them as the parameter set of this deck instead of the collection-wide one.
+        """
+        if deck_id is None:
+            query = """
+                INSERT OR REPLACE INTO fsrs_parameters (id, parameters, revlog_high_water_mark, loss, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            """
+            params = (1, json.dumps(list(parameters)), revlog_high_water_mark, loss, updated_at)
+        else:
+            query = """
+                INSERT OR REPLACE INTO deck_fsrs_parameters (deck_id, parameters, revlog_high_water_mark, loss, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            """
+            params = (deck_id, json.dumps(list(parameters)), revlog_high_water_mark, loss, updated_at)
+        self.execute_insert(query, params)
+
+    def get_parameters(self, deck_id: Optional[int] = None) -> Optional[sqlite3.Row]:
+        """
+        Retrieve the stored FSRS parameters.
+        :param deck_id: If given, retrieve the parameter set of this deck instead of the collection-wide one.
+        :return: A (parameters, revlog_high_water_mark, loss, updated_at) row, or None if no parameters were
+            stored yet. The parameters are a JSON list, see parse_parameters.
+        """
+        if deck_id is None:
+            query = """
+                SELECT parameters, revlog_high_water_mark, loss, updated_at FROM fsrs_parameters WHERE id = ?
+            """
+            return self.execute_select_one(query, 1)
+        query = """
+            SELECT parameters, revlog_high_water_mark, loss, updated_at FROM deck_fsrs_parameters WHERE deck_id = ?
+        """
+        return self.execute_select_one(query, deck_id)
+
+    def get_all_deck_parameters(self) -> List[sqlite3.Row]:
+        """
+        Retrieve the parameter sets of every deck that has one.
+        :return: A list of (deck_id, parameters, revlog_high_water_mark, loss, updated_at) rows.
+        """
+        query = """
+            SELECT deck_id, parameters, revlog_high_water_mark, loss, updated_at FROM deck_fsrs_parameters
+            ORDER BY deck_id
+        """
+        return self.execute_select_all(query)
+
+    def delete_deck_parameters(self, deck_id: int) -> None:
+        """
+        Delete the parameter set of a deck, so that it falls back to its parent deck's or the collection-wide one.
+        :param deck_id: The ID of the deck.
+        """
+        query, params = "DELETE FROM deck_fsrs_parameters WHERE deck_id = ?", (deck_id,)
+        self.execute_update_delete(query, params)
+
+    @staticmethod
+    def parse_parameters(row: sqlite3.Row) -> List[float]:
+        """Decode the parameters of a row returned by get_parameters."""
+        return json.loads(row["parameters"])
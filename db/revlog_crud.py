@@ -1,5 +1,6 @@
 # To-do
-from typing import List, Tuple, Optional
+import sqlite3
+from typing import List, Tuple, Optional, Iterator, Set
 from db import DatabaseBaseClass
 
 
@@ -13,19 +14,226 @@ class RevlogCRUD(DatabaseBaseClass):
             cls._instance = super().__new__(cls)
         return cls._instance
 
+    # SQLite limits the number of variables in a query, so IN clauses are built in chunks of this size
+    MAX_QUERY_VARIABLES = 500
+
     def insert_review(self, review_log: Tuple) -> None:
-        query = """
-            INSERT INTO revlogs (card_id, rating, review_datetime, review_duration)
-            VALUES (?, ?, ?, ?)
-        """
-        self.execute_insert(query, (review_log,))
-        print(f"revlogs: 1 row inserted successfully")
+        self.insert_many_reviews([review_log])
 
     def insert_many_reviews(self, review_logs: List[Tuple]) -> None:
+        """
+        Insert (card_id, rating, review_datetime, review_duration) rows and update the review_statistics table
+        in the same transaction.
+        """
+        if not review_logs:
+            return
         query = """
             INSERT INTO revlogs (card_id, rating, review_datetime, review_duration)
             VALUES (?, ?, ?, ?)
         """
-        count = self.execute_many(query, review_logs)
+        card_ids = list({review_log[0] for review_log in review_logs})
+        with self._get_connection() as conn:
+            cur = conn.cursor()
+            statistics_exist = cur.execute("SELECT EXISTS (SELECT 1 FROM review_statistics)").fetchone()[0]
+            old_first_reviews = self._get_first_reviews(cur, card_ids) if statistics_exist else None
+
+            cur.executemany(query, review_logs)
+            count = cur.rowcount
+
+            if statistics_exist:
+                self._update_review_statistics(cur, review_logs, old_first_reviews,
+                                               self._get_first_reviews(cur, card_ids))
+            else:
+                # first use of the table (e.g. a database created before it existed), aggregate everything once
+                self._rebuild_review_statistics(cur)
+            conn.commit()
         print(f"revlogs: {count} rows inserted successfully")
 
+    def get_review_statistics(self) -> List[sqlite3.Row]:
+        """
+        Return the (is_first_review, rating, review_count, duration_sum, duration_count) rows of the
+        review_statistics table, which hold the rating counts and review durations of each card's first review
+        and of all later reviews. The table is aggregated from revlogs on first use.
+        """
+        query = """
+            SELECT is_first_review, rating, review_count, duration_sum, duration_count FROM review_statistics
+        """
+        rows = self.execute_select_all(query)
+        if not rows:
+            with self._get_connection() as conn:
+                self._rebuild_review_statistics(conn.cursor())
+                conn.commit()
+            rows = self.execute_select_all(query)
+        return rows
+
+    @staticmethod
+    def _rebuild_review_statistics(cur: sqlite3.Cursor) -> None:
+        """Recompute the review_statistics table with one aggregate over revlogs."""
+        cur.execute("DELETE FROM review_statistics")
+        cur.execute("""
+            INSERT INTO review_statistics (is_first_review, rating, review_count, duration_sum, duration_count)
+            SELECT is_first_review, rating, COUNT(*), COALESCE(SUM(review_duration), 0), COUNT(review_duration)
+            FROM (
+                SELECT rating, review_duration,
+                       ROW_NUMBER() OVER (PARTITION BY card_id ORDER BY review_datetime, rowid) = 1
+                           AS is_first_review
+                FROM revlogs
+                WHERE review_datetime IS NOT NULL
+            )
+            GROUP BY is_first_review, rating
+        """)
+
+    def _get_first_reviews(self, cur: sqlite3.Cursor, card_ids: List[int]) -> dict:
+        """Return {card_id: (rowid, rating, review_duration)} of the first review of each of the cards."""
+        first_reviews = {}
+        for start in range(0, len(card_ids), self.MAX_QUERY_VARIABLES):
+            chunk = card_ids[start:start + self.MAX_QUERY_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            # the same ordering as _rebuild_review_statistics, so ties on review_datetime go to the lowest rowid
+            cur.execute(f"""
+                SELECT card_id, rowid, rating, review_duration FROM (
+                    SELECT card_id, rowid, rating, review_duration,
+                           ROW_NUMBER() OVER (PARTITION BY card_id ORDER BY review_datetime, rowid) AS review_number
+                    FROM revlogs
+                    WHERE card_id IN ({placeholders}) AND review_datetime IS NOT NULL
+                )
+                WHERE review_number = 1
+            """, chunk)
+            for card_id, rowid, rating, review_duration in cur.fetchall():
+                first_reviews[card_id] = (rowid, rating, review_duration)
+        return first_reviews
+
+    @staticmethod
+    def _update_review_statistics(cur: sqlite3.Cursor, review_logs: List[Tuple],
+                                  old_first_reviews: dict, new_first_reviews: dict) -> None:
+        """
+        Add the inserted reviews to review_statistics as later reviews, then move the reviews that became
+        (or stopped being) a card's first review between the first and later rows.
+        """
+        deltas = {}
+
+        def add(is_first_review: int, rating: int, review_duration: Optional[int], sign: int) -> None:
+            delta = deltas.setdefault((is_first_review, rating), [0, 0, 0])
+            delta[0] += sign
+            if review_duration is not None:
+                delta[1] += sign * review_duration
+                delta[2] += sign
+
+        for _, rating, review_datetime, review_duration in review_logs:
+            if review_datetime is not None:
+                add(0, rating, review_duration, 1)
+
+        for card_id, new_first_review in new_first_reviews.items():
+            old_first_review = old_first_reviews.get(card_id)
+            if old_first_review is not None and old_first_review[0] == new_first_review[0]:
+                continue
+            if old_first_review is not None:
+                add(1, old_first_review[1], old_first_review[2], -1)
+                add(0, old_first_review[1], old_first_review[2], 1)
+            add(0, new_first_review[1], new_first_review[2], -1)
+            add(1, new_first_review[1], new_first_review[2], 1)
+
+        cur.executemany("""
+            INSERT INTO review_statistics (is_first_review, rating, review_count, duration_sum, duration_count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (is_first_review, rating) DO UPDATE SET
+                review_count = review_count + excluded.review_count,
+                duration_sum = duration_sum + excluded.duration_sum,
+                duration_count = duration_count + excluded.duration_count
+        """, [(is_first_review, rating, *delta) for (is_first_review, rating), delta in deltas.items()])
+
+    def get_review_keys(self, card_ids: List[int]) -> Set[Tuple[int, int]]:
+        """
+        Return the (card_id, review_datetime) pairs of the stored reviews of the given cards, e.g. to skip
+        reviews that were already inserted.
+        """
+        keys = set()
+        for start in range(0, len(card_ids), self.MAX_QUERY_VARIABLES):
+            chunk = card_ids[start:start + self.MAX_QUERY_VARIABLES]
+            placeholders = ",".join("?" for _ in chunk)
+            query = f"SELECT card_id, review_datetime FROM revlogs WHERE card_id IN ({placeholders})"
+            keys.update(tuple(row) for row in self.execute_select_many(query, chunk))
+        return keys
+
+    def get_max_revlog_id(self, deck_id: Optional[int] = None) -> int:
+        """
+        Return the rowid of the most recently inserted review, 0 if there are none.
+        :param deck_id: If given, only consider the reviews of the cards in this deck.
+        """
+        if deck_id is None:
+            query = "SELECT COALESCE(MAX(rowid), 0) FROM revlogs"
+            return self.execute_select_all(query)[0][0]
+        query = """
+            SELECT COALESCE(MAX(rowid), 0) FROM revlogs
+            WHERE card_id IN (SELECT id FROM cards WHERE deck_id = ?)
+        """
+        return self.execute_select_many(query, (deck_id,))[0][0]
+
+    @staticmethod
+    def _reviewed_cards_filter(since_revlog_id: Optional[int], deck_id: Optional[int]) -> Tuple[str, Tuple]:
+        """Build the WHERE clause selecting the reviews of the cards matching since_revlog_id and deck_id."""
+        conditions, params = ["review_datetime IS NOT NULL"], []
+        if since_revlog_id is not None:
+            conditions.append(
+                "card_id IN (SELECT card_id FROM revlogs WHERE rowid > ? AND review_datetime IS NOT NULL)"
+            )
+            params.append(since_revlog_id)
+        if deck_id is not None:
+            conditions.append("card_id IN (SELECT id FROM cards WHERE deck_id = ?)")
+            params.append(deck_id)
+        return " AND ".join(conditions), tuple(params)
+
+    def count_reviewed_cards(self, since_revlog_id: Optional[int] = None, deck_id: Optional[int] = None) -> int:
+        """
+        Return the number of distinct cards that have at least one review.
+        :param since_revlog_id: If given, only count cards with a review whose rowid is greater.
+        :param deck_id: If given, only count the cards in this deck.
+        """
+        if since_revlog_id is None and deck_id is None:
+            query = "SELECT COUNT(DISTINCT card_id) FROM revlogs WHERE review_datetime IS NOT NULL"
+            return self.execute_select_all(query)[0][0]
+        where, params = self._reviewed_cards_filter(since_revlog_id, deck_id)
+        query = f"SELECT COUNT(DISTINCT card_id) FROM revlogs WHERE {where}"
+        return self.execute_select_many(query, params)[0][0]
+
+    def get_reviewed_deck_ids(self) -> List[int]:
+        """Return the ids of the decks that have at least one reviewed card, in ascending order."""
+        query = """
+            SELECT DISTINCT cards.deck_id FROM cards
+            WHERE EXISTS (SELECT 1 FROM revlogs WHERE revlogs.card_id = cards.id AND review_datetime IS NOT NULL)
+            ORDER BY cards.deck_id
+        """
+        return [row[0] for row in self.execute_select_all(query)]
+
+    def stream_reviews_ordered_by_card(self, since_revlog_id: Optional[int] = None, deck_id: Optional[int] = None,
+                                       cards_per_page: int = 2000) -> Iterator[sqlite3.Row]:
+        """
+        Yield (card_id, rating, review_datetime, review_duration, revlog_id) rows ordered by (card_id, review_datetime),
+        so that each card's history arrives contiguously and in order without loading the whole table.
+        The rows are read in pages of cards_per_page cards, each read in full on its own connection, so no read
+        is open between two pages and the caller can write to the database while consuming the rows.
+        :param since_revlog_id: If given, only yield the full histories of cards with a review whose rowid is greater.
+        :param deck_id: If given, only yield the histories of the cards in this deck.
+        """
+        where, params = self._reviewed_cards_filter(since_revlog_id, deck_id)
+        # the last card id of every page, resolved once so that each page is a plain range of card ids
+        page_ends_query = f"""
+            SELECT card_id FROM (
+                SELECT card_id, ROW_NUMBER() OVER (ORDER BY card_id) AS card_number, COUNT(*) OVER () AS num_cards
+                FROM (SELECT DISTINCT card_id FROM revlogs WHERE {where})
+            )
+            WHERE card_number % ? = 0 OR card_number = num_cards
+            ORDER BY card_id
+        """
+        page_query = f"""
+            SELECT card_id, rating, review_datetime, review_duration, rowid FROM revlogs
+            WHERE {where} AND card_id > ? AND card_id <= ?
+            ORDER BY card_id, review_datetime
+        """
+        page_ends = [row[0] for row in self.execute_select_many(page_ends_query, (*params, cards_per_page))]
+
+        last_card_id = -2 ** 63
+        for page_end in page_ends:
+            yield from self.execute_select_many(page_query, (*params, last_card_id, page_end))
+            last_card_id = page_end
+
@@ -40,6 +40,32 @@ CREATE TABLE IF NOT EXISTS metadata (
     new_cards_reviewed INTEGER NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS review_statistics (
+    is_first_review INTEGER NOT NULL,         -- 1 for each card's first review, 0 for later reviews
+    rating          INTEGER NOT NULL,
+    review_count    INTEGER NOT NULL,
+    duration_sum    INTEGER NOT NULL,         -- Sum of the non-NULL review durations in milliseconds
+    duration_count  INTEGER NOT NULL,         -- Number of reviews with a non-NULL review duration
+    PRIMARY KEY (is_first_review, rating)
+);
+
+CREATE TABLE IF NOT EXISTS fsrs_parameters (
+    id                      INTEGER PRIMARY KEY,
+    parameters              TEXT NOT NULL,      -- JSON list of the optimized FSRS parameters
+    revlog_high_water_mark  INTEGER NOT NULL,   -- revlogs.rowid of the last review the parameters were trained on
+    loss                    REAL,               -- Log loss of the parameters on the reviews they were trained on
+    updated_at              INTEGER NOT NULL    -- Epoch milliseconds
+);
+
+CREATE TABLE IF NOT EXISTS deck_fsrs_parameters (
+    deck_id                 INTEGER PRIMARY KEY,
+    parameters              TEXT NOT NULL,      -- JSON list of the FSRS parameters optimized on the deck's reviews
+    revlog_high_water_mark  INTEGER NOT NULL,   -- revlogs.rowid of the deck's last review the parameters were trained on
+    loss                    REAL,               -- Log loss of the parameters on the reviews they were trained on
+    updated_at              INTEGER NOT NULL,   -- Epoch milliseconds
+    FOREIGN KEY (deck_id) REFERENCES decks (id)
+);
+
 CREATE INDEX IF NOT EXISTS idx_contents_id ON contents (id);
 CREATE INDEX IF NOT EXISTS idx_cards_sched ON cards (deck_id, state, due);
-CREATE INDEX IF NOT EXISTS idx_revlog_cid on revlogs (card_id);
+CREATE INDEX IF NOT EXISTS idx_revlog_cid_time on revlogs (card_id, review_datetime);
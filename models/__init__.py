@@ -2,3 +2,5 @@ from .card import *
 from .review_log import *
 from .deck import *
 from .content import *
+from .due_histogram import *
+from .due_queue import *
@@ -0,0 +1,70 @@
+"""
+fsrs.models.due_histogram
+---------
+
+This module defines the DueHistogram class.
+
+Classes:
+    DueHistogram: The number of cards due on each day, used to load-balance fuzzed intervals.
+"""
+
+from __future__ import annotations
+
+from utils import MILLIS_PER_DAY
+
+
+class DueHistogram:
+    """
+    Counts how many (non-new) cards are due on each day.
+
+    Days are UTC day indices, i.e. `due // MILLIS_PER_DAY` for a due date in epochmillis.
+    The histogram is built once from the cards table and then updated incrementally
+    as cards are rescheduled, so lookups never hit the database.
+    """
+
+    def __init__(self, counts: dict[int, int] | None = None) -> None:
+        self._counts: dict[int, int] = dict(counts) if counts else {}
+
+    @classmethod
+    def from_day_counts(cls, rows) -> DueHistogram:
+        """
+        Creates a DueHistogram from (day, count) rows, e.g. the result of a GROUP BY query over cards.due.
+        """
+        return cls({int(day): int(count) for day, count in rows})
+
+    @staticmethod
+    def day_of(due: int) -> int:
+        return due // MILLIS_PER_DAY
+
+    def count(self, day: int) -> int:
+        return self._counts.get(day, 0)
+
+    def counts_between(self, first_day: int, last_day: int) -> list[int]:
+        """Returns the counts of every day from first_day to last_day (inclusive)."""
+        get = self._counts.get
+        return [get(day, 0) for day in range(first_day, last_day + 1)]
+
+    def day_counts(self) -> dict[int, int]:
+        """Returns a copy of the {day: count} counts, e.g. to rebuild the histogram in another process."""
+        return dict(self._counts)
+
+    def add(self, due: int) -> None:
+        day = due // MILLIS_PER_DAY
+        self._counts[day] = self._counts.get(day, 0) + 1
+
+    def remove(self, due: int) -> None:
+        day = due // MILLIS_PER_DAY
+        count = self._counts.get(day, 0) - 1
+        if count > 0:
+            self._counts[day] = count
+        else:
+            self._counts.pop(day, None)
+
+    def clear(self) -> None:
+        self._counts.clear()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+__all__ = ["DueHistogram"]
@@ -0,0 +1,63 @@
+"""
+fsrs.models.due_queue
+---------
+
+This module defines the DueQueue class.
+
+Classes:
+    DueQueue: A priority queue of cards ordered by due date.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable, Iterator
+from itertools import count
+
+from models.card import Card
+
+
+class DueQueue:
+    """
+    The cards of one session queue, popped in order of due date.
+
+    Backed by a binary heap of (due, sequence number, card) entries, so push and pop are O(log n).
+    The sequence number breaks ties: cards due at the same time are popped in the order they were pushed,
+    and cards themselves are never compared.
+    """
+
+    def __init__(self, cards: Iterable[Card] = ()) -> None:
+        self._sequence = count()
+        self._heap: list[tuple[int, int, Card]] = [(card.due, next(self._sequence), card) for card in cards]
+        heapq.heapify(self._heap)
+
+    def push(self, card: Card) -> None:
+        heapq.heappush(self._heap, (card.due, next(self._sequence), card))
+
+    def pop(self) -> Card:
+        """Removes and returns the card due first. Raises IndexError if the queue is empty."""
+        return heapq.heappop(self._heap)[2]
+
+    def peek(self) -> Card:
+        """Returns the card due first without removing it. Raises IndexError if the queue is empty."""
+        return self._heap[0][2]
+
+    def smallest(self, n: int) -> list[Card]:
+        """Returns the n cards due first, in the order they'd be popped, without removing them. O(len log n)."""
+        return [entry[2] for entry in heapq.nsmallest(n, self._heap)]
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self) -> Iterator[Card]:
+        """Iterates over the cards in no particular order."""
+        return (entry[2] for entry in self._heap)
+
+    def __repr__(self) -> str:
+        return f"DueQueue({len(self._heap)} cards)"
+
+
+__all__ = ["DueQueue"]
@@ -1,3 +1,13 @@
 from .session_service import SessionService
-from .optimizer import Optimizer
 from .scheduler import Scheduler
+from .rescheduler import Rescheduler
+from .scheduler_cache import SchedulerCache
+
+
+def __getattr__(name):
+    # the optimizer imports torch when it's installed, so it's only loaded once it's used
+    if name == "Optimizer":
+        from .optimizer import Optimizer
+
+        return Optimizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,162 @@
+"""
+fsrs.card_writer
+---------
+
+This module defines the CardWriter class.
+
+Classes:
+    CardWriter: Writes the cards changed during a session back to the database from a background thread.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from db import CardCRUD
+from models.card import Card
+
+if TYPE_CHECKING:
+    from services.review_journal import ReviewJournal
+
+
+class CardWriter:
+    """
+    Write-behind of the scheduling columns of the cards changed during a session.
+
+    Answered cards are marked dirty, keeping only the latest state of each card, and a background thread
+    writes them in one transaction once max_pending cards are dirty or the oldest dirty card has waited
+    max_delay seconds. flush writes them right away, e.g. at session end. The number of rows written thus
+    follows the number of cards reviewed, not the size of the session queues.
+
+    With a journal, each dirty card carries the journal sequence number of the answer that changed it, and a
+    flush first waits until those answers are on disk: a card's new state never reaches the database while
+    the review that led to it could still be lost in a crash.
+
+    Attributes:
+        max_pending: The number of dirty cards that triggers a flush.
+        max_delay: The number of seconds a dirty card waits at most before it's flushed.
+    """
+
+    def __init__(
+        self,
+        card_crud: CardCRUD | None = None,
+        max_pending: int = 50,
+        max_delay: float = 30.0,
+        journal: ReviewJournal | None = None,
+    ) -> None:
+        if max_pending < 1 or max_delay <= 0:
+            raise ValueError("max_pending and max_delay must be positive")
+
+        self.card_crud = card_crud if card_crud is not None else CardCRUD()
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.journal = journal
+
+        # card id -> (state, step, stability, difficulty, due, last_review, id) row of the card's latest state
+        self._pending: dict[int, tuple] = {}
+        self._first_dirty_at: float | None = None
+        # the journal sequence number of the latest answer among the dirty cards
+        self._pending_sequence = 0
+        self._lock = threading.Lock()
+        # held for a whole flush, so that an older snapshot of a card is never written after a newer one
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def card_row(card: Card) -> tuple:
+        """The card's (state, step, stability, difficulty, due, last_review, id) CardCRUD.update_many_card_rows row."""
+        card_dict = card.to_dict()
+        return (card_dict["state"], card_dict["step"], card_dict["stability"], card_dict["difficulty"],
+                card_dict["due"], card_dict["last_review"], card_dict["id"])
+
+    def mark_dirty(self, card: Card, journal_sequence: int = 0) -> None:
+        """
+        Records the card's current state to be written, replacing any pending state of the same card.
+        journal_sequence is the number ReviewJournal.append returned for the answer, if it was journaled.
+        """
+        row = self.card_row(card)
+
+        with self._lock:
+            # the first dirty card starts the thread's max_delay countdown
+            wake = not self._pending
+            if wake:
+                self._first_dirty_at = time.monotonic()
+            self._pending[card.id] = row
+            self._pending_sequence = max(self._pending_sequence, journal_sequence)
+            wake = wake or len(self._pending) >= self.max_pending
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="CardWriter", daemon=True)
+                self._thread.start()
+
+        if wake:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Writes every dirty card in one transaction and returns their number."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                sequence, self._pending_sequence = self._pending_sequence, 0
+                self._first_dirty_at = None
+            if not pending:
+                return 0
+
+            try:
+                if self.journal is not None and sequence:
+                    self.journal.sync_until(sequence)
+                self.card_crud.update_many_card_rows(list(pending.values()))
+            except (sqlite3.Error, OSError):
+                # keep the unwritten states for the next flush, unless the card changed again meanwhile
+                with self._lock:
+                    for card_id, row in pending.items():
+                        self._pending.setdefault(card_id, row)
+                    self._pending_sequence = max(self._pending_sequence, sequence)
+                    if self._first_dirty_at is None:
+                        self._first_dirty_at = time.monotonic()
+                raise
+            return len(pending)
+
+    def close(self) -> None:
+        """Stops the background thread and writes the remaining dirty cards."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                first_dirty_at = self._first_dirty_at
+            timeout = None if first_dirty_at is None else max(first_dirty_at + self.max_delay - time.monotonic(), 0)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+            with self._lock:
+                if self._closed:
+                    return
+                due = self._pending and (
+                    len(self._pending) >= self.max_pending
+                    or time.monotonic() - self._first_dirty_at >= self.max_delay
+                )
+            if due:
+                try:
+                    self.flush()
+                except (sqlite3.Error, OSError) as e:
+                    print(f"Error occurred while writing cards: {e}")
+
+
+__all__ = ["CardWriter"]
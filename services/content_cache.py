@@ -0,0 +1,112 @@
+"""
+fsrs.content_cache
+---------
+
+This module defines the ContentCache class.
+
+Classes:
+    ContentCache: A bounded LRU cache of card contents, filled lazily in pages and prefetched in the background.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from db import ContentCRUD
+from models.content import Content
+
+
+class ContentCache:
+    """
+    The contents of the cards being studied, keyed by content id and bounded to the most recently used ones.
+
+    get loads a missing content on the spot; prefetch loads a page of contents in the background, one query
+    per page, so that the contents of the next cards are usually cached before they're shown. The content
+    returned last by get, i.e. the one being shown, is never evicted, however much is prefetched after it.
+    The cache is meant to be shared by every session and deck.
+
+    Attributes:
+        capacity: The maximum number of contents kept.
+        page_size: The maximum number of contents loaded by one query.
+    """
+
+    def __init__(self, content_crud: ContentCRUD | None = None, capacity: int = 2000, page_size: int = 50) -> None:
+        if capacity < 1 or page_size < 1:
+            raise ValueError("capacity and page_size must be positive")
+
+        self.content_crud = content_crud if content_crud is not None else ContentCRUD()
+        self.capacity = capacity
+        self.page_size = page_size
+
+        self._contents: OrderedDict[int, Content] = OrderedDict()
+        # content ids queued for or being prefetched
+        self._pending: set[int] = set()
+        # the content returned last by get
+        self._current_id: int | None = None
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def __contains__(self, content_id: int) -> bool:
+        return content_id in self._contents
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def get(self, content_id: int) -> Content | None:
+        """Returns the content, loading it if it isn't cached. None if there's no such content."""
+        with self._lock:
+            self._current_id = content_id
+            content = self._contents.get(content_id)
+            if content is not None:
+                self._contents.move_to_end(content_id)
+                return content
+
+        self._load([content_id])
+        with self._lock:
+            return self._contents.get(content_id)
+
+    def prefetch(self, content_ids: Iterable[int]) -> None:
+        """Loads the contents that aren't cached or already being loaded in the background, page by page."""
+        with self._lock:
+            missing = [
+                content_id for content_id in dict.fromkeys(content_ids)
+                if content_id not in self._contents and content_id not in self._pending
+            ]
+            if not missing:
+                return
+            self._pending.update(missing)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ContentCache")
+
+        for i in range(0, len(missing), self.page_size):
+            self._executor.submit(self._load_page, missing[i:i + self.page_size])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._contents.clear()
+
+    def _load_page(self, content_ids: list[int]) -> None:
+        try:
+            self._load(content_ids)
+        except Exception as e:
+            print(f"Error occurred while prefetching contents: {e}")
+        finally:
+            with self._lock:
+                self._pending.difference_update(content_ids)
+
+    def _load(self, content_ids: list[int]) -> None:
+        contents = [Content(*row) for row in self.content_crud.get_many_contents_by_ids(content_ids)]
+        with self._lock:
+            for content in contents:
+                self._contents[content.id] = content
+                self._contents.move_to_end(content.id)
+            while len(self._contents) > self.capacity:
+                content_id, content = self._contents.popitem(last=False)
+                if content_id == self._current_id:
+                    self._contents[content_id] = content
+
+
+__all__ = ["ContentCache"]
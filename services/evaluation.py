@@ -0,0 +1,163 @@
+"""
+fsrs.evaluation
+---------
+
+This module scores FSRS parameters on review histories.
+
+Classes:
+    CalibrationBin: The predicted and observed recall rates of the reviews in one retrievability bin.
+    EvaluationResult: The log loss, RMSE and calibration of one parameter vector.
+
+Functions:
+    evaluation_statistics: The additive statistics of one parameter vector on some rows of the histories.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import NamedTuple
+
+import numpy as np
+
+from services.numpy_optimizer import ReviewHistoryArrays, ArrayKernel
+
+# the number of equal-width predicted retrievability bins of the calibration
+NUM_CALIBRATION_BINS = 20
+
+# the same clamping of the log terms as torch's binary_cross_entropy, so that the log loss equals the training loss
+_MIN_LOG = -100.0
+
+
+class CalibrationBin(NamedTuple):
+    """
+    The reviews whose predicted retrievability falls in [lower, upper).
+
+    Attributes:
+        lower: The lower edge of the bin.
+        upper: The upper edge of the bin (inclusive for the last bin).
+        count: The number of reviews in the bin.
+        mean_predicted: The mean predicted retrievability of the reviews, nan if there are none.
+        mean_observed: The fraction of the reviews that were recalled, nan if there are none.
+    """
+
+    lower: float
+    upper: float
+    count: int
+    mean_predicted: float
+    mean_observed: float
+
+
+class EvaluationResult(NamedTuple):
+    """
+    The predictive performance of one parameter vector on the loss-bearing reviews of some histories.
+
+    Attributes:
+        log_loss: The mean binary cross-entropy of the predicted retrievabilities.
+        rmse: The root mean squared error between the predicted retrievabilities and the recalls.
+        rmse_bins: The root mean squared error between the mean predicted and observed recall of the
+            calibration bins, weighted by the number of reviews in each bin.
+        calibration: The calibration bins.
+        num_reviews: The number of reviews evaluated.
+    """
+
+    log_loss: float
+    rmse: float
+    rmse_bins: float
+    calibration: list[CalibrationBin]
+    num_reviews: int
+
+    @classmethod
+    def from_statistics(cls, statistics: np.ndarray) -> EvaluationResult:
+        """Creates the result from the (summed) output of evaluation_statistics."""
+
+        log_loss_sum, squared_error_sum, num_reviews = statistics[:3]
+        bin_counts, predicted_sums, observed_sums = statistics[3:].reshape(3, -1)
+        num_bins = len(bin_counts)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_predicted = predicted_sums / bin_counts
+            mean_observed = observed_sums / bin_counts
+
+        occupied = bin_counts > 0
+        num_reviews = int(num_reviews)
+        if num_reviews == 0:
+            log_loss = rmse = rmse_bins = float("nan")
+        else:
+            log_loss = log_loss_sum / num_reviews
+            rmse = float(np.sqrt(squared_error_sum / num_reviews))
+            rmse_bins = float(
+                np.sqrt(
+                    np.sum(
+                        bin_counts[occupied]
+                        * (mean_predicted[occupied] - mean_observed[occupied]) ** 2
+                    )
+                    / num_reviews
+                )
+            )
+
+        edges = np.linspace(0.0, 1.0, num_bins + 1)
+        calibration = [
+            CalibrationBin(
+                lower=float(edges[i]),
+                upper=float(edges[i + 1]),
+                count=int(bin_counts[i]),
+                mean_predicted=float(mean_predicted[i]),
+                mean_observed=float(mean_observed[i]),
+            )
+            for i in range(num_bins)
+        ]
+
+        return cls(
+            log_loss=float(log_loss),
+            rmse=rmse,
+            rmse_bins=rmse_bins,
+            calibration=calibration,
+            num_reviews=num_reviews,
+        )
+
+
+def evaluation_statistics(
+    review_histories: ReviewHistoryArrays,
+    parameters: Sequence[float],
+    rows: np.ndarray | None = None,
+    num_bins: int = NUM_CALIBRATION_BINS,
+) -> np.ndarray:
+    """
+    Replays the histories of `rows` (every card by default) under `parameters` in one vectorized pass and returns
+    the sums EvaluationResult.from_statistics needs: [log loss, squared error, number of reviews, then the review
+    count, predicted retrievability and recalls of each calibration bin].
+
+    The statistics of disjoint rows add up, so the histories can be evaluated in shards.
+    """
+
+    if rows is None:
+        rows = np.arange(len(review_histories))
+
+    retrievabilities = review_histories.retrievabilities(
+        ArrayKernel(np.array(parameters, dtype=np.float64)), rows=rows
+    )
+    num_steps = retrievabilities.shape[1]
+    loss_mask = review_histories.loss_mask[rows, :num_steps]
+
+    predicted = retrievabilities[loss_mask]
+    observed = review_histories.recall[rows, :num_steps][loss_mask]
+
+    with np.errstate(divide="ignore"):
+        log_loss = -np.sum(
+            observed * np.maximum(np.log(predicted), _MIN_LOG)
+            + (1 - observed) * np.maximum(np.log(1 - predicted), _MIN_LOG)
+        )
+    squared_error = np.sum((predicted - observed) ** 2)
+
+    bins = np.minimum((predicted * num_bins).astype(np.int64), num_bins - 1)
+    return np.concatenate(
+        [
+            [log_loss, squared_error, len(predicted)],
+            np.bincount(bins, minlength=num_bins),
+            np.bincount(bins, weights=predicted, minlength=num_bins),
+            np.bincount(bins, weights=observed, minlength=num_bins),
+        ]
+    ).astype(np.float64)
+
+
+__all__ = ["CalibrationBin", "EvaluationResult", "evaluation_statistics"]
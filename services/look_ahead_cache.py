@@ -0,0 +1,106 @@
+"""
+fsrs.look_ahead_cache
+---------
+
+This module defines the LookAheadCache class.
+
+Classes:
+    LookAheadCache: The cards of a deck that fall due after the session cutoff, preloaded in the background.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Collection
+
+from db import CardCRUD
+from models.card import Card, State
+from models.due_queue import DueQueue
+from utils import MILLIS_PER_DAY
+
+
+class LookAheadCache:
+    """
+    Holds the cards of a deck due in a rolling window after the session cutoff.
+
+    Each window runs from the end of the previous one (or the cutoff) to the next day boundary and is loaded
+    by a background thread. promote hands over the cards that have become due as the cutoff advances without
+    ever waiting for a load: cards of a window that's still loading are handed over by a later call.
+
+    A card is only ever held by either the cache or the session. The ids the session holds when a window
+    starts loading are excluded from it, and the database state of the other cards can't change until the
+    session takes them over.
+    """
+
+    def __init__(self, card_crud: CardCRUD | None = None) -> None:
+        self.card_crud = card_crud if card_crud is not None else CardCRUD()
+
+        self._cards = DueQueue()
+        self._loaded_until: int | None = None
+        self._lock = threading.Lock()
+        self._loader: threading.Thread | None = None
+        # bumped by clear, so that the results of a load started before are dropped
+        self._generation = 0
+
+    @property
+    def loaded_until(self) -> int | None:
+        """The end (exclusive, in epoch millis) of the last window requested, None before the first one."""
+        return self._loaded_until
+
+    @property
+    def is_loading(self) -> bool:
+        return self._loader is not None and self._loader.is_alive()
+
+    def preload(self, deck_id: int, from_epoch_millis: int, exclude_ids: Collection[int]) -> None:
+        """
+        Starts loading the cards due in [from_epoch_millis, next day boundary) in the background,
+        leaving out the cards in exclude_ids.
+        """
+        until_epoch_millis = (from_epoch_millis // MILLIS_PER_DAY + 1) * MILLIS_PER_DAY
+        self._loaded_until = until_epoch_millis
+        exclude_ids = frozenset(exclude_ids)
+        self._loader = threading.Thread(
+            target=self._load,
+            args=(deck_id, from_epoch_millis, until_epoch_millis, exclude_ids, self._generation),
+            name="LookAheadCache",
+            daemon=True,
+        )
+        self._loader.start()
+
+    def promote(self, cutoff_epoch_millis: int) -> list[Card]:
+        """Removes and returns the loaded cards due at or before the cutoff."""
+        cards = []
+        with self._lock:
+            while self._cards and self._cards.peek().due <= cutoff_epoch_millis:
+                cards.append(self._cards.pop())
+        return cards
+
+    def clear(self) -> None:
+        """Drops the loaded cards, the next preload starts a new window. A load in progress is discarded."""
+        with self._lock:
+            self._cards = DueQueue()
+            self._loaded_until = None
+            self._loader = None
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def _load(self, deck_id: int, from_epoch_millis: int, until_epoch_millis: int,
+              exclude_ids: frozenset[int], generation: int) -> None:
+        rows = self.card_crud.get_due_cards_between(
+            deck_id=deck_id,
+            new_state_int=State.New,
+            from_epoch_millis=from_epoch_millis,
+            until_epoch_millis=until_epoch_millis,
+        )
+        cards = [card for card in (Card(*row) for row in rows) if card.id not in exclude_ids]
+
+        with self._lock:
+            if generation != self._generation:
+                return  # cleared meanwhile
+            for card in cards:
+                self._cards.push(card)
+
+
+__all__ = ["LookAheadCache"]
@@ -0,0 +1,757 @@
+"""
+fsrs.numpy_optimizer
+---------
+
+This module defines the torch-free training backend of the Optimizer.
+
+Classes:
+    ReviewHistoryArrays: Card review histories packed into padded [cards x steps] arrays.
+    ArrayKernel: The FSRS memory-state equations on NumPy arrays, with their gradients.
+    ArrayTrainer: Adam with cosine annealing and parameter clamping on top of ArrayKernel.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import pickle
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+
+from models.review_log import Rating
+from services.scheduler import (
+    LOWER_BOUNDS_PARAMETERS,
+    UPPER_BOUNDS_PARAMETERS,
+    STABILITY_MIN,
+    MIN_DIFFICULTY,
+    MAX_DIFFICULTY,
+)
+from utils import MILLIS_PER_DAY
+
+NUM_PARAMETERS = len(LOWER_BOUNDS_PARAMETERS)
+
+# unit vectors, row k is the gradient of parameter k with respect to the parameters
+_UNIT = np.eye(NUM_PARAMETERS)
+
+# torch's binary_cross_entropy clamps the log terms and the gradient's denominator to these
+_MIN_LOG = -100.0
+_BCE_EPSILON = 1e-12
+
+
+class ReviewHistoryArrays:
+    """
+    Card review histories packed into padded [cards x steps] arrays for batched training.
+
+    Each card's history is truncated to its first `seq_len` reviews. Padding steps are masked out, so the
+    FSRS recurrence can be run one time-step at a time across many cards at once. Both training backends
+    read these arrays: the torch backend wraps the rows of a mini-batch in tensors, the NumPy backend
+    replays them with ArrayKernel.
+
+    Attributes:
+        card_ids: The card id of each row.
+        review_datetime: The review times in epochmillis, 0 in padding steps.
+        rating: The rating of each review, Good in padding steps.
+        elapsed_days: The whole days since the card's previous review, 0 in the first and padding steps.
+        recall: 1.0 if the review was recalled (not rated Again) and 0.0 otherwise.
+        lengths: The number of reviews in each row.
+        loss_starts: The index of the first review of each row that may count towards the loss.
+        update_mask: True for the reviews that update a card's memory state (every review but the first).
+        long_term_mask: True for the updates that use the long-term stability equation (non-same-day reviews),
+            the others use the short-term one.
+        loss_mask: True for the reviews that count towards the loss (non-same-day reviews from each row's loss start).
+        num_loss_reviews: The number of loss-bearing reviews in each row.
+    """
+
+    def __init__(
+        self,
+        card_ids: list[int],
+        review_datetime: np.ndarray,
+        rating: np.ndarray,
+        lengths: np.ndarray,
+        loss_starts: np.ndarray | None = None,
+    ) -> None:
+        """
+        Wraps already padded [cards x steps] review time and rating arrays along with each row's length.
+        Reviews before a row's loss start (0 by default) are replayed but don't count towards the loss.
+        Use from_revlogs_train or from_histories to build them.
+        """
+
+        num_cards = len(card_ids)
+        num_steps = int(lengths.max()) if num_cards else 0
+        review_datetime = review_datetime[:num_cards, :num_steps]
+        rating = rating[:num_cards, :num_steps]
+        lengths = lengths[:num_cards]
+        loss_starts = (
+            np.zeros(num_cards, dtype=np.int64)
+            if loss_starts is None
+            else loss_starts[:num_cards]
+        )
+
+        steps = np.arange(num_steps)
+        valid = steps < lengths[:, None]
+        update_mask = valid & (steps > 0)
+
+        elapsed_days = np.zeros((num_cards, num_steps), dtype=np.int64)
+        elapsed_days[:, 1:] = np.diff(review_datetime, axis=1) // MILLIS_PER_DAY
+        elapsed_days[~update_mask] = 0
+        long_term_mask = update_mask & (elapsed_days > 0)
+        # the loss start only weighs the loss, the reviews before it still update the memory states as usual
+        loss_mask = long_term_mask & (steps >= loss_starts[:, None])
+
+        self.card_ids = list(card_ids)
+        self.review_datetime = review_datetime
+        self.rating = rating
+        self.elapsed_days = elapsed_days.astype(np.float64)
+        # if the card was rated Again, it was not recalled
+        self.recall = (valid & (rating != Rating.Again)).astype(np.float64)
+        self.lengths = lengths
+        self.loss_starts = loss_starts
+        self.update_mask = update_mask
+        self.long_term_mask = long_term_mask
+        self.loss_mask = loss_mask
+        self.num_loss_reviews = loss_mask.sum(axis=1)
+
+    @classmethod
+    def from_revlogs_train(
+        cls, revlogs_train: dict, seq_len: int
+    ) -> ReviewHistoryArrays:
+        """Packs the `{card_id: [[[review_datetime, rating, review_duration], recall], ...]}` training format."""
+
+        return cls.from_histories(
+            (
+                (card_id, [(review[0][0], review[0][1]) for review in reviews[:seq_len]], 0)
+                for card_id, reviews in revlogs_train.items()
+            ),
+            num_cards=len(revlogs_train),
+            seq_len=seq_len,
+        )
+
+    @classmethod
+    def from_histories(
+        cls,
+        histories: Iterable[tuple[int, list[tuple[int, int]], int]],
+        num_cards: int,
+        seq_len: int,
+    ) -> ReviewHistoryArrays:
+        """
+        Packs (card_id, [(review_datetime, rating), ...], loss_start) histories, each ordered by review_datetime,
+        into preallocated arrays one history at a time, so `histories` can be a stream.
+
+        `num_cards` is the expected number of histories; the arrays grow if more arrive.
+        """
+
+        card_ids = []
+        review_datetime = np.zeros((num_cards, seq_len), dtype=np.int64)
+        rating = np.full((num_cards, seq_len), int(Rating.Good), dtype=np.int64)
+        lengths = np.zeros(num_cards, dtype=np.int64)
+        loss_starts = np.zeros(num_cards, dtype=np.int64)
+
+        for i, (card_id, reviews, loss_start) in enumerate(histories):
+            if i == len(lengths):
+                # more histories than expected, double the arrays
+                num_rows = max(len(lengths), 1)
+                review_datetime = np.concatenate(
+                    [review_datetime, np.zeros((num_rows, seq_len), dtype=np.int64)]
+                )
+                rating = np.concatenate(
+                    [
+                        rating,
+                        np.full((num_rows, seq_len), int(Rating.Good), dtype=np.int64),
+                    ]
+                )
+                lengths = np.concatenate([lengths, np.zeros(num_rows, dtype=np.int64)])
+                loss_starts = np.concatenate(
+                    [loss_starts, np.zeros(num_rows, dtype=np.int64)]
+                )
+
+            reviews = reviews[:seq_len]
+            k = len(reviews)
+            card_ids.append(card_id)
+            if k:
+                review_datetime[i, :k], rating[i, :k] = zip(*reviews)
+            lengths[i] = k
+            loss_starts[i] = loss_start
+
+        return cls(card_ids, review_datetime, rating, lengths, loss_starts)
+
+    def __len__(self) -> int:
+        return len(self.card_ids)
+
+    def mini_batches(self, card_order: list[int], batch_size: int) -> list[np.ndarray]:
+        """
+        Splits rows, taken in `card_order`, into mini-batches of whole cards holding about `batch_size`
+        loss-bearing reviews each. A card goes to the mini-batch in which its first loss-bearing review falls.
+        """
+
+        order = np.asarray(card_order, dtype=np.int64)
+        counts = self.num_loss_reviews[order]
+        start = np.cumsum(counts) - counts
+        batch_index = (start // batch_size)[counts > 0]
+        order = order[counts > 0]
+
+        num_batches = int(batch_index[-1]) + 1 if len(order) else 0
+        batch_sizes = np.bincount(batch_index, minlength=num_batches)
+        return [
+            batch
+            for batch in np.split(order, np.cumsum(batch_sizes)[:-1])
+            if len(batch)
+        ]
+
+    def split_by_time(
+        self, test_start: int
+    ) -> tuple[ReviewHistoryArrays, ReviewHistoryArrays]:
+        """
+        Splits the histories at the epochmillis `test_start` into a training set holding the reviews before it
+        and a test set in which only the reviews from `test_start` on count towards the loss. The test set keeps
+        the earlier reviews so that the memory states are replayed from each card's first review. Rows without
+        any review on their side of the split are dropped.
+        """
+
+        steps = np.arange(self.review_datetime.shape[1])
+        valid = steps < self.lengths[:, None]
+        train_lengths = (valid & (self.review_datetime < test_start)).sum(axis=1)
+
+        def _select(rows: np.ndarray, lengths: np.ndarray, loss_starts: np.ndarray):
+            in_history = steps < lengths[rows, None]
+            return type(self)(
+                [self.card_ids[row] for row in rows],
+                np.where(in_history, self.review_datetime[rows], 0),
+                np.where(in_history, self.rating[rows], int(Rating.Good)),
+                lengths[rows],
+                loss_starts[rows],
+            )
+
+        train = _select(
+            np.flatnonzero(train_lengths > 0), train_lengths, self.loss_starts
+        )
+        test = _select(
+            np.flatnonzero(self.lengths > train_lengths),
+            self.lengths,
+            np.maximum(train_lengths, self.loss_starts),
+        )
+        return train, test
+
+    def retrievabilities(
+        self, kernel: ArrayKernel, rows: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Runs the FSRS recurrence over the histories of `rows` (every card by default) like replay_loss, and returns
+        the [rows x steps] predicted retrievability of every review. Only the entries in loss_mask are predictions
+        of a recall; the others are 1.0 or belong to same-day reviews.
+        """
+
+        if rows is None:
+            rows = np.arange(len(self))
+        num_steps = int(self.lengths[rows].max()) if len(rows) else 0
+
+        rating = self.rating[rows, :num_steps]
+        elapsed_days = self.elapsed_days[rows, :num_steps]
+        update_mask = self.update_mask[rows, :num_steps]
+        long_term_mask = self.long_term_mask[rows, :num_steps]
+
+        retrievabilities = np.ones((len(rows), num_steps))
+        if num_steps == 0:
+            return retrievabilities
+
+        stability = kernel.initial_stabilities[rating[:, 0] - 1]
+        difficulty = kernel.initial_difficulties[rating[:, 0] - 1]
+        for t in range(1, num_steps):
+            step_rating = rating[:, t]
+
+            retrievability, _ = kernel.retrievability(elapsed_days[:, t], stability, None)
+            long_term_stability, _ = kernel.next_stability(
+                difficulty, None, stability, None, retrievability, None, step_rating
+            )
+            short_term_stability, _ = kernel.short_term_stability(
+                stability, None, step_rating
+            )
+            next_difficulty, _ = kernel.next_difficulty(difficulty, None, step_rating)
+
+            retrievabilities[:, t] = retrievability
+            next_stability = np.where(
+                long_term_mask[:, t], long_term_stability, short_term_stability
+            )
+            stability = np.where(update_mask[:, t], next_stability, stability)
+            difficulty = np.where(update_mask[:, t], next_difficulty, difficulty)
+
+        return retrievabilities
+
+    def replay_loss(
+        self,
+        kernel: ArrayKernel,
+        rows: np.ndarray | None = None,
+        gradient: bool = False,
+    ) -> tuple[float, np.ndarray | None, int]:
+        """
+        Runs the FSRS recurrence over the histories of `rows` (every card by default), one time-step at a time,
+        following the same rules as Scheduler.review_card.
+
+        With `gradient`, the derivatives of the memory states with respect to the parameters are carried along
+        the recurrence (forward-mode differentiation), which for 21 parameters and short histories is cheaper
+        than recording the steps for a backward pass.
+
+        Returns the summed binary cross-entropy of the predicted retrievabilities, its gradient with respect to
+        the kernel's parameters (None without `gradient`) and the number of reviews it was summed over.
+        """
+
+        if rows is None:
+            rows = np.arange(len(self))
+        num_steps = int(self.lengths[rows].max()) if len(rows) else 0
+
+        rating = self.rating[rows, :num_steps]
+        elapsed_days = self.elapsed_days[rows, :num_steps]
+        recall = self.recall[rows, :num_steps]
+        update_mask = self.update_mask[rows, :num_steps]
+        long_term_mask = self.long_term_mask[rows, :num_steps]
+        loss_mask = self.loss_mask[rows, :num_steps]
+        loss_weight = loss_mask.astype(np.float64)
+
+        # the cards' first reviews
+        first_rating = rating[:, 0] - 1 if num_steps else np.zeros(0, dtype=np.int64)
+        stability = kernel.initial_stabilities[first_rating]
+        difficulty = kernel.initial_difficulties[first_rating]
+        d_stability = kernel.d_initial_stabilities[first_rating] if gradient else None
+        d_difficulty = kernel.d_initial_difficulties[first_rating] if gradient else None
+
+        loss = 0.0
+        loss_gradient = np.zeros(NUM_PARAMETERS) if gradient else None
+        for t in range(1, num_steps):
+            step_rating = rating[:, t]
+
+            retrievability, d_retrievability = kernel.retrievability(
+                elapsed_days[:, t], stability, d_stability
+            )
+            long_term_stability, d_long_term_stability = kernel.next_stability(
+                difficulty,
+                d_difficulty,
+                stability,
+                d_stability,
+                retrievability,
+                d_retrievability,
+                step_rating,
+            )
+            short_term_stability, d_short_term_stability = kernel.short_term_stability(
+                stability, d_stability, step_rating
+            )
+            next_difficulty, d_next_difficulty = kernel.next_difficulty(
+                difficulty, d_difficulty, step_rating
+            )
+            next_stability = np.where(
+                long_term_mask[:, t], long_term_stability, short_term_stability
+            )
+
+            # only compute step-loss on non-same-day reviews
+            with np.errstate(divide="ignore"):
+                log_recalled = np.maximum(np.log(retrievability), _MIN_LOG)
+                log_forgotten = np.maximum(np.log(1 - retrievability), _MIN_LOG)
+            step_recall = recall[:, t]
+            step_weight = loss_weight[:, t]
+            loss -= float(
+                np.sum(
+                    step_weight
+                    * (step_recall * log_recalled + (1 - step_recall) * log_forgotten)
+                )
+            )
+
+            step_update = update_mask[:, t]
+            if gradient:
+                d_loss = (
+                    step_weight
+                    * (retrievability - step_recall)
+                    / np.maximum(retrievability * (1 - retrievability), _BCE_EPSILON)
+                )
+                loss_gradient += d_loss @ d_retrievability
+
+                d_next_stability = np.where(
+                    long_term_mask[:, t, None], d_long_term_stability, d_short_term_stability
+                )
+                d_stability = np.where(step_update[:, None], d_next_stability, d_stability)
+                d_difficulty = np.where(
+                    step_update[:, None], d_next_difficulty, d_difficulty
+                )
+
+            stability = np.where(step_update, next_stability, stability)
+            difficulty = np.where(step_update, next_difficulty, difficulty)
+
+        return loss, loss_gradient, int(loss_mask.sum())
+
+
+class ArrayKernel:
+    """
+    The FSRS memory-state equations on NumPy arrays, compiled for one parameter vector.
+
+    Mirrors the optimizer's TensorKernel, but instead of relying on autograd each derived constant is
+    kept along with its gradient with respect to the parameters (attributes prefixed with "d_"), and each
+    equation takes and returns the [cards x parameters] Jacobians of its inputs and output. Passing None
+    for the Jacobians skips the derivatives. Like torch's clamp, a clamped value has a zero gradient only
+    when it lies strictly outside the bounds.
+
+    Tables suffixed with an "s" are indexed by `rating - 1`.
+    """
+
+    def __init__(self, parameters: np.ndarray) -> None:
+        w = np.asarray(parameters, dtype=np.float64)
+
+        self.parameters = w
+
+        self.decay = -w[20]
+        self.d_decay = -_UNIT[20]
+        decay_power = 0.9 ** (1 / self.decay)
+        self.factor = decay_power - 1
+        self.d_factor = decay_power * math.log(0.9) / w[20] ** 2 * _UNIT[20]
+
+        ratings = np.arange(1, 5, dtype=np.float64)
+
+        self.initial_stabilities = np.maximum(w[0:4], STABILITY_MIN)
+        self.d_initial_stabilities = _UNIT[0:4] * (w[0:4] >= STABILITY_MIN)[:, None]
+
+        initial_difficulties = w[4] - np.exp(w[5] * (ratings - 1)) + 1
+        self.initial_difficulties = np.clip(
+            initial_difficulties, MIN_DIFFICULTY, MAX_DIFFICULTY
+        )
+        self.d_initial_difficulties = (
+            _UNIT[4] - ((ratings - 1) * np.exp(w[5] * (ratings - 1)))[:, None] * _UNIT[5]
+        ) * _within(initial_difficulties, MIN_DIFFICULTY, MAX_DIFFICULTY)[:, None]
+
+        self.short_term_stability_factors = np.exp(w[17] * (ratings - 3 + w[18]))
+        self.d_short_term_stability_factors = self.short_term_stability_factors[:, None] * (
+            (ratings - 3 + w[18])[:, None] * _UNIT[17] + w[17] * _UNIT[18]
+        )
+
+        self.difficulty_deltas = -(w[6] * (ratings - 3))
+        self.d_difficulty_deltas = -(ratings - 3)[:, None] * _UNIT[6]
+        # mean reversion towards the initial difficulty of an Easy rating
+        self.mean_reversion_target = w[7] * self.initial_difficulties[Rating.Easy - 1]
+        self.d_mean_reversion_target = (
+            self.initial_difficulties[Rating.Easy - 1] * _UNIT[7]
+            + w[7] * self.d_initial_difficulties[Rating.Easy - 1]
+        )
+        self.mean_reversion_keep = 1 - w[7]
+        self.d_mean_reversion_keep = -_UNIT[7]
+
+        self.forget_short_term_divisor = math.exp(w[17] * w[18])
+        self.d_forget_short_term_divisor = self.forget_short_term_divisor * (
+            w[18] * _UNIT[17] + w[17] * _UNIT[18]
+        )
+        self.recall_scale = math.exp(w[8])
+        self.d_recall_scale = self.recall_scale * _UNIT[8]
+        # hard penalty and easy bonus
+        self.recall_modifiers = np.array([1.0, w[15], 1.0, w[16]])
+        self.d_recall_modifiers = np.stack(
+            [np.zeros(NUM_PARAMETERS), _UNIT[15], np.zeros(NUM_PARAMETERS), _UNIT[16]]
+        )
+
+    def retrievability(
+        self,
+        elapsed_days: np.ndarray,
+        stability: np.ndarray,
+        d_stability: np.ndarray | None,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        base = 1 + self.factor * elapsed_days / stability
+        retrievability = base ** self.decay
+        if d_stability is None:
+            return retrievability, None
+
+        d_base = elapsed_days[:, None] * (
+            self.d_factor / stability[:, None]
+            - (self.factor / stability**2)[:, None] * d_stability
+        )
+        d_retrievability = retrievability[:, None] * (
+            np.log(base)[:, None] * self.d_decay + (self.decay / base)[:, None] * d_base
+        )
+        return retrievability, d_retrievability
+
+    def short_term_stability(
+        self,
+        stability: np.ndarray,
+        d_stability: np.ndarray | None,
+        rating: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        w = self.parameters
+
+        stability_power = stability ** -w[19]
+        increase = self.short_term_stability_factors[rating - 1] * stability_power
+        increase_clamped = (rating >= Rating.Good) & (increase < 1.0)
+        next_stability = stability * np.where(increase_clamped, 1.0, increase)
+        result = np.maximum(next_stability, STABILITY_MIN)
+        if d_stability is None:
+            return result, None
+
+        d_increase = self.d_short_term_stability_factors[rating - 1] * stability_power[
+            :, None
+        ] + increase[:, None] * (
+            -np.log(stability)[:, None] * _UNIT[19]
+            - (w[19] / stability)[:, None] * d_stability
+        )
+        d_increase[increase_clamped] = 0.0
+        d_next_stability = (
+            d_stability * np.where(increase_clamped, 1.0, increase)[:, None]
+            + stability[:, None] * d_increase
+        )
+        return result, d_next_stability * (next_stability >= STABILITY_MIN)[:, None]
+
+    def next_difficulty(
+        self,
+        difficulty: np.ndarray,
+        d_difficulty: np.ndarray | None,
+        rating: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        delta = self.difficulty_deltas[rating - 1]
+        # linear damping
+        arg_2 = difficulty + (10.0 - difficulty) * delta / 9.0
+        next_difficulty = self.mean_reversion_target + self.mean_reversion_keep * arg_2
+        result = np.clip(next_difficulty, MIN_DIFFICULTY, MAX_DIFFICULTY)
+        if d_difficulty is None:
+            return result, None
+
+        d_arg_2 = (
+            d_difficulty * (1 - delta / 9.0)[:, None]
+            + ((10.0 - difficulty) / 9.0)[:, None] * self.d_difficulty_deltas[rating - 1]
+        )
+        d_next_difficulty = (
+            self.d_mean_reversion_target
+            + self.mean_reversion_keep * d_arg_2
+            + arg_2[:, None] * self.d_mean_reversion_keep
+        )
+        return result, d_next_difficulty * _within(
+            next_difficulty, MIN_DIFFICULTY, MAX_DIFFICULTY
+        )[:, None]
+
+    def next_stability(
+        self,
+        difficulty: np.ndarray,
+        d_difficulty: np.ndarray | None,
+        stability: np.ndarray,
+        d_stability: np.ndarray | None,
+        retrievability: np.ndarray,
+        d_retrievability: np.ndarray | None,
+        rating: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        w = self.parameters
+
+        difficulty_power = difficulty ** -w[12]
+        stability_growth = (stability + 1) ** w[13]
+        forget_exp = np.exp((1 - retrievability) * w[14])
+        next_forget_stability = (
+            w[11] * difficulty_power * (stability_growth - 1) * forget_exp
+        )
+        short_term_forget_stability = stability / self.forget_short_term_divisor
+        forget_is_long_term = next_forget_stability <= short_term_forget_stability
+
+        stability_power = stability ** -w[9]
+        recall_exp = np.exp((1 - retrievability) * w[10])
+        recall_modifier = self.recall_modifiers[rating - 1]
+        recall_increase = (
+            self.recall_scale
+            * (11 - difficulty)
+            * stability_power
+            * (recall_exp - 1)
+            * recall_modifier
+        )
+        next_recall_stability = stability * (1 + recall_increase)
+
+        forgotten = rating == Rating.Again
+        next_stability = np.where(
+            forgotten,
+            np.where(forget_is_long_term, next_forget_stability, short_term_forget_stability),
+            next_recall_stability,
+        )
+        result = np.maximum(next_stability, STABILITY_MIN)
+        if d_stability is None:
+            return result, None
+
+        # product rule over the factors of each branch
+        d_difficulty_power = difficulty_power[:, None] * (
+            -np.log(difficulty)[:, None] * _UNIT[12]
+            - (w[12] / difficulty)[:, None] * d_difficulty
+        )
+        d_stability_growth = stability_growth[:, None] * (
+            np.log(stability + 1)[:, None] * _UNIT[13]
+            + (w[13] / (stability + 1))[:, None] * d_stability
+        )
+        d_forget_exp = forget_exp[:, None] * (
+            (1 - retrievability)[:, None] * _UNIT[14] - w[14] * d_retrievability
+        )
+        d_next_forget_stability = (
+            (difficulty_power * (stability_growth - 1) * forget_exp)[:, None] * _UNIT[11]
+            + (w[11] * (stability_growth - 1) * forget_exp)[:, None] * d_difficulty_power
+            + (w[11] * difficulty_power * forget_exp)[:, None] * d_stability_growth
+            + (w[11] * difficulty_power * (stability_growth - 1))[:, None] * d_forget_exp
+        )
+        d_short_term_forget_stability = (
+            d_stability / self.forget_short_term_divisor
+            - (stability / self.forget_short_term_divisor**2)[:, None]
+            * self.d_forget_short_term_divisor
+        )
+
+        d_stability_power = stability_power[:, None] * (
+            -np.log(stability)[:, None] * _UNIT[9]
+            - (w[9] / stability)[:, None] * d_stability
+        )
+        d_recall_exp = recall_exp[:, None] * (
+            (1 - retrievability)[:, None] * _UNIT[10] - w[10] * d_retrievability
+        )
+        d_recall_increase = (
+            recall_increase[:, None] * (self.d_recall_scale / self.recall_scale)
+            - (
+                self.recall_scale * stability_power * (recall_exp - 1) * recall_modifier
+            )[:, None]
+            * d_difficulty
+            + (
+                self.recall_scale * (11 - difficulty) * (recall_exp - 1) * recall_modifier
+            )[:, None]
+            * d_stability_power
+            + (
+                self.recall_scale * (11 - difficulty) * stability_power * recall_modifier
+            )[:, None]
+            * d_recall_exp
+            + (
+                self.recall_scale * (11 - difficulty) * stability_power * (recall_exp - 1)
+            )[:, None]
+            * self.d_recall_modifiers[rating - 1]
+        )
+        d_next_recall_stability = (
+            d_stability * (1 + recall_increase)[:, None]
+            + stability[:, None] * d_recall_increase
+        )
+
+        d_next_stability = np.where(
+            forgotten[:, None],
+            np.where(
+                forget_is_long_term[:, None],
+                d_next_forget_stability,
+                d_short_term_forget_stability,
+            ),
+            d_next_recall_stability,
+        )
+        return result, d_next_stability * (next_stability >= STABILITY_MIN)[:, None]
+
+
+def _within(values: np.ndarray, lower: float, upper: float) -> np.ndarray:
+    return (values >= lower) & (values <= upper)
+
+
+class ArrayTrainer:
+    """
+    The NumPy training backend: Adam (with torch's default betas and epsilon) on the gradients of
+    ReviewHistoryArrays.replay_loss, a cosine annealing learning rate and the parameters clamped to their
+    bounds after every step.
+
+    Attributes:
+        params: The current parameters.
+        learning_rate: The initial learning rate.
+        num_steps: The number of steps over which the learning rate is annealed to 0.
+        step_count: The number of steps taken.
+        exp_avg: Adam's moving average of the gradients.
+        exp_avg_sq: Adam's moving average of the squared gradients.
+    """
+
+    betas = (0.9, 0.999)
+    eps = 1e-8
+
+    lower_bounds = np.array(LOWER_BOUNDS_PARAMETERS, dtype=np.float64)
+    upper_bounds = np.array(UPPER_BOUNDS_PARAMETERS, dtype=np.float64)
+
+    def __init__(
+        self, parameters: list[float], learning_rate: float, num_steps: int
+    ) -> None:
+        self.params = np.array(parameters, dtype=np.float64)
+        self.learning_rate = learning_rate
+        self.num_steps = num_steps
+        self.step_count = 0
+        self.exp_avg = np.zeros_like(self.params)
+        self.exp_avg_sq = np.zeros_like(self.params)
+
+    @staticmethod
+    def loss(
+        review_histories: ReviewHistoryArrays, parameters: list[float], rows: np.ndarray
+    ) -> tuple[float, int]:
+        """Returns the summed loss and the number of reviews of `rows` under `parameters`."""
+        loss, _, num_reviews = review_histories.replay_loss(
+            ArrayKernel(np.array(parameters, dtype=np.float64)), rows=rows
+        )
+        return loss, num_reviews
+
+    @staticmethod
+    def init_worker() -> None:
+        """Called once in each loss worker process."""
+
+    @staticmethod
+    def gradient(
+        review_histories: ReviewHistoryArrays, parameters: list[float], rows: np.ndarray
+    ) -> np.ndarray:
+        """Returns the gradient of the summed loss of `rows` with respect to `parameters`."""
+        _, gradient, _ = review_histories.replay_loss(
+            ArrayKernel(np.array(parameters, dtype=np.float64)), rows=rows, gradient=True
+        )
+        return gradient
+
+    def step(self, review_histories: ReviewHistoryArrays, rows: np.ndarray) -> None:
+        """Takes one gradient step on the loss of the mini-batch `rows`."""
+        self.apply_gradient(self.gradient(review_histories, self.params, rows))
+
+    def apply_gradient(self, gradient: np.ndarray) -> None:
+        """Takes one Adam step with a gradient computed elsewhere, see gradient."""
+        beta_1, beta_2 = self.betas
+        learning_rate = self._annealed_learning_rate()
+        self.step_count += 1
+
+        self.exp_avg = beta_1 * self.exp_avg + (1 - beta_1) * gradient
+        self.exp_avg_sq = beta_2 * self.exp_avg_sq + (1 - beta_2) * gradient**2
+        bias_correction_1 = 1 - beta_1**self.step_count
+        bias_correction_2 = 1 - beta_2**self.step_count
+        denom = np.sqrt(self.exp_avg_sq) / math.sqrt(bias_correction_2) + self.eps
+        self.params = self.params - learning_rate / bias_correction_1 * self.exp_avg / denom
+
+        self.params = np.clip(self.params, self.lower_bounds, self.upper_bounds)
+
+    def parameters(self) -> list[float]:
+        return self.params.tolist()
+
+    def save_checkpoint(self, training_state: dict, checkpoint_path: str | Path) -> None:
+        """Writes the checkpoint to a temporary file first so an interrupted write never corrupts it."""
+        temporary_path = f"{checkpoint_path}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(
+                {
+                    "training_state": training_state,
+                    "params": self.parameters(),
+                    "adam_optimizer": {
+                        "step": self.step_count,
+                        "exp_avg": self.exp_avg.tolist(),
+                        "exp_avg_sq": self.exp_avg_sq.tolist(),
+                    },
+                    "lr_scheduler": {
+                        "learning_rate": self.learning_rate,
+                        "T_max": self.num_steps,
+                    },
+                },
+                file,
+            )
+        os.replace(temporary_path, checkpoint_path)
+
+    @classmethod
+    def load_checkpoint(cls, checkpoint_path: str | Path) -> tuple[dict, ArrayTrainer]:
+        """Returns the training state and the trainer saved by save_checkpoint."""
+        with open(checkpoint_path, "rb") as file:
+            checkpoint = pickle.load(file)
+
+        trainer = cls(
+            checkpoint["params"],
+            learning_rate=checkpoint["lr_scheduler"]["learning_rate"],
+            num_steps=checkpoint["lr_scheduler"]["T_max"],
+        )
+        trainer.step_count = checkpoint["adam_optimizer"]["step"]
+        trainer.exp_avg = np.array(checkpoint["adam_optimizer"]["exp_avg"])
+        trainer.exp_avg_sq = np.array(checkpoint["adam_optimizer"]["exp_avg_sq"])
+
+        return checkpoint["training_state"], trainer
+
+    def _annealed_learning_rate(self) -> float:
+        """The learning rate of the next step, following torch's CosineAnnealingLR down to 0."""
+        return self.learning_rate * (1 + math.cos(math.pi * self.step_count / self.num_steps)) / 2
+
+
+__all__ = ["ReviewHistoryArrays", "ArrayKernel", "ArrayTrainer"]
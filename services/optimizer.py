@@ -2,30 +2,227 @@
 fsrs.optimizer
 ---------
 
-This module defines the optional Optimizer class.
+This module defines the Optimizer class.
+
+The optimizer trains with torch when it's installed and with the NumPy backend in services.numpy_optimizer
+otherwise.
 """
 
+from __future__ import annotations
+
+from itertools import groupby
+from operator import itemgetter
+
+from db import RevlogCRUD, ParametersCRUD
 from models.card import Card
 from models.review_log import ReviewLog, Rating
 from services.scheduler import (
-    Scheduler,
     DEFAULT_PARAMETERS,
     LOWER_BOUNDS_PARAMETERS,
     UPPER_BOUNDS_PARAMETERS,
+    STABILITY_MIN,
+    MIN_DIFFICULTY,
+    MAX_DIFFICULTY,
+    MILLIS_PER_DAY,
+    Scheduler,
+)
+from services.numpy_optimizer import ReviewHistoryArrays, ArrayTrainer
+from services.evaluation import (
+    EvaluationResult,
+    evaluation_statistics,
+    NUM_CALIBRATION_BINS,
+)
+from services.simulator import (
+    simulate_costs,
+    search_optimal_retention,
+    RetentionSearchResult,
 )
 
 import math
+import os
+import numpy as np
+from pathlib import Path
 from datetime import datetime, timezone
-from copy import deepcopy
+from typing import NamedTuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from random import Random
-from statistics import mean
+
+
+class ReviewLogSummary:
+    """
+    The rating counts and review durations of a collection of review logs, accumulated one card history
+    at a time or read from the review_statistics table. Holds everything compute_optimal_retention needs
+    without keeping the review logs around.
+
+    Lists are indexed by `rating - 1`. "first" refers to each card's first review.
+    """
+
+    def __init__(self) -> None:
+        self.num_review_logs = 0
+        self.num_missing_durations = 0
+        self.first_counts = [0, 0, 0, 0]
+        self.first_duration_sums = [0, 0, 0, 0]
+        self.first_duration_counts = [0, 0, 0, 0]
+        self.counts = [0, 0, 0, 0]
+        self.duration_sums = [0, 0, 0, 0]
+        self.duration_counts = [0, 0, 0, 0]
+
+    @classmethod
+    def from_statistics_rows(cls, rows) -> ReviewLogSummary:
+        """
+        Creates a ReviewLogSummary from (is_first_review, rating, review_count, duration_sum, duration_count)
+        rows, as returned by RevlogCRUD.get_review_statistics.
+        """
+        summary = cls()
+        for is_first_review, rating, review_count, duration_sum, duration_count in rows:
+            if is_first_review:
+                counts, duration_sums, duration_counts = (
+                    summary.first_counts,
+                    summary.first_duration_sums,
+                    summary.first_duration_counts,
+                )
+            else:
+                counts, duration_sums, duration_counts = (
+                    summary.counts,
+                    summary.duration_sums,
+                    summary.duration_counts,
+                )
+
+            counts[rating - 1] += review_count
+            duration_sums[rating - 1] += duration_sum
+            duration_counts[rating - 1] += duration_count
+            summary.num_review_logs += review_count
+            summary.num_missing_durations += review_count - duration_count
+
+        return summary
+
+    def add_history(self, reviews: list[tuple[int, int | None]]) -> None:
+        """Adds one card's (rating, review_duration) reviews, ordered by review_datetime."""
+
+        for i, (rating, review_duration) in enumerate(reviews):
+            if i == 0:
+                counts, duration_sums, duration_counts = (
+                    self.first_counts,
+                    self.first_duration_sums,
+                    self.first_duration_counts,
+                )
+            else:
+                counts, duration_sums, duration_counts = (
+                    self.counts,
+                    self.duration_sums,
+                    self.duration_counts,
+                )
+
+            counts[rating - 1] += 1
+            if review_duration is None:
+                self.num_missing_durations += 1
+            else:
+                duration_sums[rating - 1] += review_duration
+                duration_counts[rating - 1] += 1
+
+        self.num_review_logs += len(reviews)
+
+    def probs_and_costs(self) -> dict[str, float]:
+        """Returns the same dictionary as Optimizer._compute_probs_and_costs."""
+
+        def _avg(duration_sums: list[int], duration_counts: list[int], rating: Rating) -> float:
+            count = duration_counts[rating - 1]
+            return duration_sums[rating - 1] / count if count else 0
+
+        probs_and_costs_dict = {}
+
+        num_first_review = sum(self.first_counts)
+        num_recall = sum(self.counts[Rating.Hard - 1 :])
+        for rating in Rating:
+            name = rating.name.lower()
+            probs_and_costs_dict[f"prob_first_{name}"] = (
+                self.first_counts[rating - 1] / num_first_review
+            )
+            probs_and_costs_dict[f"avg_first_{name}_review_duration"] = _avg(
+                self.first_duration_sums, self.first_duration_counts, rating
+            )
+            if rating != Rating.Again:
+                probs_and_costs_dict[f"prob_{name}"] = self.counts[rating - 1] / num_recall
+            probs_and_costs_dict[f"avg_{name}_review_duration"] = _avg(
+                self.duration_sums, self.duration_counts, rating
+            )
+
+        return probs_and_costs_dict
+
+
+class ParameterUpdate(NamedTuple):
+    """
+    The result of Optimizer.optimize_stored_parameters.
+
+    Attributes:
+        parameters: The optimized parameters, as stored in the database.
+        loss: The log loss of the parameters on the reviews they were trained on, None if there were none.
+        revlog_high_water_mark: The revlogs rowid of the last review the parameters were trained on.
+        full_retrain: Whether the parameters were retrained on every review rather than fine-tuned.
+    """
+
+    parameters: list[float]
+    loss: float | None
+    revlog_high_water_mark: int
+    full_retrain: bool
+
+
+class BootstrapResult(NamedTuple):
+    """
+    The result of Optimizer.bootstrap_parameters.
+
+    Attributes:
+        confidence: The confidence level of the intervals, e.g. 0.95.
+        samples: The optimal parameters of each bootstrap resample.
+        lower: The lower end of each parameter's confidence interval.
+        median: The median of each parameter over the resamples.
+        upper: The upper end of each parameter's confidence interval.
+        interval_samples: The first intervals in days of a new card rated Good at every review, for each resample.
+        interval_lower: The lower end of the confidence interval of each of those intervals.
+        interval_median: The median of each of those intervals over the resamples.
+        interval_upper: The upper end of the confidence interval of each of those intervals.
+    """
+
+    confidence: float
+    samples: list[list[float]]
+    lower: list[float]
+    median: list[float]
+    upper: list[float]
+    interval_samples: list[list[int]]
+    interval_lower: list[float]
+    interval_median: list[float]
+    interval_upper: list[float]
+
+
+# hyper parameters
+num_epochs = 5
+mini_batch_size = 512
+learning_rate = 4e-2
+max_seq_len = (
+    64  # up to the first 64 reviews of each card are used for optimization
+)
+# fine-tuning stored parameters on new reviews takes smaller steps
+warm_start_learning_rate = learning_rate / 4
+# a warm start falls back to a full retrain when the stored parameters' loss on the new reviews
+# exceeds the fine-tuned parameters' loss on them by more than this fraction
+warm_start_max_loss_drift = 0.1
+# the smallest decrease of the epoch batch loss that resets early stopping's patience
+early_stopping_min_delta = 1e-4
+
+
+try:
+    from tqdm import tqdm
+except ImportError:
+
+    def tqdm(iterable, **kwargs):
+        return iterable
+
 
 try:
     import torch
-    from torch.nn import BCELoss
+    from torch.nn.functional import binary_cross_entropy
     from torch import optim
-    import pandas as pd
-    from tqdm import tqdm
 
     # weight clipping
     LOWER_BOUNDS_PARAMETERS_TENSORS = torch.tensor(
@@ -38,635 +235,1267 @@ try:
         dtype=torch.float64,
     )
 
-    # hyper parameters
-    num_epochs = 5
-    mini_batch_size = 512
-    learning_rate = 4e-2
-    max_seq_len = (
-        64  # up to the first 64 reviews of each card are used for optimization
-    )
-
-    class Optimizer:
+    class TensorKernel:
         """
-        The FSRS optimizer.
+        The FSRS memory-state equations on torch tensors, compiled for one parameter tensor.
 
-        Enables the optimization of FSRS scheduler parameters from existing review logs for more accurate interval calculations.
+        Mirrors services.scheduler.FloatKernel method for method, but keeps every derived constant in the
+        autograd graph of `parameters` so that losses can be backpropagated to them. A new kernel must be
+        compiled whenever the parameters are updated.
 
-        Attributes:
-            review_logs: A collection of previous ReviewLog objects from a user.
-            _revlogs_train: The collection of review logs, sorted and formatted for optimization.
+        Tables suffixed with an "s" are indexed by `rating - 1`.
         """
 
-        review_logs: tuple[ReviewLog, ...]
-        _revlogs_train: dict
+        def __init__(self, parameters: torch.Tensor) -> None:
+            w = parameters
 
-        def __init__(
-            self, review_logs: tuple[ReviewLog, ...] | list[ReviewLog]
-        ) -> None:
-            """
-            Initializes the Optimizer with a set of ReviewLogs. Also formats a copy of the review logs for optimization.
+            self.parameters = w
 
-            Note that the ReviewLogs provided by the user don't need to be in order.
-            """
-
-            def _format_revlogs() -> dict:
-                """
-                Sorts and converts the tuple of ReviewLog objects to a dictionary format for optimizing
-                """
+            self.decay = -w[20]
+            self.factor = 0.9 ** (1 / self.decay) - 1
 
-                revlogs_train = {}
-                for review_log in self.review_logs:
-                    # pull data out of current ReviewLog object
-                    card_id = review_log.card_id
-                    rating = review_log.rating
-                    review_datetime = review_log.review_datetime
-                    review_duration = review_log.review_duration
+            ratings = torch.arange(1, 5, dtype=torch.float64)
 
-                    # if the card was rated Again, it was not recalled
-                    recall = 0 if rating == Rating.Again else 1
+            self.initial_stabilities = w[0:4].clamp(min=STABILITY_MIN)
+            self.initial_difficulties = (
+                w[4] - (math.e ** (w[5] * (ratings - 1))) + 1
+            ).clamp(min=MIN_DIFFICULTY, max=MAX_DIFFICULTY)
 
-                    # as a ML problem, [x, y] = [ [review_datetime, rating, review_duration], recall ]
-                    datum = [[review_datetime, rating, review_duration], recall]
+            self.short_term_stability_factors = math.e ** (
+                w[17] * (ratings - 3 + w[18])
+            )
 
-                    if card_id not in revlogs_train:
-                        revlogs_train[card_id] = []
+            self.difficulty_deltas = -(w[6] * (ratings - 3))
+            # mean reversion towards the initial difficulty of an Easy rating
+            self.mean_reversion_target = w[7] * self.initial_difficulties[Rating.Easy - 1]
+            self.mean_reversion_keep = 1 - w[7]
+
+            self.forget_short_term_divisor = math.e ** (w[17] * w[18])
+            self.recall_scale = math.e ** w[8]
+            # hard penalty and easy bonus
+            one = torch.ones((), dtype=torch.float64)
+            self.recall_modifiers = torch.stack([one, w[15], one, w[16]])
+
+        def retrievability(
+            self, elapsed_days: int, stability: torch.Tensor
+        ) -> torch.Tensor:
+            return (1 + self.factor * elapsed_days / stability) ** self.decay
+
+        def initial_stability(self, rating: Rating) -> torch.Tensor:
+            return self.initial_stabilities[rating - 1]
+
+        def initial_difficulty(self, rating: Rating) -> torch.Tensor:
+            return self.initial_difficulties[rating - 1]
+
+        def short_term_stability(
+            self, stability: torch.Tensor, rating: Rating
+        ) -> torch.Tensor:
+            short_term_stability_increase = self.short_term_stability_factors[
+                rating - 1
+            ] * (stability ** -self.parameters[19])
+
+            if rating >= Rating.Good:
+                short_term_stability_increase = short_term_stability_increase.clamp(
+                    min=1.0
+                )
 
-                    revlogs_train[card_id].append((datum))
-                    revlogs_train[card_id] = sorted(
-                        revlogs_train[card_id], key=lambda x: x[0][0]
-                    )  # keep reviews sorted
+            return (stability * short_term_stability_increase).clamp(min=STABILITY_MIN)
 
-                # sort the dictionary in order of when each card history starts
-                revlogs_train = dict(sorted(revlogs_train.items()))
+        def next_difficulty(
+            self, difficulty: torch.Tensor, rating: Rating
+        ) -> torch.Tensor:
+            # linear damping
+            arg_2 = (
+                difficulty
+                + (10.0 - difficulty) * self.difficulty_deltas[rating - 1] / 9.0
+            )
 
-                return revlogs_train
+            next_difficulty = (
+                self.mean_reversion_target + self.mean_reversion_keep * arg_2
+            )
 
-            self.review_logs = deepcopy(tuple(review_logs))
+            return next_difficulty.clamp(min=MIN_DIFFICULTY, max=MAX_DIFFICULTY)
 
-            # format the ReviewLog data for optimization
-            self._revlogs_train = _format_revlogs()
+        def next_stability(
+            self,
+            difficulty: torch.Tensor,
+            stability: torch.Tensor,
+            retrievability: torch.Tensor,
+            rating: Rating,
+        ) -> torch.Tensor:
+            w = self.parameters
+
+            if rating == Rating.Again:
+                next_stability = torch.minimum(
+                    w[11]
+                    * (difficulty ** -w[12])
+                    * (((stability + 1) ** (w[13])) - 1)
+                    * (math.e ** ((1 - retrievability) * w[14])),
+                    stability / self.forget_short_term_divisor,
+                )
 
-        def _compute_batch_loss(self, parameters: list[float]) -> float:
-            """
-            Computes the current total loss for the entire batch of review logs.
-            """
+            else:
+                next_stability = stability * (
+                    1
+                    + self.recall_scale
+                    * (11 - difficulty)
+                    * (stability ** -w[9])
+                    * ((math.e ** ((1 - retrievability) * w[10])) - 1)
+                    * self.recall_modifiers[rating - 1]
+                )
 
-            card_ids = list(self._revlogs_train.keys())
-            params = torch.tensor(parameters, dtype=torch.float64)
-            loss_fn = BCELoss()
-            scheduler = Scheduler(parameters=params)
-            step_losses = []
+            return next_stability.clamp(min=STABILITY_MIN)
 
-            for card_id in card_ids:
-                card_review_history = self._revlogs_train[card_id][:max_seq_len]
+        def short_term_stability_batch(
+            self, stability: torch.Tensor, rating: torch.Tensor
+        ) -> torch.Tensor:
+            short_term_stability_increase = self.short_term_stability_factors[
+                rating - 1
+            ] * (stability ** -self.parameters[19])
 
-                for i in range(len(card_review_history)):
-                    review = card_review_history[i]
+            short_term_stability_increase = torch.where(
+                rating >= Rating.Good,
+                short_term_stability_increase.clamp(min=1.0),
+                short_term_stability_increase,
+            )
 
-                    x_date = review[0][0]
-                    y_retrievability = review[1]
-                    u_rating = review[0][1]
+            return (stability * short_term_stability_increase).clamp(min=STABILITY_MIN)
 
-                    if i == 0:
-                        card = Card(card_id=card_id, due=x_date)
+        def next_stability_batch(
+            self,
+            difficulty: torch.Tensor,
+            stability: torch.Tensor,
+            retrievability: torch.Tensor,
+            rating: torch.Tensor,
+        ) -> torch.Tensor:
+            w = self.parameters
+
+            next_forget_stability = torch.minimum(
+                w[11]
+                * (difficulty ** -w[12])
+                * (((stability + 1) ** (w[13])) - 1)
+                * (math.e ** ((1 - retrievability) * w[14])),
+                stability / self.forget_short_term_divisor,
+            )
 
-                    y_pred_retrievability = scheduler.get_card_retrievability(
-                        card=card, current_datetime=x_date
-                    )
-                    y_retrievability = torch.tensor(
-                        y_retrievability, dtype=torch.float64
-                    )
+            next_recall_stability = stability * (
+                1
+                + self.recall_scale
+                * (11 - difficulty)
+                * (stability ** -w[9])
+                * ((math.e ** ((1 - retrievability) * w[10])) - 1)
+                * self.recall_modifiers[rating - 1]
+            )
 
-                    if card.last_review and (x_date - card.last_review).days > 0:
-                        step_loss = loss_fn(y_pred_retrievability, y_retrievability)
-                        step_losses.append(step_loss)
+            next_stability = torch.where(
+                rating == Rating.Again, next_forget_stability, next_recall_stability
+            )
 
-                    card, _ = scheduler.review_card(
-                        card=card,
-                        rating=u_rating,
-                        review_datetime=x_date,
-                        review_duration=None,
-                    )
+            return next_stability.clamp(min=STABILITY_MIN)
 
-            batch_loss = torch.sum(torch.stack(step_losses))
-            batch_loss = batch_loss.item() / len(step_losses)
+    def replay_loss(
+        kernel: TensorKernel,
+        review_histories: ReviewHistoryArrays,
+        rows: np.ndarray | None = None,
+    ) -> tuple[torch.Tensor, int]:
+        """
+        Runs the FSRS recurrence over the histories of `rows` (every card by default), one time-step at a time,
+        following the same rules as Scheduler.review_card.
 
-            return batch_loss
+        Returns the summed binary cross-entropy of the predicted retrievabilities and the number of reviews
+        it was summed over.
+        """
 
-        def compute_optimal_parameters(self, verbose: bool = False) -> list[float]:
-            """
-            Computes a set of optimized parameters for the FSRS scheduler and returns it as a list of floats.
+        if rows is None:
+            rows = np.arange(len(review_histories))
+        num_steps = int(review_histories.lengths[rows].max()) if len(rows) else 0
 
-            High level explanation of optimization:
-            ---------------------------------------
-            FSRS is a many-to-many sequence model where the "State" at each step is a Card object at a given point in time,
-            the input is the time of the review and the output is the predicted retrievability of the card at the time of review.
+        rating = torch.from_numpy(review_histories.rating[rows, :num_steps])
+        elapsed_days = torch.from_numpy(review_histories.elapsed_days[rows, :num_steps])
+        recall = torch.from_numpy(review_histories.recall[rows, :num_steps])
+        update_mask = torch.from_numpy(review_histories.update_mask[rows, :num_steps])
+        long_term_mask = torch.from_numpy(review_histories.long_term_mask[rows, :num_steps])
+        loss_mask = torch.from_numpy(review_histories.loss_mask[rows, :num_steps])
+        loss_weight = loss_mask.to(torch.float64)
 
-            Each card's review history can be thought of as a sequence, each review as a step and each collection of card review histories
-            as a batch.
+        # the cards' first reviews
+        stability = kernel.initial_stabilities[rating[:, 0] - 1]
+        difficulty = kernel.initial_difficulties[rating[:, 0] - 1]
 
-            The loss is computed by comparing the predicted retrievability of the Card at each step with whether the Card was actually
-            sucessfully recalled or not (0/1).
+        loss = torch.zeros((), dtype=torch.float64)
+        for t in range(1, num_steps):
+            step_rating = rating[:, t]
 
-            Finally, the card objects at each step in their sequences are updated using the current parameters of the Scheduler
-            as well as the rating given to that card by the user. The parameters of the Scheduler is what is being optimized.
-            """
+            retrievability = kernel.retrievability(
+                elapsed_days=elapsed_days[:, t], stability=stability
+            )
+            next_stability = torch.where(
+                long_term_mask[:, t],
+                kernel.next_stability_batch(
+                    difficulty=difficulty,
+                    stability=stability,
+                    retrievability=retrievability,
+                    rating=step_rating,
+                ),
+                kernel.short_term_stability_batch(
+                    stability=stability, rating=step_rating
+                ),
+            )
+            next_difficulty = kernel.next_difficulty(
+                difficulty=difficulty, rating=step_rating
+            )
 
-            def _num_reviews() -> int:
-                """
-                Computes how many Review-state reviews there are in the dataset.
-                Only the loss from Review-state reviews count for optimization and their number must
-                be computed in advance to properly initialize the Cosine Annealing learning rate scheduler.
-                """
-
-                scheduler = Scheduler()
-                num_reviews = 0
-                # iterate through the card review histories
-                card_ids = list(self._revlogs_train.keys())
-                for card_id in card_ids:
-                    card_review_history = self._revlogs_train[card_id][:max_seq_len]
-
-                    # iterate through the current Card's review history
-                    for i in range(len(card_review_history)):
-                        review = card_review_history[i]
-
-                        review_datetime = review[0][0]
-                        rating = review[0][1]
-
-                        # if this is the first review, create the Card object
-                        if i == 0:
-                            card = Card(card_id=card_id, due=review_datetime)
-
-                        # only non-same-day reviews count
-                        if (
-                            card.last_review
-                            and (review_datetime - card.last_review).days > 0
-                        ):
-                            num_reviews += 1
-
-                        card, _ = scheduler.review_card(
-                            card=card,
-                            rating=rating,
-                            review_datetime=review_datetime,
-                            review_duration=None,
-                        )
+            # only compute step-loss on non-same-day reviews
+            loss = loss + binary_cross_entropy(
+                retrievability,
+                recall[:, t],
+                weight=loss_weight[:, t],
+                reduction="sum",
+            )
 
-                return num_reviews
-
-            def _update_parameters(
-                step_losses: list,
-                adam_optimizer: torch.optim.Adam,
-                params: torch.Tensor,
-                lr_scheduler: torch.optim.lr_scheduler.CosineAnnealingLR,
-            ) -> None:
-                """
-                Computes and updates the current FSRS parameters based on the step losses. Also updates the learning rate scheduler.
-                """
-
-                # Backpropagate through the loss
-                mini_batch_loss = torch.sum(torch.stack(step_losses))
-                adam_optimizer.zero_grad()  # clear previous gradients
-                mini_batch_loss.backward()  # compute gradients
-                adam_optimizer.step()  # Update parameters
-
-                # clamp the weights in place without modifying the computational graph
-                with torch.no_grad():
-                    params.clamp_(
-                        min=LOWER_BOUNDS_PARAMETERS_TENSORS,
-                        max=UPPER_BOUNDS_PARAMETERS_TENSORS,
-                    )
+            stability = torch.where(update_mask[:, t], next_stability, stability)
+            difficulty = torch.where(update_mask[:, t], next_difficulty, difficulty)
 
-                # update the learning rate
-                lr_scheduler.step()
+        return loss, int(loss_mask.sum())
 
-            # set local random seed for reproducibility
-            rng = Random(42)
+    class TensorTrainer:
+        """
+        The torch training backend: Adam on the gradients backpropagated through replay_loss, a cosine
+        annealing learning rate and the parameters clamped to their bounds after every step.
 
-            card_ids = list(self._revlogs_train.keys())
+        Attributes:
+            params: The current parameters, requiring gradients.
+            adam_optimizer: The Adam optimizer of `params`.
+            lr_scheduler: The cosine annealing learning rate scheduler of `adam_optimizer`.
+        """
 
-            num_reviews = _num_reviews()
+        def __init__(
+            self, parameters: list[float], learning_rate: float, num_steps: int
+        ) -> None:
+            # Define FSRS Scheduler parameters as torch tensors with gradients
+            self.params = torch.tensor(
+                parameters,
+                requires_grad=True,
+                dtype=torch.float64,
+            )
+            self.adam_optimizer = optim.Adam([self.params], lr=learning_rate)
+            self.lr_scheduler = optim.lr_scheduler.CosineAnnealingLR(
+                optimizer=self.adam_optimizer,
+                T_max=num_steps,
+            )
 
-            if num_reviews < mini_batch_size:
-                return list(DEFAULT_PARAMETERS)
+        @staticmethod
+        def loss(
+            review_histories: ReviewHistoryArrays, parameters: list[float], rows: np.ndarray
+        ) -> tuple[float, int]:
+            """Returns the summed loss and the number of reviews of `rows` under `parameters`."""
+            params = torch.tensor(parameters, dtype=torch.float64)
+            with torch.no_grad():
+                loss, num_reviews = replay_loss(
+                    kernel=TensorKernel(params), review_histories=review_histories, rows=rows
+                )
 
-            # Define FSRS Scheduler parameters as torch tensors with gradients
-            params = torch.tensor(
-                DEFAULT_PARAMETERS, requires_grad=True, dtype=torch.float64
+            return loss.item(), num_reviews
+
+        @staticmethod
+        def init_worker() -> None:
+            """Called once in each loss worker process."""
+            # the workers already run in parallel
+            torch.set_num_threads(1)
+
+        @staticmethod
+        def gradient(
+            review_histories: ReviewHistoryArrays, parameters: list[float], rows: np.ndarray
+        ) -> np.ndarray:
+            """Returns the gradient of the summed loss of `rows` with respect to `parameters`."""
+            params = torch.tensor(parameters, requires_grad=True, dtype=torch.float64)
+            loss, _ = replay_loss(
+                kernel=TensorKernel(params), review_histories=review_histories, rows=rows
             )
+            loss.backward()
+            return params.grad.numpy()
 
-            loss_fn = BCELoss()
-            adam_optimizer = optim.Adam([params], lr=learning_rate)
-            lr_scheduler = optim.lr_scheduler.CosineAnnealingLR(
-                optimizer=adam_optimizer,
-                T_max=math.ceil(num_reviews / mini_batch_size) * num_epochs,
+        def step(self, review_histories: ReviewHistoryArrays, rows: np.ndarray) -> None:
+            """
+            Computes and updates the current FSRS parameters based on the loss of the mini-batch `rows`.
+            Also updates the learning rate scheduler.
+            """
+
+            # compile the FSRS equations with the current parameters
+            mini_batch_loss, _ = replay_loss(
+                kernel=TensorKernel(self.params), review_histories=review_histories, rows=rows
             )
 
-            best_params = None
-            best_loss = math.inf
-            # iterate through the epochs
-            for _ in tqdm(
-                range(num_epochs),
-                desc="Optimizing",
-                unit="epoch",
-                disable=(not verbose),
-            ):
-                # randomly shuffle the order of which Card's review histories get computed first
-                # at the beginning of each new epoch
-                rng.shuffle(card_ids)
-
-                # initialize new scheduler with updated parameters each epoch
-                scheduler = Scheduler(parameters=params)
-
-                # stores the computed loss of each individual review
-                step_losses = []
-
-                # iterate through the card review histories (sequences)
-                for card_id in card_ids:
-                    card_review_history = self._revlogs_train[card_id][:max_seq_len]
-
-                    # iterate through the current Card's review history (steps)
-                    for i in range(len(card_review_history)):
-                        review = card_review_history[i]
-
-                        # input
-                        x_date = review[0][0]
-                        # target
-                        y_retrievability = review[1]
-                        # update
-                        u_rating = review[0][1]
-
-                        # if this is the first review, create the Card object
-                        if i == 0:
-                            card = Card(card_id=card_id, due=x_date)
-
-                        # predicted target
-                        y_pred_retrievability = scheduler.get_card_retrievability(
-                            card=card, current_datetime=x_date
-                        )
-                        y_retrievability = torch.tensor(
-                            y_retrievability, dtype=torch.float64
-                        )
+            # Backpropagate through the loss
+            self.adam_optimizer.zero_grad()  # clear previous gradients
+            mini_batch_loss.backward()  # compute gradients
+            self._update_parameters()
 
-                        # only compute step-loss on non-same-day reviews
-                        if card.last_review and (x_date - card.last_review).days > 0:
-                            step_loss = loss_fn(y_pred_retrievability, y_retrievability)
-                            step_losses.append(step_loss)
-
-                        # update the card's state
-                        card, _ = scheduler.review_card(
-                            card=card,
-                            rating=u_rating,
-                            review_datetime=x_date,
-                            review_duration=None,
-                        )
+        def apply_gradient(self, gradient: np.ndarray) -> None:
+            """Updates the current FSRS parameters with a gradient computed elsewhere, see gradient."""
+            self.params.grad = torch.from_numpy(np.array(gradient, dtype=np.float64))
+            self._update_parameters()
 
-                        # take a gradient step after each mini-batch
-                        if len(step_losses) == mini_batch_size:
-                            _update_parameters(
-                                step_losses=step_losses,
-                                adam_optimizer=adam_optimizer,
-                                params=params,
-                                lr_scheduler=lr_scheduler,
-                            )
+        def _update_parameters(self) -> None:
+            self.adam_optimizer.step()  # Update parameters
 
-                            # update the scheduler's with the new parameters
-                            scheduler = Scheduler(parameters=params)
-                            # clear the step losses for next batch
-                            step_losses = []
-
-                            # remove gradient history from tensor card parameters for next batch
-                            card.stability = card.stability.detach()
-                            card.difficulty = card.difficulty.detach()
-
-                # update params on remaining review logs
-                if len(step_losses) > 0:
-                    _update_parameters(
-                        step_losses=step_losses,
-                        adam_optimizer=adam_optimizer,
-                        params=params,
-                        lr_scheduler=lr_scheduler,
-                    )
+            # clamp the weights in place without modifying the computational graph
+            with torch.no_grad():
+                self.params.clamp_(
+                    min=LOWER_BOUNDS_PARAMETERS_TENSORS,
+                    max=UPPER_BOUNDS_PARAMETERS_TENSORS,
+                )
 
-                # compute the current batch loss after each epoch
-                detached_params = [
-                    x.detach().item() for x in list(params.detach())
-                ]  # convert to floats
-                with torch.no_grad():
-                    epoch_batch_loss = self._compute_batch_loss(
-                        parameters=detached_params
-                    )
+            # update the learning rate
+            self.lr_scheduler.step()
+
+        def parameters(self) -> list[float]:
+            return [x.detach().item() for x in list(self.params.detach())]  # convert to floats
+
+        def save_checkpoint(self, training_state: dict, checkpoint_path: str | Path) -> None:
+            """Writes the checkpoint to a temporary file first so an interrupted write never corrupts it."""
+            temporary_path = f"{checkpoint_path}.tmp"
+            torch.save(
+                {
+                    "training_state": training_state,
+                    "params": self.params.detach().clone(),
+                    "adam_optimizer": self.adam_optimizer.state_dict(),
+                    "lr_scheduler": self.lr_scheduler.state_dict(),
+                },
+                temporary_path,
+            )
+            os.replace(temporary_path, checkpoint_path)
+
+        @classmethod
+        def load_checkpoint(cls, checkpoint_path: str | Path) -> tuple[dict, TensorTrainer]:
+            """Returns the training state and the trainer saved by save_checkpoint."""
+            # the checkpoint only holds tensors and plain Python values, whatever the torch version defaults to
+            checkpoint = torch.load(checkpoint_path, weights_only=True)
+
+            trainer = cls(
+                checkpoint["params"].tolist(),
+                learning_rate=learning_rate,
+                num_steps=checkpoint["lr_scheduler"]["T_max"],
+            )
+            # the scheduler sets the learning rate when it's created, so the saved states are loaded afterwards
+            trainer.adam_optimizer.load_state_dict(checkpoint["adam_optimizer"])
+            trainer.lr_scheduler.load_state_dict(checkpoint["lr_scheduler"])
 
-                # if the batch loss is better with the current parameters, update the current best parameters
-                if epoch_batch_loss < best_loss:
-                    best_loss = epoch_batch_loss
-                    best_params = detached_params
+            return checkpoint["training_state"], trainer
 
-            return best_params
+    DEFAULT_TRAINER = TensorTrainer
 
-        def _compute_probs_and_costs(self) -> dict[str, float]:
-            review_log_df = pd.DataFrame(
-                vars(review_log) for review_log in self.review_logs
-            )
+except ImportError:
+    # without torch, the optimizer trains with the NumPy backend
+    DEFAULT_TRAINER = ArrayTrainer
+
+
+# the cards are split into shards of this many cards to evaluate the loss, each shard being one task
+# when the loss is spread over worker processes
+LOSS_SHARD_SIZE = 4096
+
+# the review histories held by a loss worker process, set once by its initializer
+_worker_review_histories = None
+
+
+def _init_loss_worker(trainer_class: type, review_histories: ReviewHistoryArrays) -> None:
+    global _worker_review_histories
+    _worker_review_histories = review_histories
+    trainer_class.init_worker()
+
+
+def _shard_loss(
+    trainer_class: type,
+    review_histories: ReviewHistoryArrays | None,
+    parameters: list[float],
+    rows: np.ndarray,
+) -> tuple[float, int]:
+    """Returns the summed loss and the number of reviews of the cards in `rows`."""
+    if review_histories is None:
+        review_histories = _worker_review_histories
+
+    return trainer_class.loss(review_histories, parameters, rows)
+
+
+def _shard_gradient(
+    trainer_class: type,
+    review_histories: ReviewHistoryArrays | None,
+    parameters: list[float],
+    rows: np.ndarray,
+) -> np.ndarray:
+    """Returns the gradient of the summed loss of `rows` with respect to the parameters."""
+    if review_histories is None:
+        review_histories = _worker_review_histories
+
+    return trainer_class.gradient(review_histories, parameters, rows)
+
+
+def _shard_evaluation(
+    review_histories: ReviewHistoryArrays | None,
+    parameters: list[float],
+    rows: np.ndarray,
+) -> np.ndarray:
+    """Returns the evaluation_statistics of the cards in `rows`."""
+    if review_histories is None:
+        review_histories = _worker_review_histories
+
+    return evaluation_statistics(review_histories, parameters, rows)
+
+
+def _bootstrap_resample(
+    optimizer_class: type,
+    review_histories: ReviewHistoryArrays | None,
+    card_rows: np.ndarray | None,
+    seed: int,
+    index: int,
+) -> list[float]:
+    """
+    Returns the optimal parameters of the `index`-th bootstrap resample of the cards `card_rows` (all by default).
+    The resample is drawn from (seed, index), so it doesn't depend on which process trains it, and is only an
+    array of row indices.
+    """
+    if review_histories is None:
+        review_histories = _worker_review_histories
+
+    rng = np.random.default_rng([seed, index])
+    resample = optimizer_class._view(review_histories, card_rows=card_rows)._resample(rng)
+    return resample.compute_optimal_parameters(seed=int(rng.integers(2**63)))
+
+
+class Optimizer:
+    """
+    The FSRS optimizer.
+
+    Enables the optimization of FSRS scheduler parameters from existing review logs for more accurate interval calculations.
+
+    Attributes:
+        trainer_class: The training backend, TensorTrainer when torch is installed and ArrayTrainer otherwise.
+        review_logs: A collection of previous ReviewLog objects from a user. Empty when created with from_database.
+        _revlogs_train: The collection of review logs, sorted and formatted for optimization. None when created with from_database.
+        _review_histories: The formatted review logs packed into padded arrays.
+        _review_log_summary: The rating counts and durations of the review logs, read from the review_statistics table when created with from_database.
+    """
+
+    # the training backend, see TensorTrainer and services.numpy_optimizer.ArrayTrainer
+    trainer_class = DEFAULT_TRAINER
+
+    review_logs: tuple[ReviewLog, ...]
+    _revlogs_train: dict | None
+    _review_histories: ReviewHistoryArrays
+    _review_log_summary: ReviewLogSummary
+    # the rows of _review_histories to train on, e.g. a bootstrap resample; None for all of them
+    _card_rows: np.ndarray | None
+
+    def __init__(
+        self, review_logs: tuple[ReviewLog, ...] | list[ReviewLog]
+    ) -> None:
+        """
+        Initializes the Optimizer with a set of ReviewLogs. Also formats a copy of the review logs for optimization.
 
-            review_log_df = review_log_df.sort_values(
-                by=["card_id", "review_datetime"], ascending=[True, True]
-            ).reset_index(drop=True)
+        Note that the ReviewLogs provided by the user don't need to be in order.
+        """
 
-            # dictionary to return
-            probs_and_costs_dict = {}
+        def _format_revlogs() -> dict:
+            """
+            Sorts and converts the tuple of ReviewLog objects to a dictionary format for optimizing
+            """
 
-            # compute the probabilities and costs of the first rating
-            first_reviews_df = review_log_df.loc[
-                ~review_log_df["card_id"].duplicated(keep="first")
-            ].reset_index(drop=True)
+            revlogs_train = {}
+            for review_log in self.review_logs:
+                # pull data out of current ReviewLog object
+                card_id = review_log.card_id
+                rating = review_log.rating
+                review_datetime = review_log.review_datetime
+                review_duration = review_log.review_duration
 
-            first_again_reviews_df = first_reviews_df.loc[
-                first_reviews_df["rating"] == Rating.Again
-            ]
-            first_hard_reviews_df = first_reviews_df.loc[
-                first_reviews_df["rating"] == Rating.Hard
-            ]
-            first_good_reviews_df = first_reviews_df.loc[
-                first_reviews_df["rating"] == Rating.Good
-            ]
-            first_easy_reviews_df = first_reviews_df.loc[
-                first_reviews_df["rating"] == Rating.Easy
-            ]
+                # if the card was rated Again, it was not recalled
+                recall = 0 if rating == Rating.Again else 1
 
-            # compute the probability of the user clicking again/hard/good/easy given it's their first review
-            num_first_again = len(first_again_reviews_df)
-            num_first_hard = len(first_hard_reviews_df)
-            num_first_good = len(first_good_reviews_df)
-            num_first_easy = len(first_easy_reviews_df)
+                # as a ML problem, [x, y] = [ [review_datetime, rating, review_duration], recall ]
+                datum = [[review_datetime, rating, review_duration], recall]
 
-            num_first_review = (
-                num_first_again + num_first_hard + num_first_good + num_first_easy
-            )
+                if card_id not in revlogs_train:
+                    revlogs_train[card_id] = []
 
-            prob_first_again = num_first_again / num_first_review
-            prob_first_hard = num_first_hard / num_first_review
-            prob_first_good = num_first_good / num_first_review
-            prob_first_easy = num_first_easy / num_first_review
+                revlogs_train[card_id].append((datum))
 
-            probs_and_costs_dict["prob_first_again"] = prob_first_again
-            probs_and_costs_dict["prob_first_hard"] = prob_first_hard
-            probs_and_costs_dict["prob_first_good"] = prob_first_good
-            probs_and_costs_dict["prob_first_easy"] = prob_first_easy
+            # sort each card's reviews once they're all collected
+            for card_review_history in revlogs_train.values():
+                card_review_history.sort(key=lambda x: x[0][0])
 
-            # compute the cost of the user clicking again/hard/good/easy on their first review
-            first_again_review_durations = list(
-                first_again_reviews_df["review_duration"]
-            )
-            first_hard_review_durations = list(first_hard_reviews_df["review_duration"])
-            first_good_review_durations = list(first_good_reviews_df["review_duration"])
-            first_easy_review_durations = list(first_easy_reviews_df["review_duration"])
-
-            avg_first_again_review_duration = (
-                mean(first_again_review_durations)
-                if first_again_review_durations
-                else 0
-            )
-            avg_first_hard_review_duration = (
-                mean(first_hard_review_durations) if first_hard_review_durations else 0
-            )
-            avg_first_good_review_duration = (
-                mean(first_good_review_durations) if first_good_review_durations else 0
-            )
-            avg_first_easy_review_duration = (
-                mean(first_easy_review_durations) if first_easy_review_durations else 0
-            )
+            # sort the dictionary in order of when each card history starts
+            revlogs_train = dict(sorted(revlogs_train.items()))
 
-            probs_and_costs_dict["avg_first_again_review_duration"] = (
-                avg_first_again_review_duration
-            )
-            probs_and_costs_dict["avg_first_hard_review_duration"] = (
-                avg_first_hard_review_duration
-            )
-            probs_and_costs_dict["avg_first_good_review_duration"] = (
-                avg_first_good_review_duration
-            )
-            probs_and_costs_dict["avg_first_easy_review_duration"] = (
-                avg_first_easy_review_duration
+            return revlogs_train
+
+        self.review_logs = tuple(review_logs)
+
+        # format the ReviewLog data for optimization
+        self._revlogs_train = _format_revlogs()
+
+        self._review_log_summary = ReviewLogSummary()
+        for card_review_history in self._revlogs_train.values():
+            self._review_log_summary.add_history(
+                [(datum[0][1], datum[0][2]) for datum in card_review_history]
             )
 
-            # compute the probabilities and costs of non-first ratings
-            non_first_reviews_df = review_log_df.loc[
-                review_log_df["card_id"].duplicated(keep="first")
-            ].reset_index(drop=True)
+        # pack the formatted histories into padded arrays for batched training
+        self._review_histories = ReviewHistoryArrays.from_revlogs_train(
+            self._revlogs_train, seq_len=max_seq_len
+        )
+        self._card_rows = None
+
+    @classmethod
+    def from_database(
+        cls,
+        revlog_crud: RevlogCRUD | None = None,
+        since_revlog_id: int | None = None,
+        deck_id: int | None = None,
+    ) -> Optimizer:
+        """
+        Creates an Optimizer from the revlogs table without building ReviewLog objects.
 
-            again_reviews_df = non_first_reviews_df.loc[
-                non_first_reviews_df["rating"] == Rating.Again
-            ]
-            hard_reviews_df = non_first_reviews_df.loc[
-                non_first_reviews_df["rating"] == Rating.Hard
-            ]
-            good_reviews_df = non_first_reviews_df.loc[
-                non_first_reviews_df["rating"] == Rating.Good
-            ]
-            easy_reviews_df = non_first_reviews_df.loc[
-                non_first_reviews_df["rating"] == Rating.Easy
-            ]
+        The review logs are read ordered by (card_id, review_datetime), one page of reviews of
+        RevlogCRUD.stream_reviews_ordered_by_card's cards_per_page cards at a time, and grouped into card
+        histories in one pass, so besides the packed arrays only one page of reviews is held in memory at once. The rating statistics used by compute_optimal_retention are read from the
+        review_statistics table, which covers every review regardless of since_revlog_id.
+
+        If since_revlog_id is given, only the cards reviewed after that revlogs rowid are loaded and only
+        those newer reviews count towards the loss; the older ones are replayed to rebuild the memory state.
+
+        If deck_id is given, only the cards in that deck are loaded. The rating statistics still cover the whole
+        collection.
+        """
 
-            # compute the probability of the user clicking hard/good/easy given they correctly recalled the card
-            num_hard = len(hard_reviews_df)
-            num_good = len(good_reviews_df)
-            num_easy = len(easy_reviews_df)
+        revlog_crud = revlog_crud if revlog_crud is not None else RevlogCRUD()
 
-            num_recall = num_hard + num_good + num_easy
+        def _stream_histories():
+            rows = revlog_crud.stream_reviews_ordered_by_card(since_revlog_id, deck_id)
+            for card_id, card_rows in groupby(rows, key=itemgetter(0)):
+                # rows are (card_id, rating, review_datetime, review_duration, revlog_id)
+                card_rows = list(card_rows)
 
-            prob_hard = num_hard / num_recall
-            prob_good = num_good / num_recall
-            prob_easy = num_easy / num_recall
+                loss_start = 0
+                if since_revlog_id is not None:
+                    loss_start = next(
+                        (i for i, row in enumerate(card_rows) if row[4] > since_revlog_id),
+                        len(card_rows),
+                    )
+
+                yield card_id, [(row[2], row[1]) for row in card_rows], loss_start
+
+        return cls._view(
+            ReviewHistoryArrays.from_histories(
+                _stream_histories(),
+                num_cards=revlog_crud.count_reviewed_cards(since_revlog_id, deck_id),
+                seq_len=max_seq_len,
+            ),
+            review_log_summary=ReviewLogSummary.from_statistics_rows(
+                revlog_crud.get_review_statistics()
+            ),
+        )
+
+    @classmethod
+    def optimize_stored_parameters(
+        cls,
+        warm_start: bool = True,
+        verbose: bool = False,
+        workers: int = 1,
+        data_parallel: bool = False,
+        revlog_crud: RevlogCRUD | None = None,
+        parameters_crud: ParametersCRUD | None = None,
+        deck_id: int | None = None,
+    ) -> ParameterUpdate | None:
+        """
+        Optimizes the parameters stored in the database and stores the result with the high-water mark
+        of the revlogs it was trained on.
+
+        With warm_start, the stored parameters are fine-tuned on the reviews added since their high-water
+        mark (the older reviews of the same cards are only replayed), which keeps re-optimization cheap as
+        the revlogs grow. It falls back to a full retrain from DEFAULT_PARAMETERS on every review when
+        nothing is stored yet, or when the loss has drifted: the stored parameters' loss on the new reviews
+        is more than warm_start_max_loss_drift above the fine-tuned parameters' loss on them. While fewer
+        than mini_batch_size new reviews count towards the loss, the stored parameters are returned unchanged.
+
+        If deck_id is given, the parameter set of that deck is optimized on the reviews of its cards only, with the
+        deck's own high-water mark. A deck whose reviews are too few to train on gets no parameter set, so that it
+        keeps using its parent deck's or the collection-wide one, and None is returned.
+        """
 
-            probs_and_costs_dict["prob_hard"] = prob_hard
-            probs_and_costs_dict["prob_good"] = prob_good
-            probs_and_costs_dict["prob_easy"] = prob_easy
+        revlog_crud = revlog_crud if revlog_crud is not None else RevlogCRUD()
+        parameters_crud = (
+            parameters_crud if parameters_crud is not None else ParametersCRUD()
+        )
 
-            again_review_durations = list(again_reviews_df["review_duration"])
-            hard_review_durations = list(hard_reviews_df["review_duration"])
-            good_review_durations = list(good_reviews_df["review_duration"])
-            easy_review_durations = list(easy_reviews_df["review_duration"])
+        high_water_mark = revlog_crud.get_max_revlog_id(deck_id)
+        stored = parameters_crud.get_parameters(deck_id)
 
-            avg_again_review_duration = (
-                mean(again_review_durations) if again_review_durations else 0
+        def _store(
+            parameters: list[float], loss: float | None, full_retrain: bool
+        ) -> ParameterUpdate:
+            parameters_crud.insert_or_replace_parameters(
+                parameters=parameters,
+                revlog_high_water_mark=high_water_mark,
+                loss=loss,
+                updated_at=Scheduler.date_to_epoch_millis(datetime.now(timezone.utc)),
+                deck_id=deck_id,
             )
-            avg_hard_review_duration = (
-                mean(hard_review_durations) if hard_review_durations else 0
+            return ParameterUpdate(parameters, loss, high_water_mark, full_retrain)
+
+        if warm_start and stored is not None:
+            stored_parameters = ParametersCRUD.parse_parameters(stored)
+            unchanged = ParameterUpdate(
+                stored_parameters,
+                stored["loss"],
+                stored["revlog_high_water_mark"],
+                False,
             )
-            avg_good_review_duration = (
-                mean(good_review_durations) if good_review_durations else 0
+
+            if stored["revlog_high_water_mark"] >= high_water_mark:
+                return unchanged
+
+            optimizer = cls.from_database(
+                revlog_crud,
+                since_revlog_id=stored["revlog_high_water_mark"],
+                deck_id=deck_id,
             )
-            avg_easy_review_duration = (
-                mean(easy_review_durations) if easy_review_durations else 0
+            if int(optimizer._review_histories.num_loss_reviews.sum()) < mini_batch_size:
+                # keep the high-water mark so that new reviews accumulate
+                return unchanged
+
+            parameters = optimizer.compute_optimal_parameters(
+                verbose=verbose,
+                workers=workers,
+                initial_parameters=stored_parameters,
+                data_parallel=data_parallel,
             )
+            loss = optimizer._compute_batch_loss(parameters)
+
+            # both losses are on the new reviews, so they are comparable
+            stored_loss = optimizer._compute_batch_loss(stored_parameters)
+            if stored_loss <= loss * (1 + warm_start_max_loss_drift):
+                return _store(parameters, loss, False)
+
+        optimizer = cls.from_database(revlog_crud, deck_id=deck_id)
+        if (
+            deck_id is not None
+            and int(optimizer._review_histories.num_loss_reviews.sum()) < mini_batch_size
+        ):
+            return None
+
+        parameters = optimizer.compute_optimal_parameters(
+            verbose=verbose, workers=workers, data_parallel=data_parallel
+        )
+        loss = (
+            optimizer._compute_batch_loss(parameters)
+            if int(optimizer._review_histories.num_loss_reviews.sum()) > 0
+            else None
+        )
+        return _store(parameters, loss, True)
+
+    @classmethod
+    def optimize_deck_parameters(
+        cls,
+        deck_ids: list[int] | None = None,
+        warm_start: bool = True,
+        verbose: bool = False,
+        workers: int | None = None,
+        revlog_crud: RevlogCRUD | None = None,
+        parameters_crud: ParametersCRUD | None = None,
+    ) -> dict[int, ParameterUpdate | None]:
+        """
+        Optimizes and stores the parameter set of each deck in `deck_ids` (every deck with reviews by default)
+        with optimize_stored_parameters, training the decks in parallel with one worker process per deck.
 
-            probs_and_costs_dict["avg_again_review_duration"] = (
-                avg_again_review_duration
-            )
-            probs_and_costs_dict["avg_hard_review_duration"] = avg_hard_review_duration
-            probs_and_costs_dict["avg_good_review_duration"] = avg_good_review_duration
-            probs_and_costs_dict["avg_easy_review_duration"] = avg_easy_review_duration
+        Each deck is trained single-process, so `workers` (the CPU count by default) bounds the number of decks
+        trained at once. Returns the ParameterUpdate of each deck, None for the decks with too few reviews.
+        Schedulers cached by a SchedulerCache must be invalidated to pick up the new parameters.
+        """
 
-            return probs_and_costs_dict
+        revlog_crud = revlog_crud if revlog_crud is not None else RevlogCRUD()
+        parameters_crud = (
+            parameters_crud if parameters_crud is not None else ParametersCRUD()
+        )
+        if deck_ids is None:
+            deck_ids = revlog_crud.get_reviewed_deck_ids()
+        workers = min(workers if workers is not None else (os.cpu_count() or 1), len(deck_ids))
+
+        if workers <= 1:
+            return {
+                deck_id: cls.optimize_stored_parameters(
+                    warm_start=warm_start,
+                    verbose=verbose,
+                    revlog_crud=revlog_crud,
+                    parameters_crud=parameters_crud,
+                    deck_id=deck_id,
+                )
+                for deck_id in deck_ids
+            }
+
+        # the workers open their own connections through the CRUD singletons
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=cls.trainer_class.init_worker,
+        ) as executor:
+            futures = {
+                deck_id: executor.submit(
+                    cls.optimize_stored_parameters,
+                    warm_start=warm_start,
+                    verbose=verbose,
+                    deck_id=deck_id,
+                )
+                for deck_id in deck_ids
+            }
+            return {deck_id: future.result() for deck_id, future in futures.items()}
+
+    def _loss_pool(self, workers: int):
+        """A process pool whose workers hold the review histories, or no pool (run in-process) for 1 worker."""
+        if workers <= 1:
+            return nullcontext()
+
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_loss_worker,
+            initargs=(self.trainer_class, self._review_histories),
+        )
+
+    def _compute_batch_loss(
+        self, parameters: list[float], executor: Executor | None = None
+    ) -> float:
+        """
+        Computes the current total loss for the entire batch of review logs.
 
-        def _simulate_cost(
-            self,
-            desired_retention: float,
-            parameters: tuple[float, ...] | list[float],
-            num_cards_simulate: int,
-            probs_and_costs_dict: dict[str, float],
-        ) -> float:
-            rng = Random(42)
-
-            # simulate from the beginning of 2025 till before the beginning of 2026
-            start_date = datetime(2025, 1, 1, 0, 0, 0, 0, timezone.utc)
-            end_date = datetime(2026, 1, 1, 0, 0, 0, 0, timezone.utc)
-
-            scheduler = Scheduler(
-                parameters=parameters,
-                desired_retention=desired_retention,
-                enable_fuzzing=False,
-            )
+        The cards are evaluated in shards of LOSS_SHARD_SIZE cards, on the workers of `executor` if given
+        (see _loss_pool). The shard losses are summed in order, so the result is the same for any number of workers.
+        """
 
-            # unpack probs_and_costs_dict
-            prob_first_again = probs_and_costs_dict["prob_first_again"]
-            prob_first_hard = probs_and_costs_dict["prob_first_hard"]
-            prob_first_good = probs_and_costs_dict["prob_first_good"]
-            prob_first_easy = probs_and_costs_dict["prob_first_easy"]
+        shards = self._card_shards()
 
-            avg_first_again_review_duration = probs_and_costs_dict[
-                "avg_first_again_review_duration"
-            ]
-            avg_first_hard_review_duration = probs_and_costs_dict[
-                "avg_first_hard_review_duration"
-            ]
-            avg_first_good_review_duration = probs_and_costs_dict[
-                "avg_first_good_review_duration"
-            ]
-            avg_first_easy_review_duration = probs_and_costs_dict[
-                "avg_first_easy_review_duration"
+        if executor is None:
+            shard_losses = [
+                _shard_loss(self.trainer_class, self._review_histories, parameters, rows)
+                for rows in shards
             ]
+        else:
+            shard_losses = list(
+                executor.map(
+                    _shard_loss,
+                    *zip(*[(self.trainer_class, None, parameters, rows) for rows in shards]),
+                )
+            )
+
+        batch_loss = sum(loss for loss, _ in shard_losses)
+        num_reviews = sum(num_reviews for _, num_reviews in shard_losses)
 
-            prob_hard = probs_and_costs_dict["prob_hard"]
-            prob_good = probs_and_costs_dict["prob_good"]
-            prob_easy = probs_and_costs_dict["prob_easy"]
+        return batch_loss / num_reviews
 
-            avg_again_review_duration = probs_and_costs_dict[
-                "avg_again_review_duration"
+    def bootstrap_parameters(
+        self,
+        num_resamples: int = 100,
+        confidence: float = 0.95,
+        workers: int = 1,
+        seed: int = 42,
+        num_intervals: int = 5,
+    ) -> BootstrapResult:
+        """
+        Estimates the uncertainty of compute_optimal_parameters by re-optimizing the parameters on `num_resamples`
+        resamples of the cards drawn with replacement, and returns percentile confidence intervals of each parameter.
+        The spread of the schedules they produce is summarized by the first `num_intervals` intervals of a new card
+        rated Good at every review, under each resample's parameters with the default desired retention.
+
+        A resample is only an array of row indices into the packed review histories, so memory doesn't grow with
+        num_resamples. The resamples are trained one per task on `workers` processes which each hold the histories
+        once; the result is the same for any number of workers.
+        """
+
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+
+        if workers <= 1:
+            samples = [
+                _bootstrap_resample(type(self), self._review_histories, self._card_rows, seed, index)
+                for index in range(num_resamples)
             ]
-            avg_hard_review_duration = probs_and_costs_dict["avg_hard_review_duration"]
-            avg_good_review_duration = probs_and_costs_dict["avg_good_review_duration"]
-            avg_easy_review_duration = probs_and_costs_dict["avg_easy_review_duration"]
-
-            simulation_cost = 0
-            for i in range(num_cards_simulate):
-                card = Card()
-                curr_date = start_date
-                while curr_date < end_date:
-                    # the card is new
-                    if curr_date == start_date:
-                        rating = rng.choices(
-                            [Rating.Again, Rating.Hard, Rating.Good, Rating.Easy],
-                            weights=[
-                                prob_first_again,
-                                prob_first_hard,
-                                prob_first_good,
-                                prob_first_easy,
-                            ],
-                        )[0]
-
-                        if rating == Rating.Again:
-                            simulation_cost += avg_first_again_review_duration
-
-                        elif rating == Rating.Hard:
-                            simulation_cost += avg_first_hard_review_duration
-
-                        elif rating == Rating.Good:
-                            simulation_cost += avg_first_good_review_duration
-
-                        elif rating == Rating.Easy:
-                            simulation_cost += avg_first_easy_review_duration
-
-                    # the card is not new
-                    else:
-                        rating = rng.choices(
-                            ["recall", Rating.Again],
-                            weights=[desired_retention, 1.0 - desired_retention],
-                        )[0]
+        else:
+            with self._loss_pool(workers) as executor:
+                samples = list(
+                    executor.map(
+                        _bootstrap_resample,
+                        *zip(
+                            *[
+                                (type(self), None, self._card_rows, seed, index)
+                                for index in range(num_resamples)
+                            ]
+                        ),
+                    )
+                )
 
-                        if rating == "recall":
-                            # compute probability that the user chose hard/good/easy, GIVEN that they correctly recalled the card
-                            rating = rng.choices(
-                                [Rating.Hard, Rating.Good, Rating.Easy],
-                                weights=[prob_hard, prob_good, prob_easy],
-                            )[0]
+        interval_samples = [
+            self._good_review_intervals(parameters, num_intervals)
+            for parameters in samples
+        ]
+
+        percentiles = [50 * (1 - confidence), 50, 50 * (1 + confidence)]
+        lower, median, upper = np.percentile(samples, percentiles, axis=0).tolist()
+        interval_lower, interval_median, interval_upper = np.percentile(
+            interval_samples, percentiles, axis=0
+        ).tolist()
+
+        return BootstrapResult(
+            confidence=confidence,
+            samples=samples,
+            lower=lower,
+            median=median,
+            upper=upper,
+            interval_samples=interval_samples,
+            interval_lower=interval_lower,
+            interval_median=interval_median,
+            interval_upper=interval_upper,
+        )
+
+    @staticmethod
+    def _good_review_intervals(parameters: list[float], num_intervals: int) -> list[int]:
+        """The first num_intervals intervals in days of a new card rated Good on each due date."""
+        scheduler = Scheduler(
+            parameters=parameters,
+            learning_steps=(),
+            relearning_steps=(),
+            enable_fuzzing=False,
+        )
+
+        card = Card(None)
+        review_datetime = Scheduler.date_to_epoch_millis(datetime.now(timezone.utc))
+        intervals = []
+        for _ in range(num_intervals):
+            card, _, _ = scheduler.review_card_millis(card, Rating.Good, review_datetime)
+            intervals.append((card.due - review_datetime) // MILLIS_PER_DAY)
+            review_datetime = card.due
+
+        return intervals
+
+    def _compute_mini_batch_gradient(
+        self,
+        parameters: list[float],
+        rows: np.ndarray,
+        executor: Executor,
+        workers: int,
+    ) -> np.ndarray:
+        """
+        Computes the gradient of the loss of the mini-batch `rows` on the workers of `executor`, each one replaying
+        a contiguous part of the rows. The loss is summed over the reviews, so its gradient is the sum of the parts'.
+        """
 
-                        if rating == Rating.Again:
-                            simulation_cost += avg_again_review_duration
+        parts = [part for part in np.array_split(rows, workers) if len(part)]
+        part_gradients = executor.map(
+            _shard_gradient,
+            *zip(*[(self.trainer_class, None, parameters, part) for part in parts]),
+        )
 
-                        elif rating == Rating.Hard:
-                            simulation_cost += avg_hard_review_duration
+        # summed in order, so the step is reproducible
+        gradient = np.zeros(len(parameters))
+        for part_gradient in part_gradients:
+            gradient += part_gradient
+        return gradient
 
-                        elif rating == Rating.Good:
-                            simulation_cost += avg_good_review_duration
+    def split_by_time(self, test_start: int) -> tuple[Optimizer, Optimizer]:
+        """
+        Splits the review logs at the epochmillis `test_start` for out-of-sample evaluation: the first Optimizer
+        trains on the reviews before it, the second one evaluates on the reviews from it on, after replaying each
+        card's earlier reviews. Both keep this Optimizer's rating statistics.
 
-                        elif rating == Rating.Easy:
-                            simulation_cost += avg_easy_review_duration
+        e.g. train, test = optimizer.split_by_time(test_start)
+             test.evaluate_many([DEFAULT_PARAMETERS, train.compute_optimal_parameters()])
+        """
 
-                    card, _ = scheduler.review_card(
-                        card=card, rating=rating, review_datetime=curr_date
+        train, test = self._review_histories.split_by_time(test_start)
+        return (
+            self._view(train, review_log_summary=self._review_log_summary),
+            self._view(test, review_log_summary=self._review_log_summary),
+        )
+
+    @classmethod
+    def _view(
+        cls,
+        review_histories: ReviewHistoryArrays,
+        card_rows: np.ndarray | None = None,
+        review_log_summary: ReviewLogSummary | None = None,
+    ) -> Optimizer:
+        """
+        An Optimizer over the rows `card_rows` (all by default) of review histories held elsewhere. Every Optimizer
+        not built from ReviewLogs (from_database, split_by_time, bootstrap resamples) is created here.
+        """
+        optimizer = cls.__new__(cls)
+        optimizer.review_logs = ()
+        optimizer._revlogs_train = None
+        optimizer._review_histories = review_histories
+        optimizer._card_rows = card_rows
+        optimizer._review_log_summary = review_log_summary
+        return optimizer
+
+    def _resample(self, rng: np.random.Generator) -> Optimizer:
+        """A view over the training rows drawn with replacement, as many as there are, e.g. for bootstrapping."""
+        rows = self._training_rows()
+        return self._view(
+            self._review_histories,
+            card_rows=rows[rng.integers(0, len(rows), size=len(rows))],
+            review_log_summary=self._review_log_summary,
+        )
+
+    def _training_rows(self) -> np.ndarray:
+        """The rows of the review histories this Optimizer trains and evaluates on, possibly repeated."""
+        if self._card_rows is None:
+            return np.arange(len(self._review_histories))
+        return self._card_rows
+
+    def _card_shards(self) -> list[np.ndarray]:
+        """Splits the training rows into shards of LOSS_SHARD_SIZE cards."""
+        rows = self._training_rows()
+        return [
+            rows[start : start + LOSS_SHARD_SIZE]
+            for start in range(0, len(rows), LOSS_SHARD_SIZE)
+        ]
+
+    def evaluate(
+        self, parameters: tuple[float, ...] | list[float], workers: int = 1
+    ) -> EvaluationResult:
+        """Computes the log loss, RMSE and calibration of `parameters` on the review logs, see evaluate_many."""
+        return self.evaluate_many([parameters], workers=workers)[0]
+
+    def evaluate_many(
+        self,
+        parameters_list: list[tuple[float, ...] | list[float]],
+        workers: int = 1,
+    ) -> list[EvaluationResult]:
+        """
+        Computes the log loss, RMSE and binned calibration of each parameter vector on the reviews that count
+        towards the training loss, so that log_loss equals _compute_batch_loss.
+
+        Every card is replayed at once in NumPy with either backend. The cards are evaluated in shards of
+        LOSS_SHARD_SIZE cards, each shard and parameter vector being one task for the `workers` processes.
+        """
+
+        shards = self._card_shards()
+        tasks = [
+            (list(parameters), rows)
+            for parameters in parameters_list
+            for rows in shards
+        ]
+
+        with self._loss_pool(workers) as executor:
+            if executor is None:
+                shard_statistics = [
+                    _shard_evaluation(self._review_histories, parameters, rows)
+                    for parameters, rows in tasks
+                ]
+            else:
+                shard_statistics = list(
+                    executor.map(
+                        _shard_evaluation,
+                        *zip(*[(None, *task) for task in tasks]),
                     )
-                    curr_date = card.due
+                )
+
+        # the shard statistics are summed in order, so the results don't depend on the number of workers
+        results = []
+        for i in range(len(parameters_list)):
+            statistics = np.zeros(3 + 3 * NUM_CALIBRATION_BINS)
+            for shard in shard_statistics[i * len(shards) : (i + 1) * len(shards)]:
+                statistics += shard
+            results.append(EvaluationResult.from_statistics(statistics))
+
+        return results
+
+    def compute_optimal_parameters(
+        self,
+        verbose: bool = False,
+        workers: int = 1,
+        initial_parameters: list[float] | None = None,
+        checkpoint_path: str | Path | None = None,
+        patience: int | None = None,
+        data_parallel: bool = False,
+        seed: int = 42,
+    ) -> list[float]:
+        """
+        Computes a set of optimized parameters for the FSRS scheduler and returns it as a list of floats.
 
-            total_knowledge = desired_retention * num_cards_simulate
-            simulation_cost = simulation_cost / total_knowledge
+        High level explanation of optimization:
+        ---------------------------------------
+        FSRS is a many-to-many sequence model where the "State" at each step is a Card object at a given point in time,
+        the input is the time of the review and the output is the predicted retrievability of the card at the time of review.
 
-            return simulation_cost
+        Each card's review history can be thought of as a sequence, each review as a step and each collection of card review histories
+        as a batch.
 
-        def compute_optimal_retention(
-            self, parameters: tuple[float, ...] | list[float]
-        ) -> list[float]:
-            def _validate_review_logs() -> None:
-                if len(self.review_logs) < 512:
-                    raise ValueError(
-                        "Not enough ReviewLog's: at least 512 ReviewLog objects are required to compute optimal retention"
-                    )
+        The loss is computed by comparing the predicted retrievability of the Card at each step with whether the Card was actually
+        sucessfully recalled or not (0/1).
 
-                for review_log in self.review_logs:
-                    if review_log.review_duration is None:
-                        raise ValueError(
-                            "ReviewLog.review_duration cannot be None when computing optimal retention"
-                        )
+        Finally, the card objects at each step in their sequences are updated using the current parameters of the Scheduler
+        as well as the rating given to that card by the user. The parameters of the Scheduler is what is being optimized.
+
+        The histories are held as padded [cards x steps] arrays (see ReviewHistoryArrays) and each mini-batch of cards
+        is replayed one time-step at a time across all of its cards at once. The gradients come from torch's autograd
+        (TensorTrainer) or, when torch isn't installed, from forward-mode differentiation in NumPy (ArrayTrainer).
+
+        The loss evaluated after each epoch is spread over `workers` processes; the result doesn't depend on their number.
+        With data_parallel, every mini-batch is also split across the workers: each computes the gradient of the loss
+        of its part of the cards, and the summed gradients drive a single Adam step. The result then matches the
+        single-process one up to floating-point rounding.
+
+        The cards are shuffled by a generator seeded with `seed`, so a run is reproducible.
+
+        If initial_parameters are given, training fine-tunes them with a smaller learning rate instead of starting
+        from DEFAULT_PARAMETERS, and they are kept unless an epoch improves on their loss.
+
+        If checkpoint_path is given, the parameters, Adam and learning rate scheduler states, the shuffling RNG state
+        and the best parameters so far are saved there after every epoch, and resume_optimal_parameters can continue
+        an interrupted run. If patience is given, training stops early once the epoch batch loss hasn't improved by
+        early_stopping_min_delta for that many epochs.
+        """
+
+        # set local random seed for reproducibility
+        rng = Random(seed)
+
+        review_histories = self._review_histories
+
+        # only the loss from non-same-day reviews counts for optimization
+        training_rows = self._training_rows()
+        num_reviews = int(review_histories.num_loss_reviews[training_rows].sum())
+
+        if num_reviews < mini_batch_size:
+            return list(
+                DEFAULT_PARAMETERS if initial_parameters is None else initial_parameters
+            )
+
+        # randomly shuffle the order of which Card's review histories get computed first at the beginning
+        # of each epoch. The shuffles are replayed up front on a copy of the generator so that the Cosine
+        # Annealing learning rate scheduler can be initialized with the exact number of steps
+        card_order = training_rows.tolist()
+        planning_rng = Random()
+        planning_rng.setstate(rng.getstate())
+        planning_card_order = list(card_order)
+        num_steps = 0
+        for _ in range(num_epochs):
+            planning_rng.shuffle(planning_card_order)
+            num_steps += len(
+                review_histories.mini_batches(planning_card_order, mini_batch_size)
+            )
+
+        trainer = self.trainer_class(
+            parameters=list(
+                DEFAULT_PARAMETERS if initial_parameters is None else initial_parameters
+            ),
+            learning_rate=learning_rate if initial_parameters is None else warm_start_learning_rate,
+            num_steps=num_steps,
+        )
+
+        training_state = {
+            "epoch": 0,
+            "rng_state": rng.getstate(),
+            "card_order": card_order,
+            "best_params": None if initial_parameters is None else list(initial_parameters),
+            "best_loss": None,
+            "epochs_without_improvement": 0,
+            "patience": patience,
+            "data_parallel": data_parallel,
+            "finished": False,
+            "data_fingerprint": self._data_fingerprint(),
+        }
+
+        return self._train(
+            training_state=training_state,
+            trainer=trainer,
+            checkpoint_path=checkpoint_path,
+            verbose=verbose,
+            workers=workers,
+        )
+
+    def resume_optimal_parameters(
+        self,
+        checkpoint_path: str | Path,
+        verbose: bool = False,
+        workers: int = 1,
+    ) -> list[float]:
+        """
+        Continues a compute_optimal_parameters run from the last checkpoint it wrote to `checkpoint_path`,
+        e.g. after the app was closed halfway through, and returns its result. The Optimizer must hold the
+        same review logs as the interrupted run, and be trained by the same backend.
+
+        Raises:
+            FileNotFoundError: If there is no checkpoint at `checkpoint_path`.
+            ValueError: If the checkpoint was written for different review logs.
+        """
+
+        training_state, trainer = self.trainer_class.load_checkpoint(checkpoint_path)
 
-            _validate_review_logs()
+        if training_state["data_fingerprint"] != self._data_fingerprint():
+            raise ValueError(
+                "The checkpoint was written for different review logs and cannot be resumed"
+            )
 
-            NUM_CARDS_SIMULATE = 1000
-            DESIRED_RETENTIONS = [0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+        return self._train(
+            training_state=training_state,
+            trainer=trainer,
+            checkpoint_path=checkpoint_path,
+            verbose=verbose,
+            workers=workers,
+        )
+
+    def _data_fingerprint(self) -> tuple[int, int, int]:
+        """Identifies the review logs (the training rows, e.g. of a resample) a checkpoint was written for."""
+        review_histories = self._review_histories
+        rows = self._training_rows()
+        return (
+            len(rows),
+            int(review_histories.lengths[rows].sum()),
+            int(review_histories.review_datetime[rows].sum()),
+        )
+
+    def _train(
+        self,
+        training_state: dict,
+        trainer: TensorTrainer | ArrayTrainer,
+        checkpoint_path: str | Path | None,
+        verbose: bool,
+        workers: int,
+    ) -> list[float]:
+        """
+        Runs the remaining epochs of compute_optimal_parameters from `training_state` with `trainer`, checkpointing
+        after every epoch if checkpoint_path is given, and returns the best parameters.
+        """
 
-            probs_and_costs_dict = self._compute_probs_and_costs()
+        review_histories = self._review_histories
+        rng = Random()
+        rng.setstate(training_state["rng_state"])
+        card_order = training_state["card_order"]
 
-            simulation_costs = []
-            for desired_retention in DESIRED_RETENTIONS:
-                simulation_cost = self._simulate_cost(
-                    desired_retention=desired_retention,
-                    parameters=parameters,
-                    num_cards_simulate=NUM_CARDS_SIMULATE,
-                    probs_and_costs_dict=probs_and_costs_dict,
+        with self._loss_pool(workers) as executor:
+            if training_state["best_params"] is not None and training_state["best_loss"] is None:
+                # warm start, the initial parameters are kept unless an epoch improves on them
+                training_state["best_loss"] = self._compute_batch_loss(
+                    parameters=training_state["best_params"], executor=executor
                 )
-                simulation_costs.append(simulation_cost)
 
-            min_index = simulation_costs.index(min(simulation_costs))
-            optimal_retention = DESIRED_RETENTIONS[min_index]
+            # iterate through the epochs
+            for epoch in tqdm(
+                range(training_state["epoch"], num_epochs),
+                desc="Optimizing",
+                unit="epoch",
+                disable=(not verbose or training_state["finished"]),
+                initial=training_state["epoch"],
+                total=num_epochs,
+            ):
+                if training_state["finished"]:
+                    break
+
+                rng.shuffle(card_order)
 
-            return optimal_retention
+                # take a gradient step after each mini-batch
+                for rows in review_histories.mini_batches(card_order, mini_batch_size):
+                    if executor is not None and training_state.get("data_parallel", False):
+                        trainer.apply_gradient(
+                            self._compute_mini_batch_gradient(
+                                trainer.parameters(), rows, executor, workers
+                            )
+                        )
+                    else:
+                        trainer.step(review_histories, rows)
 
-except ImportError:
+                # compute the current batch loss after each epoch
+                detached_params = trainer.parameters()
+                epoch_batch_loss = self._compute_batch_loss(
+                    parameters=detached_params, executor=executor
+                )
 
-    class Optimizer:
-        def __init__(self, *args, **kwargs) -> None:
-            raise ImportError(
-                'Torch import failed.\nOptimizer cannot be initiated.'
+                # if the batch loss is better with the current parameters, update the current best parameters
+                best_loss = training_state["best_loss"]
+                if best_loss is None or epoch_batch_loss < best_loss - early_stopping_min_delta:
+                    training_state["epochs_without_improvement"] = 0
+                else:
+                    training_state["epochs_without_improvement"] += 1
+                if best_loss is None or epoch_batch_loss < best_loss:
+                    training_state["best_loss"] = epoch_batch_loss
+                    training_state["best_params"] = detached_params
+
+                training_state["epoch"] = epoch + 1
+                training_state["rng_state"] = rng.getstate()
+                # stop early once the loss hasn't improved for `patience` epochs
+                patience = training_state["patience"]
+                training_state["finished"] = training_state["epoch"] == num_epochs or (
+                    patience is not None
+                    and training_state["epochs_without_improvement"] >= patience
+                )
+                if checkpoint_path is not None:
+                    trainer.save_checkpoint(training_state, checkpoint_path)
+
+        return training_state["best_params"]
+
+    def _compute_probs_and_costs(self) -> dict[str, float]:
+        return self._review_log_summary.probs_and_costs()
+
+    def _validate_review_logs(self) -> None:
+        num_review_logs = self._review_log_summary.num_review_logs
+        has_missing_durations = self._review_log_summary.num_missing_durations > 0
+
+        if num_review_logs < 512:
+            raise ValueError(
+                "Not enough ReviewLog's: at least 512 ReviewLog objects are required to compute optimal retention"
+            )
+
+        if has_missing_durations:
+            raise ValueError(
+                "ReviewLog.review_duration cannot be None when computing optimal retention"
             )
 
+    def compute_optimal_retention(
+        self, parameters: tuple[float, ...] | list[float], workers: int = 1
+    ) -> list[float]:
+        self._validate_review_logs()
+
+        NUM_CARDS_SIMULATE = 100_000
+        DESIRED_RETENTIONS = [0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+
+        probs_and_costs_dict = self._compute_probs_and_costs()
+
+        # every retention and shard of simulated cards is one task for the `workers` processes
+        simulation_costs = simulate_costs(
+            desired_retentions=DESIRED_RETENTIONS,
+            parameters=parameters,
+            num_cards_simulate=NUM_CARDS_SIMULATE,
+            probs_and_costs_dict=probs_and_costs_dict,
+            workers=workers,
+        )
+
+        min_index = simulation_costs.index(min(simulation_costs))
+        optimal_retention = DESIRED_RETENTIONS[min_index]
+
+        return optimal_retention
+
+    def search_optimal_retention(
+        self,
+        parameters: tuple[float, ...] | list[float],
+        lower: float = 0.7,
+        upper: float = 0.95,
+        tolerance: float = 0.01,
+        workers: int = 1,
+    ) -> RetentionSearchResult:
+        """
+        Searches the continuous range [lower, upper] for the optimal retention instead of the fixed grid
+        of compute_optimal_retention. Candidates share their random streams, see search_optimal_retention
+        in services.simulator.
+
+        Returns the optimal retention along with the cost curve that was evaluated.
+        """
+
+        self._validate_review_logs()
+
+        return search_optimal_retention(
+            parameters=parameters,
+            probs_and_costs_dict=self._compute_probs_and_costs(),
+            lower=lower,
+            upper=upper,
+            tolerance=tolerance,
+            workers=workers,
+        )
+
 
-__all__ = ["Optimizer"]
\ No newline at end of file
+__all__ = ["Optimizer", "ParameterUpdate", "BootstrapResult"]
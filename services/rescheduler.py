@@ -0,0 +1,259 @@
+"""
+fsrs.rescheduler
+---------
+
+This module defines the Rescheduler class.
+
+Classes:
+    Rescheduler: Recomputes every reviewed card's memory state and due date from its review history.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, Future, wait
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+
+from db import CardCRUD, RevlogCRUD
+from models.card import State
+from models.due_histogram import DueHistogram
+from services.scheduler import Scheduler, ReviewBatch, NO_STEP, NO_LAST_REVIEW
+from services.scheduler_cache import SchedulerCache
+
+# a card history is (card_id, [(rating, review_datetime), ...]) ordered by review_datetime
+CardHistory = tuple[int, list[tuple[int, int]]]
+
+
+def replay_histories(
+    scheduler: Scheduler,
+    histories: list[CardHistory],
+    rng: np.random.Generator | None = None,
+) -> ReviewBatch:
+    """
+    Replays the review histories of many cards from the New state under the scheduler's parameters.
+
+    The histories are padded into [cards x reviews] arrays and the k-th review of every card that has one
+    is applied in a single review_cards_batch call, so the number of batch calls is the length of the
+    longest history rather than the number of reviews.
+
+    Args:
+        scheduler: The scheduler holding the (new) parameters.
+        histories: The (card_id, [(rating, review_datetime), ...]) histories, each ordered by review_datetime.
+        rng: The random generator used for fuzzing the replayed intervals.
+
+    Returns:
+        A ReviewBatch holding each card's state after its last review.
+    """
+
+    n = len(histories)
+    lengths = np.fromiter((len(reviews) for _, reviews in histories), dtype=np.int64, count=n)
+    max_len = int(lengths.max()) if n else 0
+
+    card_id = np.fromiter((card_id for card_id, _ in histories), dtype=np.int64, count=n)
+    ratings = np.zeros((n, max_len), dtype=np.int64)
+    review_datetimes = np.zeros((n, max_len), dtype=np.int64)
+    for i, (_, reviews) in enumerate(histories):
+        ratings[i, : len(reviews)], review_datetimes[i, : len(reviews)] = zip(*reviews)
+
+    state = np.full(n, int(State.New), dtype=np.int64)
+    step = np.full(n, NO_STEP, dtype=np.int64)
+    stability = np.full(n, np.nan)
+    difficulty = np.full(n, np.nan)
+    last_review = np.full(n, NO_LAST_REVIEW, dtype=np.int64)
+    due = np.zeros(n, dtype=np.int64)
+
+    rng = rng if rng is not None else np.random.default_rng()
+
+    for k in range(max_len):
+        active = np.flatnonzero(lengths > k)
+        batch = scheduler.review_cards_batch(
+            state=state[active],
+            step=step[active],
+            stability=stability[active],
+            difficulty=difficulty[active],
+            last_review=last_review[active],
+            rating=ratings[active, k],
+            review_datetime=review_datetimes[active, k],
+            rng=rng,
+        )
+        state[active] = batch.state
+        step[active] = batch.step
+        stability[active] = batch.stability
+        difficulty[active] = batch.difficulty
+        last_review[active] = batch.last_review
+        due[active] = batch.due
+
+    return ReviewBatch(
+        card_id=card_id,
+        state=state,
+        step=step,
+        stability=stability,
+        difficulty=difficulty,
+        due=due,
+        last_review=last_review,
+        rating=None,
+        review_duration=None,
+    )
+
+
+def _reschedule_chunk(
+    scheduler_dict: dict,
+    due_counts: dict[int, int] | None,
+    histories: list[CardHistory],
+    seed: int | None,
+) -> list[tuple]:
+    """
+    Worker entry point: replays one chunk of histories and returns CardCRUD.update_many_card_rows rows.
+    due_counts are the DueHistogram.day_counts to load-balance over, since to_dict doesn't carry the histogram.
+    """
+    scheduler = Scheduler.from_dict(scheduler_dict)
+    if due_counts is not None:
+        scheduler.due_histogram = DueHistogram(due_counts)
+    batch = replay_histories(scheduler, histories, np.random.default_rng(seed))
+    return batch.card_rows()
+
+
+class Rescheduler:
+    """
+    Recomputes the memory state and due date of every reviewed card after the FSRS parameters change.
+
+    Review logs are streamed from the database ordered by (card_id, review_datetime), grouped into
+    per-card histories in one pass and handed to a process pool in chunks. Results are written back
+    in large transactions as they complete, so memory stays bounded by the chunks in flight.
+
+    Given a SchedulerCache instead of a Scheduler, the decks are rescheduled one after the other, each under
+    its own scheduler.
+
+    Attributes:
+        scheduler: The scheduler holding the new parameters, or the cache of each deck's scheduler.
+        chunk_size: The number of cards replayed by one worker task.
+        commit_size: The minimum number of updated cards written per transaction.
+        workers: The number of worker processes. 1 replays in the calling process.
+        seed: Optional seed making the fuzzed due dates reproducible.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler | SchedulerCache,
+        chunk_size: int = 2000,
+        commit_size: int = 20000,
+        workers: int | None = None,
+        seed: int | None = None,
+    ) -> None:
+        if chunk_size < 1 or commit_size < 1:
+            raise ValueError("chunk_size and commit_size must be positive")
+
+        self.scheduler = scheduler
+        self.chunk_size = chunk_size
+        self.commit_size = commit_size
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.seed = seed
+        self.card_crud = CardCRUD()
+        self.revlog_crud = RevlogCRUD()
+
+    def run(
+        self,
+        progress_callback: Callable[[int, int], None] | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> int:
+        """
+        Reschedules every card that has review logs.
+
+        Args:
+            progress_callback: Called from the calling thread as progress_callback(done, total)
+                after each transaction is committed.
+            cancel_event: When set, no further chunks are started; results that are already
+                computed are still written, so every card is either fully rescheduled or untouched.
+
+        Returns:
+            The number of cards rescheduled.
+        """
+
+        total = self.revlog_crud.count_reviewed_cards()
+        tasks = self._iter_tasks()
+        cancelled = cancel_event.is_set if cancel_event is not None else (lambda: False)
+
+        done = 0
+        pending_rows: list[tuple] = []
+
+        def write(rows: list[tuple], force: bool = False) -> None:
+            nonlocal done
+            pending_rows.extend(rows)
+            if pending_rows and (force or len(pending_rows) >= self.commit_size):
+                self.card_crud.update_many_card_rows(pending_rows)
+                done += len(pending_rows)
+                pending_rows.clear()
+                if progress_callback is not None:
+                    progress_callback(done, total)
+
+        if self.workers <= 1:
+            for index, (scheduler_dict, due_counts, chunk) in enumerate(tasks):
+                if cancelled():
+                    break
+                write(_reschedule_chunk(scheduler_dict, due_counts, chunk, self._chunk_seed(index)))
+            write([], force=True)
+            return done
+
+        max_in_flight = 2 * self.workers
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            in_flight: set[Future] = set()
+            for index, (scheduler_dict, due_counts, chunk) in enumerate(tasks):
+                if cancelled():
+                    break
+                in_flight.add(
+                    executor.submit(
+                        _reschedule_chunk, scheduler_dict, due_counts, chunk, self._chunk_seed(index)
+                    )
+                )
+                if len(in_flight) >= max_in_flight:
+                    completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        write(future.result())
+
+            for future in in_flight:
+                write(future.result())
+        write([], force=True)
+
+        return done
+
+    def _chunk_seed(self, index: int) -> int | None:
+        return None if self.seed is None else self.seed + index
+
+    def _iter_tasks(self) -> Iterator[tuple[dict, dict[int, int] | None, list[CardHistory]]]:
+        """
+        Yields the chunks of card histories to replay, each with the dict of the scheduler to replay it under
+        and, when it load-balances, a snapshot of its due histogram taken as the chunk is handed out, so that
+        it includes the chunks written so far.
+        """
+        if not isinstance(self.scheduler, SchedulerCache):
+            schedulers = [(self.scheduler, self.revlog_crud.stream_reviews_ordered_by_card())]
+        else:
+            schedulers = (
+                (self.scheduler.get(deck_id), self.revlog_crud.stream_reviews_ordered_by_card(deck_id=deck_id))
+                for deck_id in self.revlog_crud.get_reviewed_deck_ids()
+            )
+
+        for scheduler, rows in schedulers:
+            scheduler_dict = scheduler.to_dict()
+            load_balanced = scheduler.enable_load_balancing and scheduler.due_histogram is not None
+            for chunk in self._iter_chunks(rows):
+                yield scheduler_dict, scheduler.due_histogram.day_counts() if load_balanced else None, chunk
+
+    def _iter_chunks(self, rows: Iterable) -> Iterator[list[CardHistory]]:
+        """Groups rows ordered by (card_id, review_datetime) into chunks of chunk_size card histories."""
+        chunk: list[CardHistory] = []
+        for card_id, card_rows in groupby(rows, key=itemgetter(0)):
+            chunk.append((card_id, [(row[1], row[2]) for row in card_rows]))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+__all__ = ["Rescheduler", "replay_histories"]
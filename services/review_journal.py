@@ -0,0 +1,217 @@
+"""
+fsrs.review_journal
+---------
+
+This module defines the ReviewJournal class.
+
+Classes:
+    ReviewJournal: An append-only file of the answers of a session, replayed into the database after a crash.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import astuple
+from pathlib import Path
+
+from db import CardCRUD, RevlogCRUD
+from models.card import Card
+from models.review_log import ReviewLog
+from services.card_writer import CardWriter
+
+
+class ReviewJournal:
+    """
+    Makes the answers of a session durable before they reach the revlogs and cards tables.
+
+    Each answer is appended as one JSON line holding the review log and the card's new
+    (state, step, stability, difficulty, due, last_review, id) row. An append only writes to the file's buffer;
+    a background thread flushes and fsyncs the buffered answers together (group commit) at most max_latency
+    seconds after the first of them was appended. append numbers the answers, and sync_until waits until an
+    answer is on disk, so that e.g. a card's new state isn't written to the database before the review that
+    led to it is durable. Once the session has written its answers to the database, checkpoint empties the
+    journal.
+
+    replay applies a journal left behind by a crash: reviews already in revlogs (same card and review time)
+    are skipped and a card is only updated if the journaled state isn't older than the stored one, so replaying
+    the same journal twice changes nothing. A torn last line, from a crash in the middle of a write, is ignored.
+
+    Attributes:
+        path: The journal file.
+        max_latency: The number of seconds an appended answer waits at most before it's on disk.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_latency: float = 0.5,
+        revlog_crud: RevlogCRUD | None = None,
+        card_crud: CardCRUD | None = None,
+    ) -> None:
+        if max_latency <= 0:
+            raise ValueError("max_latency must be positive")
+
+        self.path = Path(path)
+        self.max_latency = max_latency
+        self.revlog_crud = revlog_crud if revlog_crud is not None else RevlogCRUD()
+        self.card_crud = card_crud if card_crud is not None else CardCRUD()
+
+        self._file = None
+        self._first_unsynced_at: float | None = None
+        # sequence numbers of the last answer appended and of the last one on disk
+        self._appended = 0
+        self._synced = 0
+        self._lock = threading.Lock()
+        self._synced_changed = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    def append(self, review_log: ReviewLog, card: Card) -> int:
+        """Buffers one answer, it's on disk within max_latency seconds. Returns its sequence number."""
+        line = json.dumps([list(astuple(review_log)), list(CardWriter.card_row(card))]) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._appended += 1
+            sequence = self._appended
+            # the first unsynced answer starts the thread's max_latency countdown
+            wake = self._first_unsynced_at is None
+            if wake:
+                self._first_unsynced_at = time.monotonic()
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="ReviewJournal", daemon=True)
+                self._thread.start()
+
+        if wake:
+            self._wake.set()
+        return sequence
+
+    def sync(self) -> None:
+        """Writes the buffered answers to disk right away."""
+        self._sync()
+
+    def sync_until(self, sequence: int) -> None:
+        """Returns once the answers up to `sequence` (as returned by append) are on disk, writing them if needed."""
+        while True:
+            with self._lock:
+                if self._synced >= sequence:
+                    return
+            self._sync()
+            with self._synced_changed:
+                # another thread may still be syncing the answer, retry if that sync fails
+                if self._synced_changed.wait_for(lambda: self._synced >= sequence, timeout=self.max_latency):
+                    return
+
+    def checkpoint(self) -> None:
+        """Empties the journal, once every answer in it was written to the database."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._first_unsynced_at = None
+            self.path.unlink(missing_ok=True)
+            # the answers are in the database, nothing has to wait for them anymore
+            self._synced = self._appended
+            self._synced_changed.notify_all()
+
+    def close(self) -> None:
+        """Stops the background thread and writes the buffered answers to disk."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        self._sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def replay(self) -> int:
+        """
+        Applies the answers of a journal left behind by an earlier run to the database, then empties it.
+        Returns the number of reviews inserted.
+        """
+        if not self.path.exists():
+            return 0
+
+        review_logs, card_rows = [], {}
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    review_log, card_row = json.loads(line)
+                except ValueError:
+                    # torn write of the last answer before a crash
+                    break
+                review_logs.append(tuple(review_log))
+                # the last answer of a card holds its latest state
+                card_rows[card_row[-1]] = tuple(card_row)
+
+        stored_keys = self.revlog_crud.get_review_keys(list({review_log[0] for review_log in review_logs}))
+        new_review_logs = [
+            review_log for review_log in review_logs if (review_log[0], review_log[2]) not in stored_keys
+        ]
+        if new_review_logs:
+            self.revlog_crud.insert_many_reviews(new_review_logs)
+
+        stored_last_reviews = self.card_crud.get_last_reviews_by_ids(list(card_rows))
+        newer_card_rows = [
+            card_row for card_id, card_row in card_rows.items()
+            if card_id in stored_last_reviews and (stored_last_reviews[card_id] or 0) <= (card_row[5] or 0)
+        ]
+        self.card_crud.update_many_card_rows(newer_card_rows)
+
+        self.checkpoint()
+        return len(new_review_logs)
+
+    def _sync(self) -> None:
+        # the buffer is handed to the OS under the lock, the slow fsync runs on a duplicate of the file
+        # descriptor without it, so that appends don't wait for the disk and checkpoint can close the file
+        with self._lock:
+            if self._file is None or self._first_unsynced_at is None:
+                return
+            self._file.flush()
+            fd = os.dup(self._file.fileno())
+            self._first_unsynced_at = None
+            sequence = self._appended
+        try:
+            os.fsync(fd)
+        except OSError:
+            with self._lock:
+                # the answers are still unsynced
+                if self._first_unsynced_at is None:
+                    self._first_unsynced_at = time.monotonic()
+            raise
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._synced = max(self._synced, sequence)
+            self._synced_changed.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                first_unsynced_at = self._first_unsynced_at
+            timeout = None if first_unsynced_at is None else max(first_unsynced_at + self.max_latency - time.monotonic(), 0)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+            with self._lock:
+                if self._closed:
+                    return
+                due = self._first_unsynced_at is not None \
+                    and time.monotonic() - self._first_unsynced_at >= self.max_latency
+            if due:
+                self._sync()
+
+
+__all__ = ["ReviewJournal"]
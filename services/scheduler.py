@@ -11,13 +11,19 @@ Classes:
 from __future__ import annotations
 from collections.abc import Sequence
 import math
-from copy import deepcopy
+from copy import copy
 from datetime import datetime, timezone, timedelta
 from random import random
 from dataclasses import dataclass
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
 
 from models.card import Card, State
 from models.review_log import ReviewLog, Rating
+from models.due_histogram import DueHistogram
+from utils import MILLIS_PER_DAY
 
 DEFAULT_PARAMETERS = (
     0.2172,
@@ -114,6 +120,196 @@ FUZZ_RANGES = [
     },
 ]
 
+# sentinels used by the struct-of-arrays (batch) API in place of None
+NO_STEP = -1
+NO_LAST_REVIEW = 0
+
+# how many distinct card scheduling states Scheduler.preview remembers
+PREVIEW_CACHE_SIZE = 64
+
+
+class ReviewOutcome(NamedTuple):
+    """
+    What a card would become if it were reviewed with a given rating, as returned by Scheduler.preview.
+
+    Attributes:
+        state: The card's next state.
+        step: The card's next learning or relearning step, or None in the Review state.
+        stability: The card's next stability.
+        difficulty: The card's next difficulty.
+        interval: The card's next interval, before fuzzing.
+    """
+
+    state: State
+    step: int | None
+    stability: float
+    difficulty: float
+    interval: timedelta
+
+
+@dataclass
+class ReviewBatch:
+    """
+    The result of Scheduler.review_cards_batch, stored as parallel NumPy arrays (one entry per card).
+
+    Attributes:
+        card_id: The ids of the reviewed cards.
+        state: The cards' new states (State values as ints).
+        step: The cards' new learning/relearning steps, NO_STEP where the card is in the Review state.
+        stability: The cards' new stabilities.
+        difficulty: The cards' new difficulties.
+        due: When each card is due next in epochmillis.
+        last_review: When each card was reviewed in epochmillis.
+        rating: The ratings given to the cards.
+        review_duration: The review durations in milliseconds, or None if unspecified.
+    """
+
+    card_id: np.ndarray
+    state: np.ndarray
+    step: np.ndarray
+    stability: np.ndarray
+    difficulty: np.ndarray
+    due: np.ndarray
+    last_review: np.ndarray
+    rating: np.ndarray
+    review_duration: np.ndarray | None
+
+    def card_rows(self) -> list[tuple]:
+        """
+        Returns the updated cards as (state, step, stability, difficulty, due, last_review, id) rows,
+        the format expected by CardCRUD.update_many_card_rows.
+        """
+
+        step = [None if s == NO_STEP else s for s in self.step.tolist()]
+
+        return list(
+            zip(
+                self.state.tolist(),
+                step,
+                self.stability.tolist(),
+                self.difficulty.tolist(),
+                self.due.tolist(),
+                self.last_review.tolist(),
+                self.card_id.tolist(),
+            )
+        )
+
+    def review_log_rows(self) -> list[tuple]:
+        """
+        Returns the review logs as (card_id, rating, review_datetime, review_duration) rows,
+        the format expected by RevlogCRUD.insert_many_reviews.
+        """
+
+        if self.review_duration is None:
+            review_duration = [None] * len(self.card_id)
+        else:
+            review_duration = self.review_duration.tolist()
+
+        return list(
+            zip(
+                self.card_id.tolist(),
+                self.rating.tolist(),
+                self.last_review.tolist(),
+                review_duration,
+            )
+        )
+
+
+class FloatKernel:
+    """
+    The FSRS memory-state equations on plain floats, compiled for one parameter set.
+
+    Every constant that only depends on the parameters (decay, factor, initial stabilities and difficulties,
+    the exp() terms of the stability equations) is computed once in __init__, so the per-review methods
+    only do the arithmetic that depends on the card. The optimizer's TensorKernel mirrors these methods
+    on torch tensors for autograd.
+
+    Tables suffixed with an "s" are indexed by `rating - 1`.
+    """
+
+    def __init__(self, parameters: Sequence[float]) -> None:
+        w = tuple(float(parameter) for parameter in parameters)
+
+        self.parameters = w
+
+        self.decay = -w[20]
+        self.factor = 0.9 ** (1 / self.decay) - 1
+
+        self.initial_stabilities = tuple(
+            max(w[rating - 1], STABILITY_MIN) for rating in Rating
+        )
+        self.initial_difficulties = tuple(
+            min(max(w[4] - (math.e ** (w[5] * (rating - 1))) + 1, MIN_DIFFICULTY), MAX_DIFFICULTY)
+            for rating in Rating
+        )
+
+        self.short_term_stability_factors = tuple(
+            math.e ** (w[17] * (rating - 3 + w[18])) for rating in Rating
+        )
+
+        self.difficulty_deltas = tuple(-(w[6] * (rating - 3)) for rating in Rating)
+        # mean reversion towards the initial difficulty of an Easy rating
+        self.mean_reversion_target = w[7] * self.initial_difficulties[Rating.Easy - 1]
+        self.mean_reversion_keep = 1 - w[7]
+
+        self.forget_short_term_divisor = math.e ** (w[17] * w[18])
+        self.recall_scale = math.e ** w[8]
+        # hard penalty and easy bonus
+        self.recall_modifiers = (1, w[15], 1, w[16])
+
+    def retrievability(self, elapsed_days: int, stability: float) -> float:
+        return (1 + self.factor * elapsed_days / stability) ** self.decay
+
+    def initial_stability(self, rating: Rating) -> float:
+        return self.initial_stabilities[rating - 1]
+
+    def initial_difficulty(self, rating: Rating) -> float:
+        return self.initial_difficulties[rating - 1]
+
+    def short_term_stability(self, stability: float, rating: Rating) -> float:
+        short_term_stability_increase = self.short_term_stability_factors[
+            rating - 1
+        ] * (stability ** -self.parameters[19])
+
+        if rating >= Rating.Good:
+            short_term_stability_increase = max(short_term_stability_increase, 1.0)
+
+        return max(stability * short_term_stability_increase, STABILITY_MIN)
+
+    def next_difficulty(self, difficulty: float, rating: Rating) -> float:
+        # linear damping
+        arg_2 = difficulty + (10.0 - difficulty) * self.difficulty_deltas[rating - 1] / 9.0
+
+        next_difficulty = self.mean_reversion_target + self.mean_reversion_keep * arg_2
+
+        return min(max(next_difficulty, MIN_DIFFICULTY), MAX_DIFFICULTY)
+
+    def next_stability(
+        self, difficulty: float, stability: float, retrievability: float, rating: Rating
+    ) -> float:
+        w = self.parameters
+
+        if rating == Rating.Again:
+            next_stability = min(
+                w[11]
+                * (difficulty ** -w[12])
+                * (((stability + 1) ** (w[13])) - 1)
+                * (math.e ** ((1 - retrievability) * w[14])),
+                stability / self.forget_short_term_divisor,
+            )
+
+        else:
+            next_stability = stability * (
+                1
+                + self.recall_scale
+                * (11 - difficulty)
+                * (stability ** -w[9])
+                * ((math.e ** ((1 - retrievability) * w[10])) - 1)
+                * self.recall_modifiers[rating - 1]
+            )
+
+        return max(next_stability, STABILITY_MIN)
+
 
 @dataclass(init=False)
 class Scheduler:
@@ -129,6 +325,9 @@ class Scheduler:
         relearning_steps: Small time intervals that schedule cards in the Relearning state.
         maximum_interval: The maximum number of days a Review-state card can be scheduled into the future.
         enable_fuzzing: Whether to apply a small amount of random 'fuzz' to calculated intervals.
+        enable_load_balancing: Whether fuzzing picks the day with the fewest cards due (per due_histogram)
+            instead of a random day within the fuzz range.
+        due_histogram: The per-day due counts used for load balancing, usually CardCRUD.get_due_histogram().
     """
 
     parameters: tuple[float, ...]
@@ -137,6 +336,7 @@ class Scheduler:
     relearning_steps: tuple[timedelta, ...]
     maximum_interval: int
     enable_fuzzing: bool
+    enable_load_balancing: bool
 
     def __init__(
         self,
@@ -151,6 +351,8 @@ class Scheduler:
         ),
         maximum_interval: int = 36500,
         enable_fuzzing: bool = True,
+        enable_load_balancing: bool = False,
+        due_histogram: DueHistogram | None = None,
     ) -> None:
         self._validate_parameters(parameters=parameters)
 
@@ -160,9 +362,28 @@ class Scheduler:
         self.relearning_steps = tuple(relearning_steps)
         self.maximum_interval = maximum_interval
         self.enable_fuzzing = enable_fuzzing
+        self.enable_load_balancing = enable_load_balancing
+        self.due_histogram = due_histogram
+
+        self._kernel = FloatKernel(self.parameters)
 
-        self._DECAY = -self.parameters[20]
-        self._FACTOR = 0.9 ** (1 / self._DECAY) - 1
+        self._DECAY = self._kernel.decay
+        self._FACTOR = self._kernel.factor
+        self._INTERVAL_MODIFIER = (self.desired_retention ** (1 / self._DECAY)) - 1
+
+        # the review core works in integer epochmillis, datetime/timedelta are only used at the API edge
+        self._learning_steps_millis = tuple(
+            learning_step // timedelta(milliseconds=1)
+            for learning_step in self.learning_steps
+        )
+        self._relearning_steps_millis = tuple(
+            relearning_step // timedelta(milliseconds=1)
+            for relearning_step in self.relearning_steps
+        )
+
+        self._preview_cache: OrderedDict[tuple, dict[Rating, ReviewOutcome]] = (
+            OrderedDict()
+        )
 
     def _validate_parameters(self, parameters: Sequence[float]) -> None:
         if len(parameters) != len(LOWER_BOUNDS_PARAMETERS):
@@ -200,16 +421,68 @@ class Scheduler:
             The retrievability of the Card object.
         """
 
-        if card.last_review is None:
-            return 0
-
         if current_datetime is None:
             current_datetime = datetime.now(timezone.utc)
 
-        elapsed_days = max(0, (current_datetime - self.epoch_millis_to_date(card.last_review)).days)
+        return self.get_card_retrievability_millis(
+            card=card, current_millis=self.date_to_epoch_millis(current_datetime)
+        )
+
+    def get_card_retrievability_millis(self, card: Card, current_millis: int) -> float:
+        """
+        Calculates a Card object's retrievability at a given time in epochmillis.
+
+        Args:
+            card: The card whose retrievability is to be calculated
+            current_millis: The current date and time in epochmillis
+
+        Returns:
+            The retrievability of the Card object.
+        """
+
+        if card.last_review is None:
+            return 0
+
+        elapsed_days = max(0, (current_millis - card.last_review) // MILLIS_PER_DAY)
 
         return (1 + self._FACTOR * elapsed_days / card.stability) ** self._DECAY
 
+    def get_retrievability_batch(
+        self,
+        stability: np.ndarray,
+        last_review_millis: np.ndarray,
+        now_millis: np.ndarray | int | None = None,
+    ) -> np.ndarray:
+        """
+        Calculates the retrievability of many cards at once, directly from the epochmillis stored in the cards table.
+
+        The vectorized equivalent of get_card_retrievability: elapsed time is counted in whole days and
+        cards that were never reviewed (last_review_millis == NO_LAST_REVIEW) have a retrievability of 0.
+        Results agree with the scalar function up to the last ulp of NumPy's vectorized pow.
+
+        Args:
+            stability: The cards' stabilities.
+            last_review_millis: The cards' last review times in epochmillis.
+            now_millis: The current time in epochmillis, either one per card or a single value for all.
+
+        Returns:
+            The retrievability of each card, as a float64 array.
+        """
+
+        if now_millis is None:
+            now_millis = self.date_to_epoch_millis(datetime.now(timezone.utc))
+
+        stability = np.asarray(stability, dtype=np.float64)
+        last_review_millis = np.asarray(last_review_millis, dtype=np.int64)
+        now_millis = np.asarray(now_millis, dtype=np.int64)
+
+        elapsed_days = np.maximum((now_millis - last_review_millis) // MILLIS_PER_DAY, 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            retrievability = (1 + self._FACTOR * elapsed_days / stability) ** self._DECAY
+
+        return np.where(last_review_millis == NO_LAST_REVIEW, 0.0, retrievability)
+
     def review_card(
         self,
         og_card: Card,
@@ -241,123 +514,284 @@ class Scheduler:
         if review_datetime is None:
             review_datetime = datetime.now(timezone.utc)
 
+        card, review_log, next_interval = self.review_card_millis(
+            og_card=og_card,
+            rating=rating,
+            review_millis=self.date_to_epoch_millis(review_datetime),
+            review_duration=review_duration,
+        )
+
+        return card, review_log, timedelta(milliseconds=next_interval)
+
+    def review_card_millis(
+        self,
+        og_card: Card,
+        rating: Rating,
+        review_millis: int,
+        review_duration: int | None = None,
+    ) -> tuple[Card, ReviewLog, int]:
+        """
+        Reviews a card with a given rating at a given time in epochmillis. The integer core of review_card.
+
+        Args:
+            og_card: The card being reviewed.
+            rating: The chosen rating for the card being reviewed.
+            review_millis: The date and time of the review in epochmillis.
+            review_duration: The number of miliseconds it took to review the card or None if unspecified.
+
+        Returns:
+            A tuple containing the updated, reviewed card, its corresponding review log and the next interval in milliseconds.
+        """
+
         days_since_last_review = None
-        card = deepcopy(og_card)
+        # all Card fields are immutable values, a shallow copy is enough
+        card = copy(og_card)
 
+        if card.last_review:
+            days_since_last_review = (review_millis - card.last_review) // MILLIS_PER_DAY
+
+        (
+            card.state,
+            card.step,
+            card.stability,
+            card.difficulty,
+            next_interval,
+        ) = self._next_card_state(
+            state=card.state,
+            step=card.step,
+            stability=card.stability,
+            difficulty=card.difficulty,
+            days_since_last_review=days_since_last_review,
+            retrievability=self._get_retrievability_from_days(
+                stability=card.stability,
+                days_since_last_review=days_since_last_review,
+            ),
+            rating=rating,
+        )
+
+        if self.enable_fuzzing and card.state == State.Review:
+            next_interval = (
+                self._get_fuzzed_interval(
+                    next_interval // MILLIS_PER_DAY, review_millis=review_millis
+                )
+                * MILLIS_PER_DAY
+            )
+
+        card.due = review_millis + next_interval
+        card.last_review = review_millis
+
+        review_log = ReviewLog(
+            card_id=card.id,
+            rating=rating,
+            review_datetime=review_millis,
+            review_duration=review_duration,
+        )
+        if type(card.state) is State:
+            card.state = card.state.value
+
+        return card, review_log, next_interval
+
+    def preview(
+        self, card: Card, current_datetime: datetime | None = None
+    ) -> dict[Rating, ReviewOutcome]:
+        """
+        Computes what a card would become for each of the four ratings, without reviewing it.
+
+        Unlike calling review_card once per rating, the card is not copied, no ReviewLog is built and the
+        retrievability is computed once for all four ratings. Results are memoized by the card's scheduling
+        state, so previewing the same card again (e.g. flipping it back and forth) is a dictionary lookup.
+
+        Intervals are not fuzzed, so the previewed interval of a Review-state card may differ by a few days
+        from the one review_card ends up scheduling.
+
+        Args:
+            card: The card to preview.
+            current_datetime: The date and time of the hypothetical review.
+
+        Returns:
+            A dictionary mapping each Rating to its ReviewOutcome.
+        """
+
+        if current_datetime is None:
+            current_datetime = datetime.now(timezone.utc)
+
+        days_since_last_review = None
         if card.last_review:
             days_since_last_review = (
-                (review_datetime - self.epoch_millis_to_date(card.last_review)).days
+                self.date_to_epoch_millis(current_datetime) - card.last_review
+            ) // MILLIS_PER_DAY
+
+        cache_key = (
+            card.state,
+            card.step,
+            card.stability,
+            card.difficulty,
+            days_since_last_review,
+        )
+        outcomes = self._preview_cache.get(cache_key)
+        if outcomes is not None:
+            self._preview_cache.move_to_end(cache_key)
+            return outcomes
+
+        retrievability = self._get_retrievability_from_days(
+            stability=card.stability,
+            days_since_last_review=days_since_last_review,
+        )
+
+        outcomes = {}
+        for rating in Rating:
+            state, step, stability, difficulty, next_interval = self._next_card_state(
+                state=card.state,
+                step=card.step,
+                stability=card.stability,
+                difficulty=card.difficulty,
+                days_since_last_review=days_since_last_review,
+                retrievability=retrievability,
+                rating=rating,
+            )
+            outcomes[rating] = ReviewOutcome(
+                state=state,
+                step=step,
+                stability=stability,
+                difficulty=difficulty,
+                interval=timedelta(milliseconds=next_interval),
             )
 
+        self._preview_cache[cache_key] = outcomes
+        if len(self._preview_cache) > PREVIEW_CACHE_SIZE:
+            self._preview_cache.popitem(last=False)
+
+        return outcomes
+
+    def _get_retrievability_from_days(
+        self, stability: float | None, days_since_last_review: int | None
+    ) -> float:
+        if days_since_last_review is None or stability is None:
+            return 0
+
+        return self._kernel.retrievability(
+            elapsed_days=max(0, days_since_last_review), stability=stability
+        )
+
+    def _next_card_state(
+        self,
+        state: State,
+        step: int | None,
+        stability: float | None,
+        difficulty: float | None,
+        days_since_last_review: int | None,
+        retrievability: float,
+        rating: Rating,
+    ) -> tuple[State, int | None, float, float, int]:
+        """
+        Computes a card's next state, step, stability, difficulty and (unfuzzed) interval in milliseconds for a given rating.
+
+        Shared by review_card and preview so that both follow exactly the same scheduling rules.
+        """
+
         # Nuzy
-        if card.state == State.New:
-            card.state = State.Learning
+        if state == State.New:
+            state = State.Learning
         # Nuzy end
 
-        match card.state:
+        match state:
             case State.Learning:
                 # update the card's stability and difficulty
-                if card.stability is None and card.difficulty is None:
-                    card.stability = self._initial_stability(rating)
-                    card.difficulty = self._initial_difficulty(rating)
+                if stability is None and difficulty is None:
+                    stability = self._kernel.initial_stability(rating)
+                    difficulty = self._kernel.initial_difficulty(rating)
 
                 elif days_since_last_review is not None and days_since_last_review < 1:
-                    card.stability = self._short_term_stability(
-                        stability=card.stability, rating=rating
+                    stability = self._kernel.short_term_stability(
+                        stability=stability, rating=rating
                     )
-                    card.difficulty = self._next_difficulty(
-                        difficulty=card.difficulty, rating=rating
+                    difficulty = self._kernel.next_difficulty(
+                        difficulty=difficulty, rating=rating
                     )
 
                 else:
-                    card.stability = self._next_stability(
-                        difficulty=card.difficulty,
-                        stability=card.stability,
-                        retrievability=self.get_card_retrievability(
-                            card,
-                            current_datetime=review_datetime,
-                        ),
+                    stability = self._kernel.next_stability(
+                        difficulty=difficulty,
+                        stability=stability,
+                        retrievability=retrievability,
                         rating=rating,
                     )
-                    card.difficulty = self._next_difficulty(
-                        difficulty=card.difficulty, rating=rating
+                    difficulty = self._kernel.next_difficulty(
+                        difficulty=difficulty, rating=rating
                     )
 
                 # calculate the card's next interval
                 ## first if-clause handles edge case where the Card in the Learning state was previously
                 ## scheduled with a Scheduler with more learning_steps than the current Scheduler
                 if len(self.learning_steps) == 0 or (
-                    card.step >= len(self.learning_steps)
+                    step >= len(self.learning_steps)
                     and rating in (Rating.Hard, Rating.Good, Rating.Easy)
                 ):
-                    card.state = State.Review
-                    card.step = None
+                    state = State.Review
+                    step = None
 
-                    next_interval_days = self._next_interval(stability=card.stability)
-                    next_interval = timedelta(days=next_interval_days)
+                    next_interval_days = self._next_interval(stability=stability)
+                    next_interval = next_interval_days * MILLIS_PER_DAY
 
                 else:
                     match rating:
                         case Rating.Again:
-                            card.step = 0
-                            next_interval = self.learning_steps[card.step]
+                            step = 0
+                            next_interval = self._learning_steps_millis[step]
 
                         case Rating.Hard:
                             # card step stays the same
 
-                            if card.step == 0 and len(self.learning_steps) == 1:
-                                next_interval = self.learning_steps[0] * 1.5
-                            elif card.step == 0 and len(self.learning_steps) >= 2:
+                            if step == 0 and len(self.learning_steps) == 1:
+                                next_interval = self._learning_steps_millis[0] * 3 // 2
+                            elif step == 0 and len(self.learning_steps) >= 2:
                                 next_interval = (
-                                    self.learning_steps[0] + self.learning_steps[1]
-                                ) / 2.0
+                                    self._learning_steps_millis[0] + self._learning_steps_millis[1]
+                                ) // 2
                             else:
-                                next_interval = self.learning_steps[card.step]
+                                next_interval = self._learning_steps_millis[step]
 
                         case Rating.Good:
-                            if card.step + 1 == len(
+                            if step + 1 == len(
                                 self.learning_steps
                             ):  # the last step
-                                card.state = State.Review
-                                card.step = None
+                                state = State.Review
+                                step = None
 
                                 next_interval_days = self._next_interval(
-                                    stability=card.stability
+                                    stability=stability
                                 )
-                                next_interval = timedelta(days=next_interval_days)
+                                next_interval = next_interval_days * MILLIS_PER_DAY
 
                             else:
-                                card.step += 1
-                                next_interval = self.learning_steps[card.step]
+                                step += 1
+                                next_interval = self._learning_steps_millis[step]
 
                         case Rating.Easy:
-                            card.state = State.Review
-                            card.step = None
+                            state = State.Review
+                            step = None
 
                             next_interval_days = self._next_interval(
-                                stability=card.stability
+                                stability=stability
                             )
-                            next_interval = timedelta(days=next_interval_days)
+                            next_interval = next_interval_days * MILLIS_PER_DAY
 
             case State.Review:
                 # update the card's stability and difficulty
                 if days_since_last_review is not None and days_since_last_review < 1:
-                    card.stability = self._short_term_stability(
-                        stability=card.stability, rating=rating
+                    stability = self._kernel.short_term_stability(
+                        stability=stability, rating=rating
                     )
                 else:
-                    card.stability = self._next_stability(
-                        difficulty=card.difficulty,
-                        stability=card.stability,
-                        retrievability=self.get_card_retrievability(
-                            card,
-                            current_datetime=review_datetime,
-                        ),
+                    stability = self._kernel.next_stability(
+                        difficulty=difficulty,
+                        stability=stability,
+                        retrievability=retrievability,
                         rating=rating,
                     )
 
-                card.difficulty = self._next_difficulty(
-                    difficulty=card.difficulty, rating=rating
+                difficulty = self._kernel.next_difficulty(
+                    difficulty=difficulty, rating=rating
                 )
 
                 # calculate the card's next interval
@@ -366,120 +800,310 @@ class Scheduler:
                         # if there are no relearning steps (they were left blank)
                         if len(self.relearning_steps) == 0:
                             next_interval_days = self._next_interval(
-                                stability=card.stability
+                                stability=stability
                             )
-                            next_interval = timedelta(days=next_interval_days)
+                            next_interval = next_interval_days * MILLIS_PER_DAY
 
                         else:
-                            card.state = State.Relearning
-                            card.step = 0
+                            state = State.Relearning
+                            step = 0
 
-                            next_interval = self.relearning_steps[card.step]
+                            next_interval = self._relearning_steps_millis[step]
 
                     case Rating.Hard | Rating.Good | Rating.Easy:
                         next_interval_days = self._next_interval(
-                            stability=card.stability
+                            stability=stability
                         )
-                        next_interval = timedelta(days=next_interval_days)
+                        next_interval = next_interval_days * MILLIS_PER_DAY
 
             case State.Relearning:
                 # update the card's stability and difficulty
                 if days_since_last_review is not None and days_since_last_review < 1:
-                    card.stability = self._short_term_stability(
-                        stability=card.stability, rating=rating
+                    stability = self._kernel.short_term_stability(
+                        stability=stability, rating=rating
                     )
-                    card.difficulty = self._next_difficulty(
-                        difficulty=card.difficulty, rating=rating
+                    difficulty = self._kernel.next_difficulty(
+                        difficulty=difficulty, rating=rating
                     )
 
                 else:
-                    card.stability = self._next_stability(
-                        difficulty=card.difficulty,
-                        stability=card.stability,
-                        retrievability=self.get_card_retrievability(
-                            card,
-                            current_datetime=review_datetime,
-                        ),
+                    stability = self._kernel.next_stability(
+                        difficulty=difficulty,
+                        stability=stability,
+                        retrievability=retrievability,
                         rating=rating,
                     )
-                    card.difficulty = self._next_difficulty(
-                        difficulty=card.difficulty, rating=rating
+                    difficulty = self._kernel.next_difficulty(
+                        difficulty=difficulty, rating=rating
                     )
 
                 # calculate the card's next interval
                 ## first if-clause handles edge case where the Card in the Relearning state was previously
                 ## scheduled with a Scheduler with more relearning_steps than the current Scheduler
                 if len(self.relearning_steps) == 0 or (
-                    card.step >= len(self.relearning_steps)
+                    step >= len(self.relearning_steps)
                     and rating in (Rating.Hard, Rating.Good, Rating.Easy)
                 ):
-                    card.state = State.Review
-                    card.step = None
+                    state = State.Review
+                    step = None
 
-                    next_interval_days = self._next_interval(stability=card.stability)
-                    next_interval = timedelta(days=next_interval_days)
+                    next_interval_days = self._next_interval(stability=stability)
+                    next_interval = next_interval_days * MILLIS_PER_DAY
 
                 else:
                     match rating:
                         case Rating.Again:
-                            card.step = 0
-                            next_interval = self.relearning_steps[card.step]
+                            step = 0
+                            next_interval = self._relearning_steps_millis[step]
 
                         case Rating.Hard:
                             # card step stays the same
 
-                            if card.step == 0 and len(self.relearning_steps) == 1:
-                                next_interval = self.relearning_steps[0] * 1.5
-                            elif card.step == 0 and len(self.relearning_steps) >= 2:
+                            if step == 0 and len(self.relearning_steps) == 1:
+                                next_interval = self._relearning_steps_millis[0] * 3 // 2
+                            elif step == 0 and len(self.relearning_steps) >= 2:
                                 next_interval = (
-                                    self.relearning_steps[0] + self.relearning_steps[1]
-                                ) / 2.0
+                                    self._relearning_steps_millis[0] + self._relearning_steps_millis[1]
+                                ) // 2
                             else:
-                                next_interval = self.relearning_steps[card.step]
+                                next_interval = self._relearning_steps_millis[step]
 
                         case Rating.Good:
-                            if card.step + 1 == len(
+                            if step + 1 == len(
                                 self.relearning_steps
                             ):  # the last step
-                                card.state = State.Review
-                                card.step = None
+                                state = State.Review
+                                step = None
 
                                 next_interval_days = self._next_interval(
-                                    stability=card.stability
+                                    stability=stability
                                 )
-                                next_interval = timedelta(days=next_interval_days)
+                                next_interval = next_interval_days * MILLIS_PER_DAY
 
                             else:
-                                card.step += 1
-                                next_interval = self.relearning_steps[card.step]
+                                step += 1
+                                next_interval = self._relearning_steps_millis[step]
 
                         case Rating.Easy:
-                            card.state = State.Review
-                            card.step = None
+                            state = State.Review
+                            step = None
 
                             next_interval_days = self._next_interval(
-                                stability=card.stability
+                                stability=stability
                             )
-                            next_interval = timedelta(days=next_interval_days)
+                            next_interval = next_interval_days * MILLIS_PER_DAY
 
-        if self.enable_fuzzing and card.state == State.Review:
-            next_interval = self._get_fuzzed_interval(next_interval)
+        return state, step, stability, difficulty, next_interval
 
-        card.due = review_datetime + next_interval
+    def review_cards_batch(
+        self,
+        state: np.ndarray,
+        step: np.ndarray,
+        stability: np.ndarray,
+        difficulty: np.ndarray,
+        last_review: np.ndarray,
+        rating: np.ndarray,
+        review_datetime: np.ndarray | int,
+        card_id: np.ndarray | None = None,
+        review_duration: np.ndarray | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> ReviewBatch:
+        """
+        Reviews many cards at once. The vectorized equivalent of calling review_card once per card.
 
-        card.due = self.date_to_epoch_millis(card.due)
-        card.last_review = self.date_to_epoch_millis(review_datetime)
+        Cards are passed as struct-of-arrays, one entry per card, with None replaced by a sentinel:
+        NO_STEP for step, NaN for stability and difficulty and NO_LAST_REVIEW for last_review.
+        Every branch of review_card (learning/relearning steps, graduation, lapses, fuzz) is applied
+        with masks instead of per-card Python control flow.
 
-        review_log = ReviewLog(
-            card_id=card.id,
+        Args:
+            state: The cards' current states (State values as ints).
+            step: The cards' current learning or relearning steps.
+            stability: The cards' current stabilities.
+            difficulty: The cards' current difficulties.
+            last_review: The cards' last review times in epochmillis.
+            rating: The chosen ratings (Rating values as ints).
+            review_datetime: The review times in epochmillis, either one per card or a single value for all.
+            card_id: The ids of the cards being reviewed, used for the review logs.
+            review_duration: The number of miliseconds each review took or None if unspecified.
+            rng: The random generator used for fuzzing. Defaults to a freshly seeded generator.
+
+        Returns:
+            A ReviewBatch holding the updated card arrays, their due times and the review log rows.
+
+        Raises:
+            ValueError: If the input arrays don't have matching lengths or a rating is out of range.
+
+        Note:
+            The scalar path's fuzz value is `random()`; here it is one `rng.random()` draw per card.
+            Given the same draws, both paths schedule a card on the same day, except with load balancing:
+            the batch counts the days its own cards were assigned to, which one review_card call per card
+            only sees once the cards are written back. Stability, difficulty
+            and retrievability agree with review_card to floating-point rounding (NumPy's vectorized
+            pow may differ from libm's in the last ulp).
+        """
+
+        state = np.array(state, dtype=np.int64)
+        n = state.shape[0]
+
+        step = np.array(step, dtype=np.int64)
+        stability = np.array(stability, dtype=np.float64)
+        difficulty = np.array(difficulty, dtype=np.float64)
+        last_review = np.asarray(last_review, dtype=np.int64)
+        rating = np.asarray(rating, dtype=np.int64)
+        review_datetime = np.broadcast_to(
+            np.asarray(review_datetime, dtype=np.int64), (n,)
+        )
+        card_id = (
+            np.zeros(n, dtype=np.int64)
+            if card_id is None
+            else np.asarray(card_id, dtype=np.int64)
+        )
+        if review_duration is not None:
+            review_duration = np.asarray(review_duration)
+
+        for name, array in (
+            ("step", step),
+            ("stability", stability),
+            ("difficulty", difficulty),
+            ("last_review", last_review),
+            ("rating", rating),
+            ("card_id", card_id),
+        ):
+            if array.shape != (n,):
+                raise ValueError(
+                    f"{name} has shape {array.shape}, expected ({n},) to match state"
+                )
+        if np.any((rating < Rating.Again) | (rating > Rating.Easy)):
+            raise ValueError("ratings must be between 1 (Again) and 4 (Easy)")
+
+        # Nuzy: like Card.__init__, a New or Learning card without a step starts at step 0
+        step[(state <= State.Learning) & (step == NO_STEP)] = 0
+        state[state == State.New] = State.Learning
+
+        is_learning = state == State.Learning
+        is_review = state == State.Review
+        is_relearning = state == State.Relearning
+        is_recall = rating != Rating.Again
+
+        has_last_review = last_review != NO_LAST_REVIEW
+        days_since_last_review = np.where(
+            has_last_review, (review_datetime - last_review) // MILLIS_PER_DAY, 0
+        )
+
+        # update the cards' stability and difficulty
+        is_initial = is_learning & np.isnan(stability) & np.isnan(difficulty)
+        is_short_term = ~is_initial & has_last_review & (days_since_last_review < 1)
+        is_long_term = ~is_initial & ~is_short_term
+
+        # placeholder values keep masked-out lanes finite
+        safe_stability = np.where(is_initial, 1.0, stability)
+        safe_difficulty = np.where(is_initial, 1.0, difficulty)
+
+        retrievability = self.get_retrievability_batch(
+            stability=safe_stability,
+            last_review_millis=last_review,
+            now_millis=review_datetime,
+        )
+
+        new_stability = np.empty(n, dtype=np.float64)
+        new_stability[is_initial] = self._initial_stability_batch(rating[is_initial])
+        new_stability[is_short_term] = self._short_term_stability_batch(
+            stability=safe_stability[is_short_term], rating=rating[is_short_term]
+        )
+        new_stability[is_long_term] = self._next_stability_batch(
+            difficulty=safe_difficulty[is_long_term],
+            stability=safe_stability[is_long_term],
+            retrievability=retrievability[is_long_term],
+            rating=rating[is_long_term],
+        )
+
+        new_difficulty = np.where(
+            is_initial,
+            self._initial_difficulty_batch(rating),
+            self._next_difficulty_batch(difficulty=safe_difficulty, rating=rating),
+        )
+
+        # calculate the cards' next interval, either in whole days or (for steps) in milliseconds
+        new_state = state.copy()
+        new_step = step.copy()
+        interval_days = np.zeros(n, dtype=np.int64)
+        interval_millis = np.zeros(n, dtype=np.int64)
+
+        graduates = np.zeros(n, dtype=bool)
+        for in_state, steps in (
+            (is_learning, self._learning_steps_millis),
+            (is_relearning, self._relearning_steps_millis),
+        ):
+            if len(steps) == 0:
+                graduates |= in_state
+                continue
+
+            num_steps = len(steps)
+            step_millis, hard_millis = self._step_tables_millis(steps)
+            safe_step = np.clip(step, 0, num_steps - 1)
+
+            ## the step >= num_steps clause handles cards scheduled with a Scheduler with more steps than this one
+            graduates |= in_state & (
+                ((step >= num_steps) & is_recall)
+                | (rating == Rating.Easy)
+                | ((rating == Rating.Good) & (step + 1 == num_steps))
+            )
+            in_steps = in_state & ~graduates
+
+            again = in_steps & (rating == Rating.Again)
+            new_step[again] = 0
+            interval_millis[again] = step_millis[0]
+
+            hard = in_steps & (rating == Rating.Hard)
+            interval_millis[hard] = hard_millis[safe_step[hard]]
+
+            good = in_steps & (rating == Rating.Good)
+            new_step[good] = step[good] + 1
+            interval_millis[good] = step_millis[np.clip(new_step[good], 0, num_steps - 1)]
+
+        review_again = is_review & ~is_recall
+        if len(self.relearning_steps) > 0:
+            lapses = review_again
+            new_state[lapses] = State.Relearning
+            new_step[lapses] = 0
+            interval_millis[lapses] = self._relearning_steps_millis[0]
+            stays_in_review = is_review & is_recall
+        else:
+            stays_in_review = is_review
+
+        new_state[graduates] = State.Review
+        new_step[graduates] = NO_STEP
+
+        uses_days = graduates | stays_in_review
+        interval_days[uses_days] = self._next_interval_batch(new_stability[uses_days])
+
+        if self.enable_fuzzing:
+            if rng is None:
+                rng = np.random.default_rng()
+            # fuzz applies to every card that ends up in the Review state
+            fuzz_draws = rng.random(n)
+            interval_days[uses_days] = self._get_fuzzed_interval_days_batch(
+                interval_days=interval_days[uses_days],
+                fuzz_draws=fuzz_draws[uses_days],
+                review_days=review_datetime[uses_days] // MILLIS_PER_DAY,
+            )
+
+        due = review_datetime + np.where(
+            uses_days, interval_days * MILLIS_PER_DAY, interval_millis
+        )
+
+        return ReviewBatch(
+            card_id=card_id,
+            state=new_state,
+            step=new_step,
+            stability=new_stability,
+            difficulty=new_difficulty,
+            due=due,
+            last_review=review_datetime.copy(),
             rating=rating,
-            review_datetime=self.date_to_epoch_millis(review_datetime),
             review_duration=review_duration,
         )
-        if type(card.state) is State:
-            card.state = card.state.value
-
-        return card, review_log, next_interval
 
     # To-do: create a db option (table?) to store scheduler config
     def to_dict(
@@ -507,6 +1131,7 @@ class Scheduler:
             ],
             "maximum_interval": self.maximum_interval,
             "enable_fuzzing": self.enable_fuzzing,
+            "enable_load_balancing": self.enable_load_balancing,
         }
 
         return return_dict
@@ -535,6 +1160,7 @@ class Scheduler:
         ]
         maximum_interval = source_dict["maximum_interval"]
         enable_fuzzing = source_dict["enable_fuzzing"]
+        enable_load_balancing = source_dict.get("enable_load_balancing", False)
 
         return Scheduler(
             parameters=parameters,
@@ -543,200 +1169,266 @@ class Scheduler:
             relearning_steps=relearning_steps,
             maximum_interval=maximum_interval,
             enable_fuzzing=enable_fuzzing,
+            enable_load_balancing=enable_load_balancing,
         )
 
-    def _clamp_difficulty(self, difficulty: float) -> float:
-        if isinstance(difficulty, (float, int)):
-            difficulty = min(max(difficulty, MIN_DIFFICULTY), MAX_DIFFICULTY)
-        else:  # type(difficulty) is torch.Tensor
-            difficulty = difficulty.clamp(min=MIN_DIFFICULTY, max=MAX_DIFFICULTY)
-
-        return difficulty
+    def _next_interval(self, stability: float) -> int:
+        next_interval = (stability / self._FACTOR) * self._INTERVAL_MODIFIER
 
-    def _clamp_stability(self, stability: float) -> float:
-        if isinstance(stability, (float, int)):
-            stability = max(stability, STABILITY_MIN)
-        else:  # type(stability) is torch.Tensor
-            stability = stability.clamp(min=STABILITY_MIN)
+        next_interval = round(float(next_interval))  # intervals are full days
 
-        return stability
+        # must be at least 1 day long
+        next_interval = max(next_interval, 1)
 
-    def _initial_stability(self, rating: Rating) -> float:
-        initial_stability = self.parameters[rating - 1]
+        # can not be longer than the maximum interval
+        next_interval = min(next_interval, self.maximum_interval)
 
-        initial_stability = self._clamp_stability(initial_stability)
+        return next_interval
 
-        return initial_stability
+    def _get_fuzzed_interval(
+        self, interval_days: int, review_millis: int | None = None
+    ) -> int:
+        """
+        Takes the current calculated interval and adds a small amount of random fuzz to it.
+        For example, a card that would've been due in 50 days, after fuzzing, might be due in 49, or 51 days.
 
-    def _initial_difficulty(self, rating: Rating) -> float:
-        initial_difficulty = (
-            self.parameters[4] - (math.e ** (self.parameters[5] * (rating - 1))) + 1
-        )
+        With load balancing enabled, the day within the same fuzz range that has the fewest cards due is picked instead.
 
-        initial_difficulty = self._clamp_difficulty(initial_difficulty)
+        Args:
+            interval_days: The calculated next interval in days, before fuzzing.
+            review_millis: The time of the review in epochmillis, needed for load balancing.
 
-        return initial_difficulty
+        Returns:
+            The new interval in days, after fuzzing.
+        """
 
-    def _next_interval(self, stability: float) -> int:
-        next_interval = (stability / self._FACTOR) * (
-            (self.desired_retention ** (1 / self._DECAY)) - 1
-        )
+        if interval_days < 2.5:  # fuzz is not applied to intervals less than 2.5
+            return interval_days
 
-        next_interval = round(float(next_interval))  # intervals are full days
+        def _get_fuzz_range(interval_days: int) -> tuple[int, int]:
+            """
+            Helper function that computes the possible upper and lower bounds of the interval after fuzzing.
+            """
 
-        # must be at least 1 day long
-        next_interval = max(next_interval, 1)
+            delta = 1.0
+            for fuzz_range in FUZZ_RANGES:
+                delta += fuzz_range["factor"] * max(
+                    min(interval_days, fuzz_range["end"]) - fuzz_range["start"], 0.0
+                )
 
-        # can not be longer than the maximum interval
-        next_interval = min(next_interval, self.maximum_interval)
+            min_ivl = int(round(interval_days - delta))
+            max_ivl = int(round(interval_days + delta))
 
-        return next_interval
+            # make sure the min_ivl and max_ivl fall into a valid range
+            min_ivl = max(2, min_ivl)
+            max_ivl = min(max_ivl, self.maximum_interval)
+            min_ivl = min(min_ivl, max_ivl)
 
-    def _short_term_stability(self, stability: float, rating: Rating) -> float:
-        short_term_stability_increase = (
-            math.e ** (self.parameters[17] * (rating - 3 + self.parameters[18]))
-        ) * (stability ** -self.parameters[19])
-
-        if rating in (Rating.Good, Rating.Easy):
-            if isinstance(short_term_stability_increase, (float, int)):
-                short_term_stability_increase = max(short_term_stability_increase, 1.0)
-            else:  # type(short_term_stability_increase) is torch.Tensor
-                short_term_stability_increase = short_term_stability_increase.clamp(
-                    min=1.0
-                )
+            return min_ivl, max_ivl
 
-        short_term_stability = stability * short_term_stability_increase
+        min_ivl, max_ivl = _get_fuzz_range(interval_days)
 
-        short_term_stability = self._clamp_stability(short_term_stability)
+        if (
+            self.enable_load_balancing
+            and self.due_histogram is not None
+            and review_millis is not None
+        ):
+            return self._get_load_balanced_interval(
+                interval_days=interval_days,
+                min_ivl=min_ivl,
+                max_ivl=max_ivl,
+                review_day=review_millis // MILLIS_PER_DAY,
+            )
 
-        return short_term_stability
+        fuzzed_interval_days = (
+            random() * (max_ivl - min_ivl + 1)
+        ) + min_ivl  # the next interval is a random value between min_ivl and max_ivl
 
-    def _next_difficulty(self, difficulty: float, rating: Rating) -> float:
-        def _linear_damping(delta_difficulty: float, difficulty: float) -> float:
-            return (10.0 - difficulty) * delta_difficulty / 9.0
+        fuzzed_interval_days = min(round(fuzzed_interval_days), self.maximum_interval)
 
-        def _mean_reversion(arg_1: float, arg_2: float) -> float:
-            return self.parameters[7] * arg_1 + (1 - self.parameters[7]) * arg_2
+        return fuzzed_interval_days
 
-        arg_1 = self._initial_difficulty(Rating.Easy)
+    def _get_load_balanced_interval(
+        self, interval_days: int, min_ivl: int, max_ivl: int, review_day: int
+    ) -> int:
+        """
+        Picks the interval between min_ivl and max_ivl whose due day has the fewest cards due.
+        Ties go to the interval closest to the unfuzzed one, then to the shorter one.
+        """
 
-        delta_difficulty = -(self.parameters[6] * (rating - 3))
-        arg_2 = difficulty + _linear_damping(
-            delta_difficulty=delta_difficulty, difficulty=difficulty
+        counts = self.due_histogram.counts_between(
+            review_day + min_ivl, review_day + max_ivl
         )
 
-        next_difficulty = _mean_reversion(arg_1=arg_1, arg_2=arg_2)
+        return min(
+            range(min_ivl, max_ivl + 1),
+            key=lambda ivl: (counts[ivl - min_ivl], abs(ivl - interval_days), ivl),
+        )
 
-        next_difficulty = self._clamp_difficulty(next_difficulty)
+    def _initial_stability_batch(self, rating: np.ndarray) -> np.ndarray:
+        return np.asarray(self._kernel.initial_stabilities)[rating - 1]
 
-        return next_difficulty
+    def _initial_difficulty_batch(self, rating: np.ndarray) -> np.ndarray:
+        return np.asarray(self._kernel.initial_difficulties)[rating - 1]
 
-    def _next_stability(
-        self, difficulty: float, stability: float, retrievability: float, rating: Rating
-    ) -> float:
-        if rating == Rating.Again:
-            next_stability = self._next_forget_stability(
-                difficulty=difficulty,
-                stability=stability,
-                retrievability=retrievability,
-            )
+    def _next_interval_batch(self, stability: np.ndarray) -> np.ndarray:
+        next_interval = (stability / self._FACTOR) * self._INTERVAL_MODIFIER
 
-        elif rating in (Rating.Hard, Rating.Good, Rating.Easy):
-            next_stability = self._next_recall_stability(
-                difficulty=difficulty,
-                stability=stability,
-                retrievability=retrievability,
-                rating=rating,
-            )
+        # intervals are full days, at least 1 day long and no longer than the maximum interval
+        next_interval = np.round(next_interval).astype(np.int64)
 
-        next_stability = self._clamp_stability(next_stability)
+        return np.clip(next_interval, 1, self.maximum_interval)
 
-        return next_stability
+    def _short_term_stability_batch(
+        self, stability: np.ndarray, rating: np.ndarray
+    ) -> np.ndarray:
+        short_term_stability_increase = np.asarray(
+            self._kernel.short_term_stability_factors
+        )[rating - 1] * (stability ** -self.parameters[19])
 
-    def _next_forget_stability(
-        self, difficulty: float, stability: float, retrievability: float
-    ) -> float:
-        next_forget_stability_long_term_params = (
-            self.parameters[11]
-            * (difficulty ** -self.parameters[12])
-            * (((stability + 1) ** (self.parameters[13])) - 1)
-            * (math.e ** ((1 - retrievability) * self.parameters[14]))
+        short_term_stability_increase = np.where(
+            rating >= Rating.Good,
+            np.maximum(short_term_stability_increase, 1.0),
+            short_term_stability_increase,
         )
 
-        next_forget_stability_short_term_params = stability / (
-            math.e ** (self.parameters[17] * self.parameters[18])
-        )
+        return np.maximum(stability * short_term_stability_increase, STABILITY_MIN)
 
-        return min(
-            next_forget_stability_long_term_params,
-            next_forget_stability_short_term_params,
+    def _next_difficulty_batch(
+        self, difficulty: np.ndarray, rating: np.ndarray
+    ) -> np.ndarray:
+        delta_difficulty = np.asarray(self._kernel.difficulty_deltas)[rating - 1]
+        arg_2 = difficulty + (10.0 - difficulty) * delta_difficulty / 9.0
+
+        next_difficulty = (
+            self._kernel.mean_reversion_target + self._kernel.mean_reversion_keep * arg_2
         )
 
-    def _next_recall_stability(
-        self, difficulty: float, stability: float, retrievability: float, rating: Rating
-    ) -> float:
-        hard_penalty = self.parameters[15] if rating == Rating.Hard else 1
-        easy_bonus = self.parameters[16] if rating == Rating.Easy else 1
+        return np.clip(next_difficulty, MIN_DIFFICULTY, MAX_DIFFICULTY)
 
-        return stability * (
+    def _next_stability_batch(
+        self,
+        difficulty: np.ndarray,
+        stability: np.ndarray,
+        retrievability: np.ndarray,
+        rating: np.ndarray,
+    ) -> np.ndarray:
+        next_forget_stability = np.minimum(
+            self.parameters[11]
+            * (difficulty ** -self.parameters[12])
+            * (((stability + 1) ** (self.parameters[13])) - 1)
+            * (math.e ** ((1 - retrievability) * self.parameters[14])),
+            stability / self._kernel.forget_short_term_divisor,
+        )
+
+        next_recall_stability = stability * (
             1
-            + (math.e ** (self.parameters[8]))
+            + self._kernel.recall_scale
             * (11 - difficulty)
             * (stability ** -self.parameters[9])
             * ((math.e ** ((1 - retrievability) * self.parameters[10])) - 1)
-            * hard_penalty
-            * easy_bonus
+            * np.asarray(self._kernel.recall_modifiers)[rating - 1]
         )
 
-    def _get_fuzzed_interval(self, interval: timedelta) -> timedelta:
-        """
-        Takes the current calculated interval and adds a small amount of random fuzz to it.
-        For example, a card that would've been due in 50 days, after fuzzing, might be due in 49, or 51 days.
+        next_stability = np.where(
+            rating == Rating.Again, next_forget_stability, next_recall_stability
+        )
 
-        Args:
-            interval: The calculated next interval, before fuzzing.
+        return np.maximum(next_stability, STABILITY_MIN)
 
-        Returns:
-            The new interval, after fuzzing.
+    @staticmethod
+    def _step_tables_millis(
+        steps_millis: tuple[int, ...],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (re)learning step intervals and the interval used for a Hard rating at each step, in milliseconds.
         """
 
-        interval_days = interval.days
+        step_millis = np.array(steps_millis, dtype=np.int64)
 
-        if interval_days < 2.5:  # fuzz is not applied to intervals less than 2.5
-            return interval
+        hard_millis = step_millis.copy()
+        if len(steps_millis) == 1:
+            hard_millis[0] = steps_millis[0] * 3 // 2
+        else:
+            hard_millis[0] = (steps_millis[0] + steps_millis[1]) // 2
 
-        def _get_fuzz_range(interval_days: int) -> tuple[int, int]:
-            """
-            Helper function that computes the possible upper and lower bounds of the interval after fuzzing.
-            """
+        return step_millis, hard_millis
 
-            delta = 1.0
-            for fuzz_range in FUZZ_RANGES:
-                delta += fuzz_range["factor"] * max(
-                    min(interval_days, fuzz_range["end"]) - fuzz_range["start"], 0.0
-                )
+    def _get_fuzzed_interval_days_batch(
+        self, interval_days: np.ndarray, fuzz_draws: np.ndarray, review_days: np.ndarray
+    ) -> np.ndarray:
+        """
+        The vectorized equivalent of _get_fuzzed_interval, with one uniform [0, 1) draw per interval.
+        """
 
-            min_ivl = int(round(interval_days - delta))
-            max_ivl = int(round(interval_days + delta))
+        delta = np.ones(interval_days.shape, dtype=np.float64)
+        for fuzz_range in FUZZ_RANGES:
+            delta += fuzz_range["factor"] * np.maximum(
+                np.minimum(interval_days, fuzz_range["end"]) - fuzz_range["start"], 0.0
+            )
 
-            # make sure the min_ivl and max_ivl fall into a valid range
-            min_ivl = max(2, min_ivl)
-            max_ivl = min(max_ivl, self.maximum_interval)
-            min_ivl = min(min_ivl, max_ivl)
+        min_ivl = np.round(interval_days - delta).astype(np.int64)
+        max_ivl = np.round(interval_days + delta).astype(np.int64)
+
+        # make sure the min_ivl and max_ivl fall into a valid range
+        min_ivl = np.maximum(2, min_ivl)
+        max_ivl = np.minimum(max_ivl, self.maximum_interval)
+        min_ivl = np.minimum(min_ivl, max_ivl)
+
+        if self.enable_load_balancing and self.due_histogram is not None:
+            # only the fuzzed intervals take part, so that the unfuzzed ones don't occupy days they don't use
+            fuzzed = interval_days >= 2.5
+            fuzzed_interval_days = interval_days.astype(np.int64)
+            fuzzed_interval_days[fuzzed] = self._get_load_balanced_interval_batch(
+                interval_days=interval_days[fuzzed],
+                min_ivl=min_ivl[fuzzed],
+                max_ivl=max_ivl[fuzzed],
+                review_days=review_days[fuzzed],
+            )
+        else:
+            fuzzed_interval_days = np.round(
+                fuzz_draws * (max_ivl - min_ivl + 1) + min_ivl
+            ).astype(np.int64)
+            fuzzed_interval_days = np.minimum(
+                fuzzed_interval_days, self.maximum_interval
+            )
 
-            return min_ivl, max_ivl
+        # fuzz is not applied to intervals less than 2.5
+        return np.where(interval_days < 2.5, interval_days, fuzzed_interval_days)
 
-        min_ivl, max_ivl = _get_fuzz_range(interval_days)
+    def _get_load_balanced_interval_batch(
+        self,
+        interval_days: np.ndarray,
+        min_ivl: np.ndarray,
+        max_ivl: np.ndarray,
+        review_days: np.ndarray,
+    ) -> np.ndarray:
+        """
+        The batch equivalent of _get_load_balanced_interval. The cards are assigned one at a time and each chosen
+        day is counted before the next card picks, so cards with overlapping fuzz ranges spread over the least
+        loaded days instead of all landing on the same one. The histogram itself is left unchanged.
+        """
 
-        fuzzed_interval_days = (
-            random() * (max_ivl - min_ivl + 1)
-        ) + min_ivl  # the next interval is a random value between min_ivl and max_ivl
+        if interval_days.size == 0:
+            return interval_days
 
-        fuzzed_interval_days = min(round(fuzzed_interval_days), self.maximum_interval)
+        first_day = int((review_days + min_ivl).min())
+        last_day = int((review_days + max_ivl).max())
+        counts = self.due_histogram.counts_between(first_day, last_day)
 
-        fuzzed_interval = timedelta(days=fuzzed_interval_days)
+        best_ivl = np.empty(interval_days.shape, dtype=np.int64)
+        for i, (interval, low, high, review_day) in enumerate(
+            zip(interval_days.tolist(), min_ivl.tolist(), max_ivl.tolist(), review_days.tolist())
+        ):
+            offset = review_day - first_day
+            ivl = min(
+                range(low, high + 1),
+                key=lambda ivl: (counts[offset + ivl], abs(ivl - interval), ivl),
+            )
+            counts[offset + ivl] += 1
+            best_ivl[i] = ivl
 
-        return fuzzed_interval
+        return best_ivl
 
     @staticmethod  # Nuzy
     def epoch_millis_to_date(millis):
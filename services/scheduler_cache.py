@@ -0,0 +1,100 @@
+"""
+fsrs.scheduler_cache
+---------
+
+This module defines the SchedulerCache class.
+
+Classes:
+    SchedulerCache: Builds and caches one Scheduler per deck from the parameters stored in the database.
+"""
+
+from __future__ import annotations
+
+from db import DeckCRUD, ParametersCRUD
+from models.due_histogram import DueHistogram
+from services.scheduler import Scheduler, DEFAULT_PARAMETERS
+
+
+class SchedulerCache:
+    """
+    The Scheduler of each deck, built once from the stored parameters and reused for every card of the deck.
+
+    A deck uses its own parameter set (see Optimizer.optimize_deck_parameters) when it has one, otherwise the
+    nearest ancestor deck's, otherwise the collection-wide parameters and finally DEFAULT_PARAMETERS. Decks that
+    resolve to the same parameters share one Scheduler.
+
+    Attributes:
+        scheduler_options: The keyword arguments other than the parameters passed to every Scheduler built.
+        enable_load_balancing: Whether the schedulers balance the fuzzed due dates over due_histogram.
+        due_histogram: The per-day due counts shared by the schedulers, usually CardCRUD.get_due_histogram().
+    """
+
+    def __init__(
+        self,
+        parameters_crud: ParametersCRUD | None = None,
+        deck_crud: DeckCRUD | None = None,
+        **scheduler_options,
+    ) -> None:
+        self.parameters_crud = parameters_crud if parameters_crud is not None else ParametersCRUD()
+        self.deck_crud = deck_crud if deck_crud is not None else DeckCRUD()
+        self.scheduler_options = scheduler_options
+        self.enable_load_balancing = False
+        self.due_histogram: DueHistogram | None = None
+
+        self._by_deck: dict[int | None, Scheduler] = {}
+        self._by_parameters: dict[tuple[float, ...], Scheduler] = {}
+
+    def get(self, deck_id: int | None = None) -> Scheduler:
+        """Returns the Scheduler of the deck, or the collection-wide one if deck_id is None."""
+        scheduler = self._by_deck.get(deck_id)
+        if scheduler is None:
+            parameters = self._resolve_parameters(deck_id)
+            scheduler = self._by_parameters.get(parameters)
+            if scheduler is None:
+                scheduler = Scheduler(
+                    parameters=parameters,
+                    enable_load_balancing=self.enable_load_balancing,
+                    due_histogram=self.due_histogram,
+                    **self.scheduler_options,
+                )
+                self._by_parameters[parameters] = scheduler
+            self._by_deck[deck_id] = scheduler
+        return scheduler
+
+    def set_load_balancing(self, due_histogram: DueHistogram | None) -> None:
+        """Enables load balancing over due_histogram (disables it for None), for cached schedulers too."""
+        self.enable_load_balancing = due_histogram is not None
+        self.due_histogram = due_histogram
+        for scheduler in self._by_parameters.values():
+            scheduler.enable_load_balancing = self.enable_load_balancing
+            scheduler.due_histogram = due_histogram
+
+    def invalidate(self, deck_id: int | None = None) -> None:
+        """
+        Drops the cached schedulers, e.g. after new parameters were stored, so that they're rebuilt on next use.
+        With a deck_id only that deck's is dropped; its subdecks keep theirs until they're invalidated too.
+        """
+        if deck_id is None:
+            self._by_deck.clear()
+            self._by_parameters.clear()
+        else:
+            self._by_deck.pop(deck_id, None)
+
+    def _resolve_parameters(self, deck_id: int | None) -> tuple[float, ...]:
+        """The parameters of the deck, falling back to its ancestors', the collection-wide and the default ones."""
+        visited = set()
+        while deck_id is not None and deck_id not in visited:
+            visited.add(deck_id)
+            row = self.parameters_crud.get_parameters(deck_id)
+            if row is not None:
+                return tuple(ParametersCRUD.parse_parameters(row))
+            deck = self.deck_crud.get_deck_by_id(deck_id)
+            deck_id = deck["parent_id"] if deck is not None else None
+
+        row = self.parameters_crud.get_parameters()
+        if row is not None:
+            return tuple(ParametersCRUD.parse_parameters(row))
+        return tuple(DEFAULT_PARAMETERS)
+
+
+__all__ = ["SchedulerCache"]
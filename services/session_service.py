@@ -1,18 +1,22 @@
 import random
+from itertools import chain
 from dataclasses import astuple, dataclass, field
 from datetime import timedelta
-from datetime import datetime, timezone
-from typing import List, Optional, NamedTuple, Dict
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import List, Optional, NamedTuple
 
 from services.scheduler import Scheduler
-from models import Card, State, ReviewLog, Content, Rating
+from services.scheduler_cache import SchedulerCache
+from services.card_writer import CardWriter
+from services.review_journal import ReviewJournal
+from services.look_ahead_cache import LookAheadCache
+from services.content_cache import ContentCache
+from models import Card, State, ReviewLog, Content, Rating, DueQueue
 from db import CardCRUD, DeckCRUD, RevlogCRUD, MetadataCRUD, ContentCRUD
 from utils import DEFAULT_DECK_ID, DEFAULT_DECK_NAME
 
 
-# To-do: Cached queue? with cards due between session_cutoff and next_day?
-
-
 @dataclass
 class DeckCounts:
     new: int = 0
@@ -33,20 +37,16 @@ class StudySession:
     start_time: datetime
     cutoff_time: datetime
     limit_for_new_cards: int
+    study_date: Optional[date] = None  # the UTC day the session studies, unlike cutoff_time it doesn't move
 
-    new_cards: List[Card] = field(default_factory=list)
-    learn_cards: List[Card] = field(default_factory=list)
-    review_cards: List[Card] = field(default_factory=list)
+    new_cards: DueQueue = field(default_factory=DueQueue)
+    learn_cards: DueQueue = field(default_factory=DueQueue)
+    review_cards: DueQueue = field(default_factory=DueQueue)
 
-    cards_done_until_cutoff: List[Card] = field(default_factory=list)
-
-    indexed_contents: Dict[int, Content] = field(default_factory=dict)
+    cards_done_until_cutoff: DueQueue = field(default_factory=DueQueue)
 
     review_logs: List[ReviewLog] = field(default_factory=list)
 
-    def build_content_index(self, card_contents):
-        self.indexed_contents = {c.id: c for c in card_contents} if card_contents is not None else {}
-
 
 @dataclass
 class CurrentCardData:
@@ -55,10 +55,11 @@ class CurrentCardData:
 
 
 class AppContext(NamedTuple):
-    scheduler: Scheduler = Scheduler()
+    schedulers: SchedulerCache = SchedulerCache()
     card_crud: CardCRUD = CardCRUD()
     deck_crud: DeckCRUD = DeckCRUD()
     content_crud: ContentCRUD = ContentCRUD()
+    content_cache: ContentCache = ContentCache()  # shared by every session and deck
     revlog_crud: RevlogCRUD = RevlogCRUD()
     metadata_crud: MetadataCRUD = MetadataCRUD()
 
@@ -67,6 +68,12 @@ class SessionService:
     DAILY_LIMIT_FOR_NEW_CARDS = 30  # To-do for improvement: add limits per deck, and one overall limit
     SHOULD_LEARN_AHEAD = True
     LEARN_AHEAD_MINUTES = 60
+    LOOK_AHEAD_REFILL_MINUTES = 120  # start preloading the next day's cards this long before the day boundary
+    PREFETCH_CARDS = 20  # contents of the next cards of each queue loaded in the background
+    SHOULD_LOAD_BALANCE = False  # fuzz towards the day with the fewest cards due
+    CARD_FLUSH_SIZE = 50  # answered cards written back at once by the background writer
+    CARD_FLUSH_SECONDS = 30  # at most this long after a card is answered
+    JOURNAL_MAX_LATENCY_SECONDS = 0.5  # answers are on disk in the review journal at most this long after
 
     NEW_KEY = "new"
     LEARN_KEY = "learn"
@@ -80,6 +87,24 @@ class SessionService:
 
     def __init__(self, deck_id: Optional[int] = None):
         self.context = AppContext()
+        # the journal lives next to the database, answers left in it by a crash are recovered first
+        self.journal = ReviewJournal(
+            path=Path(self.context.revlog_crud.db_path).with_suffix(".journal"),
+            max_latency=SessionService.JOURNAL_MAX_LATENCY_SECONDS,
+            revlog_crud=self.context.revlog_crud,
+            card_crud=self.context.card_crud,
+        )
+        # a card is only written once the answer that changed it is on disk in the journal
+        self.card_writer = CardWriter(
+            card_crud=self.context.card_crud,
+            max_pending=SessionService.CARD_FLUSH_SIZE,
+            max_delay=SessionService.CARD_FLUSH_SECONDS,
+            journal=self.journal,
+        )
+        self.journal.replay()
+        self.look_ahead = LookAheadCache(card_crud=self.context.card_crud)
+        if SessionService.SHOULD_LOAD_BALANCE:
+            self.context.schedulers.set_load_balancing(self.context.card_crud.get_due_histogram())
 
         self.current_deck_data: CurrentDeckData = CurrentDeckData()
         self.current_card_data: Optional[CurrentCardData] = None
@@ -100,13 +125,22 @@ class SessionService:
         self.session = StudySession(
             start_time=start_time,
             cutoff_time=cutoff_time,
-            limit_for_new_cards=limit_for_new_cards
+            limit_for_new_cards=limit_for_new_cards,
+            study_date=start_time.date()
         )
 
         self.populate_session_lists()  # 2 needs cutoff_time, limit_for_new_cards
-        self.populate_session_indexed_contents()  # 3 needs all lists ready
+        self.prefetch_contents()  # 3 needs all lists ready
         self.update_deck_counts()  # 3 needs all lists ready
 
+        self.look_ahead.clear()
+        self.preload_look_ahead()  # 4 needs all lists ready
+
+    @property
+    def scheduler(self) -> Scheduler:
+        """The scheduler of the current deck, built from its parameters once and then cached."""
+        return self.context.schedulers.get(self.current_deck_data.deck_id)
+
     def start_review_timer(self):
         self.review_start_time = datetime.now()
 
@@ -140,34 +174,23 @@ class SessionService:
 
     def populate_session_lists(self):
         cards = self.get_session_new_cards_within_limit()
-        self.session.new_cards = [Card(*card) for card in cards]
+        self.session.new_cards = DueQueue(Card(*card) for card in cards)
 
         cards = self.get_session_learn_cards()
-        self.session.learn_cards = [Card(*card) for card in cards]
+        self.session.learn_cards = DueQueue(Card(*card) for card in cards)
 
         cards = self.get_session_review_cards()
-        self.session.review_cards = [Card(*card) for card in cards]
-
-    def gather_session_content_ids(self):
-        assert self.has_cards_to_study()
-
-        content_ids = []
-        if self.session.new_cards:
-            content_ids.extend([card.content_id for card in self.session.new_cards])
-        if self.session.learn_cards:
-            content_ids.extend([card.content_id for card in self.session.learn_cards])
-        if self.session.review_cards:
-            content_ids.extend([card.content_id for card in self.session.review_cards])
-
-        return content_ids
+        self.session.review_cards = DueQueue(Card(*card) for card in cards)
 
-    def populate_session_indexed_contents(self):
-        if self.has_cards_to_study():
-            content_ids = self.gather_session_content_ids()
-            contents = self.context.content_crud.get_many_contents_by_ids(content_ids)
-            contents = [Content(*content) for content in contents]
-            self.session.build_content_index(card_contents=contents)
-            print(len(self.session.indexed_contents))
+    def prefetch_contents(self):
+        """
+        Loads the contents of the next cards of each queue in the background. The next card shown is always
+        the head of a queue, so a page is only fetched once a head's content isn't cached anymore.
+        """
+        content_cache = self.context.content_cache
+        for queue in (self.session.new_cards, self.session.learn_cards, self.session.review_cards):
+            if queue and queue.peek().content_id not in content_cache:
+                content_cache.prefetch(card.content_id for card in queue.smallest(SessionService.PREFETCH_CARDS))
 
     def update_deck_counts(self):
         self.current_deck_data.count.new = len(self.session.new_cards) \
@@ -227,38 +250,92 @@ class SessionService:
 
     def get_next_intervals(self) -> tuple[str, str, str, str]:
         now = datetime.now(timezone.utc)
-        _, _, again = self.context.scheduler.review_card(self.current_card_data.card, Rating.Again, now, None)
-        _, _, hard = self.context.scheduler.review_card(self.current_card_data.card, Rating.Hard, now, None)
-        _, _, good = self.context.scheduler.review_card(self.current_card_data.card, Rating.Good, now, None)
-        _, _, easy = self.context.scheduler.review_card(self.current_card_data.card, Rating.Easy, now, None)
-        again = self.format_intervals(again)
-        hard = self.format_intervals(hard)
-        good = self.format_intervals(good)
-        easy = self.format_intervals(easy)
+        outcomes = self.scheduler.preview(self.current_card_data.card, now)
+        again = self.format_intervals(outcomes[Rating.Again].interval)
+        hard = self.format_intervals(outcomes[Rating.Hard].interval)
+        good = self.format_intervals(outcomes[Rating.Good].interval)
+        easy = self.format_intervals(outcomes[Rating.Easy].interval)
         return again, hard, good, easy
 
     def has_day_changed(self):
-        if datetime.now(timezone.utc).day > self.session.cutoff_time.day:
-            return True
-        return False
+        # not against the cutoff: it moves with the clock and, learning ahead, is already on the next day before midnight
+        return datetime.now(timezone.utc).date() > self.session.study_date
 
     def update_session_span(self):
         self.session.start_time = datetime.now(timezone.utc)
         self.session.cutoff_time = self.get_session_cutoff()
 
     def on_day_change(self):
-        self.update_cards_in_db()
-        self.clear_session_lists()
+        """
+        Starts the new day's quota of new cards. The learn and review cards don't depend on the day and keep
+        rolling in from the look-ahead cache, unless its window is behind the new cutoff (e.g. the app sat idle
+        across the day boundary): then the cards due meanwhile were never loaded, and the session is reloaded.
+        """
+        self.update_cards_in_db()  # so that the queries below don't return the cards answered in the session
 
         self.update_session_span()
-        self.populate_session_lists()
+        self.session.study_date = self.session.start_time.date()
+        self.session.limit_for_new_cards = self.get_session_limit_for_new_cards(self.session.cutoff_time)
+
+        loaded_until = self.look_ahead.loaded_until
+        if loaded_until is None or loaded_until < Scheduler.date_to_epoch_millis(self.session.cutoff_time):
+            self.clear_session_lists()
+            self.populate_session_lists()
+            self.look_ahead.clear()
+            self.preload_look_ahead()
+        else:
+            cards = self.get_session_new_cards_within_limit()
+            self.session.new_cards = DueQueue(Card(*card) for card in cards)
+            self.promote_due_cards()
+
+        self.prefetch_contents()
+        self.update_deck_counts()
+
+    def advance_session(self):
+        """Moves the session cutoff along with the clock and promotes the cards that have become due."""
+        if self.has_day_changed():
+            self.on_day_change()
+            return
+        self.update_session_span()
+        self.promote_due_cards()
+
+    def preload_look_ahead(self):
+        """Starts loading the next window of cards due after the cutoff, leaving out the ones in the session."""
+        from_epoch_millis = self.look_ahead.loaded_until
+        if from_epoch_millis is None:
+            from_epoch_millis = Scheduler.date_to_epoch_millis(self.session.cutoff_time)
+        session_card_ids = {card.id for card in chain(self.session.new_cards,
+                                                      self.session.learn_cards,
+                                                      self.session.review_cards,
+                                                      self.session.cards_done_until_cutoff)}
+        if self.current_card_data is not None:
+            session_card_ids.add(self.current_card_data.card.id)
+        self.look_ahead.preload(self.current_deck_data.deck_id, from_epoch_millis, session_card_ids)
+
+    def promote_due_cards(self):
+        """
+        Moves the cards due by the cutoff into the session queues: the ones answered earlier in the session
+        and the ones preloaded by the look-ahead cache. Never waits for the database.
+        """
+        cutoff_epoch_millis = Scheduler.date_to_epoch_millis(self.session.cutoff_time)
+
+        done = self.session.cards_done_until_cutoff
+        while done and done.peek().due <= cutoff_epoch_millis:
+            self.match_and_append_to_list(done.pop())
+
+        for card in self.look_ahead.promote(cutoff_epoch_millis):
+            self.match_and_append_to_list(card)
+
+        refill_millis = SessionService.LOOK_AHEAD_REFILL_MINUTES * 60_000
+        if not self.look_ahead.is_loading and cutoff_epoch_millis + refill_millis >= self.look_ahead.loaded_until:
+            self.preload_look_ahead()
+
         self.update_deck_counts()
 
     def match_and_append_to_list(self, updated_card):
         target_list = self.card_state_to_session_list.get(updated_card.state)
         if target_list is not None:
-            target_list.append(updated_card)
-            # target_list.sort(key=lambda card: card.due)
+            target_list.push(updated_card)
         else:
             print("match_and_append_to_list failed")
 
@@ -267,13 +344,15 @@ class SessionService:
         rating = Rating[rating_txt]
         review_datetime = datetime.now(timezone.utc)
 
-        card, review_log, _ = self.context.scheduler.review_card(card, rating, review_datetime, review_duration)
+        card, review_log, _ = self.scheduler.review_card(card, rating, review_datetime, review_duration)
 
         self.session.review_logs.append(review_log)
+        journal_sequence = self.journal.append(review_log, card)
+        self.card_writer.mark_dirty(card, journal_sequence)
         print(f"len(self.session.review_logs): {len(self.session.review_logs)}")
 
         if card.due > Scheduler.date_to_epoch_millis(self.session.cutoff_time):
-            self.session.cards_done_until_cutoff.append(card)
+            self.session.cards_done_until_cutoff.push(card)
 
         else:
             self.match_and_append_to_list(card)
@@ -314,9 +393,9 @@ class SessionService:
             (False, False, True): w_review,
         }
         self._list_refs = {
-            k_new: self.session.new_cards,  # Reference to existing list
-            k_learn: self.session.learn_cards,  # Reference to existing list
-            k_review: self.session.review_cards  # Reference to existing list
+            k_new: self.session.new_cards,  # Reference to existing queue
+            k_learn: self.session.learn_cards,  # Reference to existing queue
+            k_review: self.session.review_cards  # Reference to existing queue
         }
 
     def has_cards_to_study(self):
@@ -373,6 +452,7 @@ class SessionService:
                 return names[2]
 
     def set_next_card(self) -> None:
+        self.advance_session()
         selected_list_name = self.choose_weighted_list_name()
 
         # Fast empty check before expensive selection
@@ -380,47 +460,40 @@ class SessionService:
             self.current_card_data = None
             return
 
-        # Direct list access without string comparison overhead
+        # Direct queue access without string comparison overhead
         selected_list = self._list_refs[selected_list_name]
 
-        cc = selected_list.pop(0)
+        cc = selected_list.pop()  # the card due first, O(log n)
         assert cc is not None
-        selected_list.sort(key=lambda card: card.due)  # To-do: sort before or after popping? to avoid seeing the same card next
 
-        content = self.session.indexed_contents.get(cc.content_id)
+        content = self.context.content_cache.get(cc.content_id)
+        self.prefetch_contents()
         if not self.current_card_data:
             self.current_card_data = CurrentCardData(cc, content)
         else:
             self.current_card_data.card = cc
             self.current_card_data.content = content
 
-    def gather_all_updated_cards(self):
-        updated_cards = (self.session.cards_done_until_cutoff
-                         + self.session.learn_cards
-                         + self.session.review_cards
-                         + self.session.new_cards)
-        if len(updated_cards) < len(self.session.indexed_contents):
-            self.match_and_append_to_list(self.current_card_data.card)  # relevant for new cards studied on this session
-            updated_cards.append(self.current_card_data.card)
-        return updated_cards
-
     def update_cards_in_db(self):
-        updated_cards = self.gather_all_updated_cards()
-
-        updated_cards_dict: List[dict] = [uc.to_dict() for uc in updated_cards]
+        """Writes the cards answered since the last flush, the others are unchanged."""
+        self.card_writer.flush()
 
-        self.context.card_crud.update_many_cards(updated_cards_dict=updated_cards_dict)
+    def close(self):
+        """Stops the background writer and journal at app exit, writing the cards and answers they still hold."""
+        self.card_writer.close()
+        self.journal.close()
 
     def clear_session_lists(self):
-        self.session.cards_done_until_cutoff = []
-        self.session.review_cards = []
-        self.session.learn_cards = []
-        self.session.new_cards = []
+        self.session.cards_done_until_cutoff = DueQueue()
+        self.session.review_cards = DueQueue()
+        self.session.learn_cards = DueQueue()
+        self.session.new_cards = DueQueue()
 
     def on_session_end(self):
         if self.session.review_logs and len(self.session.review_logs) > 0:
             self.context.revlog_crud.insert_many_reviews([astuple(rv) for rv in self.session.review_logs])
             self.update_cards_in_db()
+            self.journal.checkpoint()  # every answer of the session is in the database now
             new_cards_reviewed = max(self.session.limit_for_new_cards - len(self.session.new_cards), 0)
 
             self.session.review_logs = []
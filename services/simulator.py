@@ -0,0 +1,383 @@
+"""
+fsrs.simulator
+---------
+
+This module defines the vectorized review simulator used to compute the optimal retention.
+
+Classes:
+    RetentionSearchResult: The optimal retention found by search_optimal_retention and the cost curve it evaluated.
+
+Functions:
+    simulate_cost: Simulates a year of reviews for many new cards at once and returns the cost per unit of knowledge.
+    simulate_costs: simulate_cost for several retentions at once, optionally spread over worker processes.
+    search_optimal_retention: Searches a continuous range of retentions for the one with the lowest simulated cost.
+"""
+
+from __future__ import annotations
+
+import math
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import numpy as np
+
+from models.card import State
+from models.review_log import Rating
+from services.scheduler import Scheduler, NO_STEP, NO_LAST_REVIEW
+
+# simulate from the beginning of 2025 till before the beginning of 2026
+SIMULATION_START = Scheduler.date_to_epoch_millis(
+    datetime(2025, 1, 1, 0, 0, 0, 0, timezone.utc)
+)
+SIMULATION_END = Scheduler.date_to_epoch_millis(
+    datetime(2026, 1, 1, 0, 0, 0, 0, timezone.utc)
+)
+
+# the simulated cards are split into shards of this many cards, each with its own random stream,
+# so that results don't depend on how many worker processes the shards are spread over
+SIMULATION_SHARD_SIZE = 10_000
+
+
+def _draw_indices(cumulative_probs: np.ndarray, draws: np.ndarray) -> np.ndarray:
+    """Maps uniform draws to indices of the categorical distribution with the given cumulative probabilities."""
+    indices = np.searchsorted(cumulative_probs, draws, side="right")
+    return np.minimum(indices, len(cumulative_probs) - 1)
+
+
+def _cumulative(probs: list[float]) -> np.ndarray:
+    cumulative_probs = np.cumsum(probs, dtype=np.float64)
+    return cumulative_probs / cumulative_probs[-1]
+
+
+def _simulate_review_time(
+    desired_retention: float,
+    parameters: tuple[float, ...] | list[float],
+    num_cards_simulate: int,
+    probs_and_costs_dict: dict[str, float],
+    rng: np.random.Generator,
+) -> float:
+    """
+    Simulates a year of reviews of `num_cards_simulate` new cards and returns their total review time.
+
+    All cards are advanced together in review rounds: every round reviews each card still due within the year
+    at its due time with Scheduler.review_cards_batch, with all ratings drawn at once from `rng`. A card's first
+    rating follows the first-review rating probabilities; afterwards it is recalled with probability
+    desired_retention and then rated Hard/Good/Easy following the recall rating probabilities.
+
+    Every round draws the same number of values from `rng` whichever cards are still active, so the k-th review
+    of card i always uses the same random numbers. Simulations run with identically seeded generators therefore
+    share their random streams (common random numbers) and differ only through desired_retention and parameters.
+
+    Args:
+        desired_retention: The desired retention of the simulated scheduler.
+        parameters: The FSRS parameters of the simulated scheduler.
+        num_cards_simulate: The number of new cards to simulate.
+        probs_and_costs_dict: The rating probabilities and average review durations, as returned by
+            Optimizer._compute_probs_and_costs.
+        rng: The random generator the ratings are drawn from.
+
+    Returns:
+        The total simulated review time.
+    """
+
+    scheduler = Scheduler(
+        parameters=parameters,
+        desired_retention=desired_retention,
+        enable_fuzzing=False,
+    )
+
+    ratings = list(Rating)
+    first_cumulative_probs = _cumulative(
+        [probs_and_costs_dict[f"prob_first_{rating.name.lower()}"] for rating in ratings]
+    )
+    recall_cumulative_probs = _cumulative(
+        [probs_and_costs_dict[f"prob_{rating.name.lower()}"] for rating in ratings[1:]]
+    )
+    # indexed by rating - 1
+    first_costs = np.array(
+        [
+            probs_and_costs_dict[f"avg_first_{rating.name.lower()}_review_duration"]
+            for rating in ratings
+        ],
+        dtype=np.float64,
+    )
+    costs = np.array(
+        [probs_and_costs_dict[f"avg_{rating.name.lower()}_review_duration"] for rating in ratings],
+        dtype=np.float64,
+    )
+
+    n = num_cards_simulate
+    state = np.full(n, int(State.New), dtype=np.int64)
+    step = np.full(n, NO_STEP, dtype=np.int64)
+    stability = np.full(n, np.nan)
+    difficulty = np.full(n, np.nan)
+    last_review = np.full(n, NO_LAST_REVIEW, dtype=np.int64)
+    due = np.full(n, SIMULATION_START, dtype=np.int64)
+
+    simulation_cost = 0.0
+    active = np.arange(n)
+    is_first_review = True
+    while active.size:
+        # one draw per card and round, used or not, keeps the random streams aligned across simulations
+        recall_draws, rating_draws = rng.random((2, n))[:, active]
+        if is_first_review:
+            # the cards are new
+            rating = _draw_indices(first_cumulative_probs, rating_draws) + Rating.Again
+            simulation_cost += first_costs[rating - 1].sum()
+        else:
+            recalled = recall_draws < desired_retention
+            # the probability that the user chose hard/good/easy, GIVEN that they correctly recalled the card
+            recall_rating = _draw_indices(recall_cumulative_probs, rating_draws) + Rating.Hard
+            rating = np.where(recalled, recall_rating, int(Rating.Again))
+            simulation_cost += costs[rating - 1].sum()
+
+        batch = scheduler.review_cards_batch(
+            state=state[active],
+            step=step[active],
+            stability=stability[active],
+            difficulty=difficulty[active],
+            last_review=last_review[active],
+            rating=rating,
+            review_datetime=due[active],
+            rng=rng,
+        )
+        state[active] = batch.state
+        step[active] = batch.step
+        stability[active] = batch.stability
+        difficulty[active] = batch.difficulty
+        last_review[active] = batch.last_review
+        due[active] = batch.due
+
+        active = active[batch.due < SIMULATION_END]
+        is_first_review = False
+
+    return float(simulation_cost)
+
+
+def _simulate_shard(
+    desired_retention: float,
+    parameters: tuple[float, ...] | list[float],
+    num_cards_simulate: int,
+    probs_and_costs_dict: dict[str, float],
+    seed: int,
+    shard_index: int,
+) -> float:
+    """Worker entry point: simulates one shard with the random stream derived from (seed, shard_index)."""
+    return _simulate_review_time(
+        desired_retention=desired_retention,
+        parameters=parameters,
+        num_cards_simulate=num_cards_simulate,
+        probs_and_costs_dict=probs_and_costs_dict,
+        rng=np.random.default_rng([seed, shard_index]),
+    )
+
+
+def _pool(workers: int):
+    """A process pool with `workers` processes, or no pool (run in-process) for 1 worker."""
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+
+
+def _simulate_costs(
+    desired_retentions: list[float],
+    parameters: tuple[float, ...] | list[float],
+    num_cards_simulate: int,
+    probs_and_costs_dict: dict[str, float],
+    seed: int,
+    executor: Executor | None,
+) -> list[float]:
+    shard_sizes = [
+        min(SIMULATION_SHARD_SIZE, num_cards_simulate - start)
+        for start in range(0, num_cards_simulate, SIMULATION_SHARD_SIZE)
+    ]
+    tasks = [
+        (desired_retention, parameters, shard_size, probs_and_costs_dict, seed, shard_index)
+        for desired_retention in desired_retentions
+        for shard_index, shard_size in enumerate(shard_sizes)
+    ]
+
+    if executor is None:
+        review_times = [_simulate_shard(*task) for task in tasks]
+    else:
+        review_times = list(executor.map(_simulate_shard, *zip(*tasks)))
+
+    costs = []
+    for i, desired_retention in enumerate(desired_retentions):
+        # sum the shards in order so the result doesn't depend on the executor
+        simulation_cost = sum(review_times[i * len(shard_sizes) : (i + 1) * len(shard_sizes)])
+        total_knowledge = desired_retention * num_cards_simulate
+        costs.append(simulation_cost / total_knowledge)
+
+    return costs
+
+
+def simulate_costs(
+    desired_retentions: list[float],
+    parameters: tuple[float, ...] | list[float],
+    num_cards_simulate: int,
+    probs_and_costs_dict: dict[str, float],
+    seed: int = 42,
+    workers: int = 1,
+) -> list[float]:
+    """
+    Returns the simulate_cost of each of `desired_retentions`.
+
+    The cards are simulated in shards of SIMULATION_SHARD_SIZE cards and every (retention, shard) pair is
+    an independent task, so up to len(desired_retentions) * num_shards tasks run in parallel. Shard k is
+    seeded with (seed, k) for every retention, which keeps the random numbers common across retentions and
+    the results identical for any number of workers.
+    """
+
+    with _pool(workers) as executor:
+        return _simulate_costs(
+            desired_retentions=desired_retentions,
+            parameters=parameters,
+            num_cards_simulate=num_cards_simulate,
+            probs_and_costs_dict=probs_and_costs_dict,
+            seed=seed,
+            executor=executor,
+        )
+
+
+def simulate_cost(
+    desired_retention: float,
+    parameters: tuple[float, ...] | list[float],
+    num_cards_simulate: int,
+    probs_and_costs_dict: dict[str, float],
+    seed: int = 42,
+    workers: int = 1,
+) -> float:
+    """
+    Simulates a year of reviews of `num_cards_simulate` new cards and returns the total review time per unit of
+    knowledge retained (i.e. divided by desired_retention * num_cards_simulate).
+
+    Args:
+        desired_retention: The desired retention of the simulated scheduler.
+        parameters: The FSRS parameters of the simulated scheduler.
+        num_cards_simulate: The number of new cards to simulate.
+        probs_and_costs_dict: The rating probabilities and average review durations, as returned by
+            Optimizer._compute_probs_and_costs.
+        seed: The seed of the simulation's random streams.
+        workers: The number of worker processes the simulation is spread over.
+
+    Returns:
+        The simulated cost.
+    """
+
+    return simulate_costs(
+        desired_retentions=[desired_retention],
+        parameters=parameters,
+        num_cards_simulate=num_cards_simulate,
+        probs_and_costs_dict=probs_and_costs_dict,
+        seed=seed,
+        workers=workers,
+    )[0]
+
+
+class RetentionSearchResult(NamedTuple):
+    """
+    The result of search_optimal_retention.
+
+    Attributes:
+        optimal_retention: The evaluated retention with the lowest simulated cost.
+        cost: The simulated cost at optimal_retention.
+        cost_curve: Every evaluated (retention, cost) pair, ordered by retention.
+    """
+
+    optimal_retention: float
+    cost: float
+    cost_curve: list[tuple[float, float]]
+
+
+def search_optimal_retention(
+    parameters: tuple[float, ...] | list[float],
+    probs_and_costs_dict: dict[str, float],
+    lower: float = 0.7,
+    upper: float = 0.95,
+    tolerance: float = 0.01,
+    num_cards_simulate: int = 100_000,
+    seed: int = 42,
+    workers: int = 1,
+) -> RetentionSearchResult:
+    """
+    Finds the desired retention in [lower, upper] with the lowest simulated cost by golden-section search.
+
+    Every candidate is simulated with the random streams derived from `seed`, i.e. with common random numbers,
+    so the differences between candidates reflect the retention rather than sampling noise.
+
+    Args:
+        parameters: The FSRS parameters to simulate.
+        probs_and_costs_dict: The rating probabilities and average review durations.
+        lower: The lowest retention considered.
+        upper: The highest retention considered.
+        tolerance: The search stops once the bracket around the optimum is narrower than this.
+        num_cards_simulate: The number of cards simulated per candidate.
+        seed: The seed shared by every candidate's random streams.
+        workers: The number of worker processes each candidate's simulation is spread over.
+
+    Returns:
+        The best evaluated retention, its cost and the evaluated cost curve.
+
+    Raises:
+        ValueError: If the range or tolerance is invalid.
+    """
+
+    if not 0 < lower < upper < 1:
+        raise ValueError("lower and upper must satisfy 0 < lower < upper < 1")
+    if tolerance <= 0:
+        raise ValueError("tolerance must be positive")
+
+    cost_curve = {}
+
+    def _costs(*desired_retentions: float) -> list[float]:
+        missing = [r for r in desired_retentions if r not in cost_curve]
+        if missing:
+            costs = _simulate_costs(
+                desired_retentions=missing,
+                parameters=parameters,
+                num_cards_simulate=num_cards_simulate,
+                probs_and_costs_dict=probs_and_costs_dict,
+                seed=seed,
+                executor=executor,
+            )
+            cost_curve.update(zip(missing, costs))
+        return [cost_curve[r] for r in desired_retentions]
+
+    def _cost(desired_retention: float) -> float:
+        return _costs(desired_retention)[0]
+
+    inverse_golden_ratio = (math.sqrt(5) - 1) / 2
+
+    with _pool(workers) as executor:
+        a, b = lower, upper
+        c = b - inverse_golden_ratio * (b - a)
+        d = a + inverse_golden_ratio * (b - a)
+        cost_c, cost_d = _costs(c, d)
+        while b - a > tolerance:
+            if cost_c < cost_d:
+                # the minimum is in [a, d]
+                b, d, cost_d = d, c, cost_c
+                c = b - inverse_golden_ratio * (b - a)
+                cost_c = _cost(c)
+            else:
+                # the minimum is in [c, b]
+                a, c, cost_c = c, d, cost_d
+                d = a + inverse_golden_ratio * (b - a)
+                cost_d = _cost(d)
+
+    optimal_retention = min(cost_curve, key=cost_curve.get)
+
+    return RetentionSearchResult(
+        optimal_retention=optimal_retention,
+        cost=cost_curve[optimal_retention],
+        cost_curve=sorted(cost_curve.items()),
+    )
+
+
+__all__ = [
+    "simulate_cost",
+    "simulate_costs",
+    "search_optimal_retention",
+    "RetentionSearchResult",
+]
@@ -0,0 +1,98 @@
+"""
+Checks when CardWriter writes the dirty cards: by size, by time, on close, and only once their answers are
+on disk in the review journal.
+
+Run from the project root:
+    python -m pytest tests
+"""
+
+import threading
+import time
+
+from models import Card, ReviewLog, Rating
+from services.card_writer import CardWriter
+from services.review_journal import ReviewJournal
+
+TIMEOUT_SECONDS = 5
+
+
+class RecordingCardCRUD:
+    """Records the rows of every update_many_card_rows call instead of writing them."""
+
+    def __init__(self, journal: ReviewJournal | None = None) -> None:
+        self.journal = journal
+        self.writes = []
+        self.written = threading.Event()
+
+    def update_many_card_rows(self, rows):
+        synced = self.journal._synced if self.journal is not None else None
+        self.writes.append((rows, synced))
+        self.written.set()
+
+
+def _card(card_id: int, due: int = 0) -> Card:
+    return Card(card_id, due=due)
+
+
+def test_flushes_by_size():
+    card_crud = RecordingCardCRUD()
+    writer = CardWriter(card_crud, max_pending=3, max_delay=60)
+
+    writer.mark_dirty(_card(1))
+    writer.mark_dirty(_card(2))
+    assert not card_crud.written.wait(0.2)
+
+    writer.mark_dirty(_card(3))
+    assert card_crud.written.wait(TIMEOUT_SECONDS)
+    assert sorted(row[-1] for row in card_crud.writes[0][0]) == [1, 2, 3]
+    assert writer.pending_count == 0
+    writer.close()
+
+
+def test_flushes_by_time():
+    card_crud = RecordingCardCRUD()
+    writer = CardWriter(card_crud, max_pending=50, max_delay=0.2)
+
+    marked_at = time.monotonic()
+    writer.mark_dirty(_card(1))
+    assert card_crud.written.wait(TIMEOUT_SECONDS)
+    assert time.monotonic() - marked_at >= 0.2
+    assert [row[-1] for row in card_crud.writes[0][0]] == [1]
+    writer.close()
+
+
+def test_keeps_the_latest_state_of_a_card():
+    card_crud = RecordingCardCRUD()
+    writer = CardWriter(card_crud, max_pending=50, max_delay=60)
+
+    writer.mark_dirty(_card(1, due=100))
+    writer.mark_dirty(_card(1, due=200))
+    assert writer.flush() == 1
+    assert [(row[4], row[-1]) for row in card_crud.writes[0][0]] == [(200, 1)]
+    writer.close()
+
+
+def test_close_flushes_the_remaining_cards():
+    card_crud = RecordingCardCRUD()
+    writer = CardWriter(card_crud, max_pending=50, max_delay=60)
+
+    writer.mark_dirty(_card(1))
+    writer.mark_dirty(_card(2))
+    writer.close()
+    assert [sorted(row[-1] for row in rows) for rows, _ in card_crud.writes] == [[1, 2]]
+
+
+def test_writes_only_cards_whose_answers_are_journaled(tmp_path):
+    journal = ReviewJournal(tmp_path / "reviews.journal", max_latency=60)
+    card_crud = RecordingCardCRUD(journal)
+    writer = CardWriter(card_crud, max_pending=1, max_delay=60, journal=journal)
+
+    card = _card(1)
+    sequence = journal.append(ReviewLog(1, Rating.Good, 1000, 5), card)
+    writer.mark_dirty(card, sequence)
+
+    # the journal would only sync after a minute, the writer syncs it before writing the card
+    assert card_crud.written.wait(TIMEOUT_SECONDS)
+    assert card_crud.writes[0][1] >= sequence
+    writer.close()
+    journal.close()
@@ -0,0 +1,98 @@
+"""
+Checks that an interrupted Optimizer.compute_optimal_parameters run resumes from its checkpoint with either
+training backend.
+
+Run from the project root:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from models import Rating
+from models.review_log import ReviewLog
+from services.numpy_optimizer import ArrayTrainer
+from services.optimizer import Optimizer, DEFAULT_TRAINER
+from utils import MILLIS_PER_DAY
+
+START_MILLIS = 1_700_000_000_000
+INTERRUPTED_EPOCH = 2
+
+BACKENDS = [pytest.param(ArrayTrainer, id="numpy")]
+if DEFAULT_TRAINER is not ArrayTrainer:
+    BACKENDS.append(pytest.param(DEFAULT_TRAINER, id="torch"))
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _random_review_logs(seed: int, num_cards: int = 600) -> list[ReviewLog]:
+    rng = random.Random(seed)
+    review_logs = []
+    for card_id in range(num_cards):
+        review_datetime = START_MILLIS + rng.randint(0, 100) * MILLIS_PER_DAY
+        for _ in range(rng.randint(3, 10)):
+            review_logs.append(ReviewLog(card_id, Rating(rng.choice([1, 2, 3, 3, 3, 4])), review_datetime, 1000))
+            review_datetime += rng.randint(0, 30) * MILLIS_PER_DAY
+    return review_logs
+
+
+def _interrupting(trainer_class: type) -> type:
+    """A trainer that stops the run right after writing the checkpoint of INTERRUPTED_EPOCH."""
+
+    class InterruptingTrainer(trainer_class):
+        def save_checkpoint(self, training_state, checkpoint_path):
+            super().save_checkpoint(training_state, checkpoint_path)
+            if training_state["epoch"] == INTERRUPTED_EPOCH:
+                raise Interrupted
+
+    return InterruptingTrainer
+
+
+@pytest.mark.parametrize("trainer_class", BACKENDS)
+def test_resumed_run_matches_uninterrupted_run(tmp_path, trainer_class):
+    optimizer = Optimizer(_random_review_logs(0))
+    optimizer.trainer_class = trainer_class
+    expected = optimizer.compute_optimal_parameters()
+
+    checkpoint_path = tmp_path / "optimizer.ckpt"
+    optimizer.trainer_class = _interrupting(trainer_class)
+    with pytest.raises(Interrupted):
+        optimizer.compute_optimal_parameters(checkpoint_path=checkpoint_path)
+
+    optimizer.trainer_class = trainer_class
+    assert optimizer.resume_optimal_parameters(checkpoint_path) == pytest.approx(expected, rel=1e-12)
+    # the finished run's checkpoint resumes to the same result without training again
+    assert optimizer.resume_optimal_parameters(checkpoint_path) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("trainer_class", BACKENDS)
+def test_resume_rejects_different_review_logs(tmp_path, trainer_class):
+    checkpoint_path = tmp_path / "optimizer.ckpt"
+    optimizer = Optimizer(_random_review_logs(0))
+    optimizer.trainer_class = _interrupting(trainer_class)
+    with pytest.raises(Interrupted):
+        optimizer.compute_optimal_parameters(checkpoint_path=checkpoint_path)
+
+    other_optimizer = Optimizer(_random_review_logs(1))
+    other_optimizer.trainer_class = trainer_class
+    with pytest.raises(ValueError):
+        other_optimizer.resume_optimal_parameters(checkpoint_path)
+
+
+@pytest.mark.parametrize("trainer_class", BACKENDS)
+def test_early_stopping_is_resumed(tmp_path, trainer_class):
+    """The patience counter is part of the checkpoint, so early stopping ends the resumed run at the same epoch."""
+    optimizer = Optimizer(_random_review_logs(0))
+    optimizer.trainer_class = trainer_class
+    expected = optimizer.compute_optimal_parameters(patience=1)
+
+    checkpoint_path = tmp_path / "optimizer.ckpt"
+    optimizer.trainer_class = _interrupting(trainer_class)
+    with pytest.raises(Interrupted):
+        optimizer.compute_optimal_parameters(checkpoint_path=checkpoint_path, patience=1)
+
+    optimizer.trainer_class = trainer_class
+    assert optimizer.resume_optimal_parameters(checkpoint_path) == pytest.approx(expected, rel=1e-12)
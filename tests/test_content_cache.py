@@ -0,0 +1,78 @@
+"""
+Checks ContentCache's LRU eviction and background prefetching.
+
+Run from the project root:
+    python -m pytest tests
+"""
+
+import time
+
+from services.content_cache import ContentCache
+
+TIMEOUT_SECONDS = 5
+
+
+class RecordingContentCRUD:
+    """Serves (id, de, en) rows for any id and records the ids of every query."""
+
+    def __init__(self) -> None:
+        self.queries = []
+
+    def get_many_contents_by_ids(self, ids):
+        ids = list(dict.fromkeys(ids))
+        self.queries.append(ids)
+        return [(content_id, f"de {content_id}", f"en {content_id}") for content_id in ids]
+
+
+def _wait_for_prefetch(cache: ContentCache) -> None:
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while cache._pending:
+        assert time.monotonic() < deadline, "prefetch didn't finish"
+        time.sleep(0.01)
+
+
+def test_evicts_least_recently_used():
+    cache = ContentCache(RecordingContentCRUD(), capacity=3)
+
+    for content_id in (1, 2, 3):
+        cache.get(content_id)
+    cache.get(1)  # 2 is now the least recently used
+    cache.get(4)
+
+    assert len(cache) == 3
+    assert 2 not in cache
+    assert all(content_id in cache for content_id in (1, 3, 4))
+
+
+def test_get_loads_a_missing_content_once():
+    content_crud = RecordingContentCRUD()
+    cache = ContentCache(content_crud)
+
+    assert cache.get(7).en == "en 7"
+    assert cache.get(7).en == "en 7"
+    assert content_crud.queries == [[7]]
+
+
+def test_prefetch_loads_pages_in_the_background():
+    content_crud = RecordingContentCRUD()
+    cache = ContentCache(content_crud, page_size=4)
+    cache.get(1)
+
+    cache.prefetch([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 2])
+    _wait_for_prefetch(cache)
+
+    # the cached content isn't loaded again and the rest is loaded a page per query
+    assert content_crud.queries == [[1], [2, 3, 4, 5], [6, 7, 8, 9], [10]]
+    assert all(content_id in cache for content_id in range(1, 11))
+
+
+def test_prefetch_does_not_evict_the_current_content():
+    cache = ContentCache(RecordingContentCRUD(), capacity=5, page_size=2)
+    current = cache.get(1)
+
+    cache.prefetch(range(100, 120))
+    _wait_for_prefetch(cache)
+
+    assert len(cache) == 5
+    assert 1 in cache
+    assert cache.get(1) is current
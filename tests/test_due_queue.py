@@ -0,0 +1,60 @@
+"""
+Checks DueQueue against the sorted list the session queues used before: sort by due, then take the first card.
+
+Run from the project root:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from models import Card, DueQueue
+
+
+def _sorted_list_pop(cards: list[Card]) -> Card:
+    # the stable sort keeps cards due at the same time in the order they were added
+    cards.sort(key=lambda card: card.due)
+    return cards.pop(0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pops_in_sorted_list_order(seed):
+    rng = random.Random(seed)
+    # few distinct due dates, so that many cards tie
+    initial_cards = [Card(i, due=rng.randint(0, 20)) for i in range(100)]
+
+    queue = DueQueue(initial_cards)
+    reference = list(initial_cards)
+    next_id = len(initial_cards)
+    for _ in range(500):
+        if reference and rng.random() < 0.5:
+            assert queue.peek().id == sorted(reference, key=lambda card: card.due)[0].id
+            assert queue.pop().id == _sorted_list_pop(reference).id
+        else:
+            card = Card(next_id, due=rng.randint(0, 20))
+            next_id += 1
+            queue.push(card)
+            reference.append(card)
+        assert len(queue) == len(reference)
+
+    while reference:
+        assert queue.pop().id == _sorted_list_pop(reference).id
+    assert not queue
+
+
+def test_smallest_matches_pop_order():
+    rng = random.Random(0)
+    queue = DueQueue(Card(i, due=rng.randint(0, 5)) for i in range(50))
+
+    expected = [card.id for card in queue.smallest(10)]
+    assert [queue.pop().id for _ in range(10)] == expected
+    assert len(queue) == 40
+
+
+def test_empty_queue_raises():
+    queue = DueQueue()
+    with pytest.raises(IndexError):
+        queue.pop()
+    with pytest.raises(IndexError):
+        queue.peek()
@@ -0,0 +1,80 @@
+"""
+Checks Optimizer.evaluate on a time split against a scalar FloatKernel replay of the same reviews.
+
+Run from the project root:
+    python -m pytest tests
+"""
+
+import math
+import random
+from itertools import groupby
+
+import pytest
+
+from models import Rating
+from models.review_log import ReviewLog
+from services.optimizer import Optimizer
+from services.scheduler import FloatKernel, DEFAULT_PARAMETERS, LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS
+from utils import MILLIS_PER_DAY
+
+START_MILLIS = 1_700_000_000_000
+TEST_START_MILLIS = START_MILLIS + 250 * MILLIS_PER_DAY
+
+
+def _random_review_logs(seed: int, num_cards: int = 300) -> list[ReviewLog]:
+    """Histories mixing same-day and multi-day reviews, many of them straddling TEST_START_MILLIS."""
+    rng = random.Random(seed)
+    review_logs = []
+    for card_id in range(num_cards):
+        review_datetime = START_MILLIS + rng.randint(0, 200) * MILLIS_PER_DAY
+        for _ in range(rng.randint(2, 12)):
+            review_logs.append(ReviewLog(card_id, Rating(rng.choice([1, 2, 3, 3, 3, 4])), review_datetime, 1000))
+            review_datetime += rng.choice([0, 3_600_000, rng.randint(1, 40) * MILLIS_PER_DAY])
+    return review_logs
+
+
+def _scalar_log_loss(review_logs: list[ReviewLog], parameters: list[float], test_start: int) -> tuple[float, int]:
+    """
+    Replays every card from its first review like Scheduler.review_card, and averages the log loss of the
+    non-same-day reviews from test_start on.
+    """
+    kernel = FloatKernel(parameters)
+    review_logs = sorted(review_logs, key=lambda review_log: (review_log.card_id, review_log.review_datetime))
+
+    log_loss, num_reviews = 0.0, 0
+    for _, reviews in groupby(review_logs, key=lambda review_log: review_log.card_id):
+        reviews = list(reviews)
+        stability = kernel.initial_stability(reviews[0].rating)
+        difficulty = kernel.initial_difficulty(reviews[0].rating)
+        for previous, review in zip(reviews, reviews[1:]):
+            elapsed_days = (review.review_datetime - previous.review_datetime) // MILLIS_PER_DAY
+            retrievability = kernel.retrievability(elapsed_days, stability)
+            if elapsed_days > 0 and review.review_datetime >= test_start:
+                recalled = review.rating != Rating.Again
+                log_loss -= math.log(retrievability if recalled else 1 - retrievability)
+                num_reviews += 1
+
+            if elapsed_days > 0:
+                stability = kernel.next_stability(difficulty, stability, retrievability, review.rating)
+            else:
+                stability = kernel.short_term_stability(stability, review.rating)
+            difficulty = kernel.next_difficulty(difficulty, review.rating)
+
+    return log_loss / num_reviews, num_reviews
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_split_evaluation_matches_scalar_replay(seed):
+    review_logs = _random_review_logs(seed)
+    rng = random.Random(seed)
+    parameters_list = [
+        list(DEFAULT_PARAMETERS),
+        [rng.uniform(lower, upper) for lower, upper in zip(LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS)],
+    ]
+
+    _, test = Optimizer(review_logs).split_by_time(TEST_START_MILLIS)
+
+    for parameters, result in zip(parameters_list, test.evaluate_many(parameters_list)):
+        log_loss, num_reviews = _scalar_log_loss(review_logs, parameters, TEST_START_MILLIS)
+        assert result.num_reviews == num_reviews
+        assert result.log_loss == pytest.approx(log_loss)
@@ -0,0 +1,142 @@
+"""
+Checks that the optimizer's TensorKernel computes the same memory states as the scheduler's FloatKernel,
+over random parameters within their bounds and random card states.
+
+Run from the project root:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from models import Rating
+from services.optimizer import TensorKernel
+from services.scheduler import (
+    FloatKernel,
+    LOWER_BOUNDS_PARAMETERS,
+    UPPER_BOUNDS_PARAMETERS,
+    MIN_DIFFICULTY,
+    MAX_DIFFICULTY,
+)
+
+SEEDS = range(20)
+NUM_STATES = 50
+
+
+def _random_parameters(rng: random.Random) -> list[float]:
+    return [rng.uniform(lower, upper) for lower, upper in zip(LOWER_BOUNDS_PARAMETERS, UPPER_BOUNDS_PARAMETERS)]
+
+
+def _random_states(rng: random.Random) -> list[tuple[float, float, int]]:
+    """(stability, difficulty, elapsed_days) states, stabilities spanning minutes to decades."""
+    return [
+        (10 ** rng.uniform(-2, 4), rng.uniform(MIN_DIFFICULTY, MAX_DIFFICULTY), rng.randint(0, 3650))
+        for _ in range(NUM_STATES)
+    ]
+
+
+def _kernels(seed: int) -> tuple[FloatKernel, TensorKernel, random.Random]:
+    rng = random.Random(seed)
+    parameters = _random_parameters(rng)
+    return FloatKernel(parameters), TensorKernel(torch.tensor(parameters, dtype=torch.float64)), rng
+
+
+def _tensor(value: float) -> torch.Tensor:
+    return torch.tensor(value, dtype=torch.float64)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_initial_states(seed):
+    float_kernel, tensor_kernel, _ = _kernels(seed)
+
+    for rating in Rating:
+        assert tensor_kernel.initial_stability(rating).item() == pytest.approx(float_kernel.initial_stability(rating))
+        assert tensor_kernel.initial_difficulty(rating).item() == pytest.approx(
+            float_kernel.initial_difficulty(rating)
+        )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_retrievability(seed):
+    float_kernel, tensor_kernel, rng = _kernels(seed)
+
+    for stability, _, elapsed_days in _random_states(rng):
+        assert tensor_kernel.retrievability(elapsed_days, _tensor(stability)).item() == pytest.approx(
+            float_kernel.retrievability(elapsed_days, stability)
+        )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_next_difficulty(seed):
+    float_kernel, tensor_kernel, rng = _kernels(seed)
+
+    for _, difficulty, _ in _random_states(rng):
+        for rating in Rating:
+            assert tensor_kernel.next_difficulty(_tensor(difficulty), rating).item() == pytest.approx(
+                float_kernel.next_difficulty(difficulty, rating)
+            )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_short_term_stability(seed):
+    float_kernel, tensor_kernel, rng = _kernels(seed)
+
+    for stability, _, _ in _random_states(rng):
+        for rating in Rating:
+            assert tensor_kernel.short_term_stability(_tensor(stability), rating).item() == pytest.approx(
+                float_kernel.short_term_stability(stability, rating)
+            )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_next_stability(seed):
+    float_kernel, tensor_kernel, rng = _kernels(seed)
+
+    for stability, difficulty, elapsed_days in _random_states(rng):
+        retrievability = float_kernel.retrievability(elapsed_days, stability)
+        for rating in Rating:
+            expected = float_kernel.next_stability(difficulty, stability, retrievability, rating)
+            actual = tensor_kernel.next_stability(
+                _tensor(difficulty), _tensor(stability), _tensor(retrievability), rating
+            )
+            assert actual.item() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_batch_methods(seed):
+    """The *_batch methods, used by replay_loss, agree with FloatKernel review by review."""
+    float_kernel, tensor_kernel, rng = _kernels(seed)
+
+    states = _random_states(rng)
+    ratings = [rng.choice(list(Rating)) for _ in states]
+    stabilities = [stability for stability, _, _ in states]
+    difficulties = [difficulty for _, difficulty, _ in states]
+    retrievabilities = [
+        float_kernel.retrievability(elapsed_days, stability) for stability, _, elapsed_days in states
+    ]
+
+    short_term = tensor_kernel.short_term_stability_batch(
+        stability=torch.tensor(stabilities, dtype=torch.float64),
+        rating=torch.tensor(ratings),
+    )
+    long_term = tensor_kernel.next_stability_batch(
+        difficulty=torch.tensor(difficulties, dtype=torch.float64),
+        stability=torch.tensor(stabilities, dtype=torch.float64),
+        retrievability=torch.tensor(retrievabilities, dtype=torch.float64),
+        rating=torch.tensor(ratings),
+    )
+
+    assert short_term.tolist() == pytest.approx(
+        [float_kernel.short_term_stability(stability, rating) for stability, rating in zip(stabilities, ratings)]
+    )
+    assert long_term.tolist() == pytest.approx(
+        [
+            float_kernel.next_stability(difficulty, stability, retrievability, rating)
+            for difficulty, stability, retrievability, rating in zip(
+                difficulties, stabilities, retrievabilities, ratings
+            )
+        ]
+    )
@@ -17,4 +17,7 @@ SCHEMA_PATH = ROOT_DIR / "db" / _SCHEMA_NAME
 DEFAULT_DECK_ID = 1
 DEFAULT_DECK_NAME = "Main_Deck"
 
-__all__ = ["ROOT_DIR", "MODEL_DIR", "CSV_PATH", "DB_PATH", "SCHEMA_PATH", "DEFAULT_DECK_ID", "DEFAULT_DECK_NAME"]
\ No newline at end of file
+MILLIS_PER_DAY = 86_400_000
+
+__all__ = ["ROOT_DIR", "MODEL_DIR", "CSV_PATH", "DB_PATH", "SCHEMA_PATH", "DEFAULT_DECK_ID", "DEFAULT_DECK_NAME",
+           "MILLIS_PER_DAY"]
\ No newline at end of file
@@ -404,8 +404,10 @@ class WordUp:
             if answer == "Yes":
                 self.window.destroy()
                 self.session_service.on_session_end()
+                self.session_service.close()
         else:
             self.window.destroy()
+            self.session_service.close()
 
 
 # DEPRECATED